@@ -1,4 +1,6 @@
 from .Basic import *
+from .Blockwise import fused
+from .Panel import accepts_panel
 
 
 def alpha191_1(volume_df, open_df, close_df, n=6):
@@ -12,7 +14,7 @@ def alpha191_1(volume_df, open_df, close_df, n=6):
     :param n: 6
     :return:
     """
-    return -1 * ta.CORREL(rank(delta(np.log(volume_df), 1)), rank(((close_df - open_df) / open_df)), n)
+    return -1 * backend.CORREL(rank(delta(np.log(volume_df), 1)), rank(((close_df - open_df) / open_df)), n)
 
 
 def alpha191_2(high_df, low_df, close_df):
@@ -56,7 +58,7 @@ def alpha191_3(close_df, high_df, low_df, n=6):
     # 定义一个变量expr，表示表达式的结果
     expr = cond1 * 0 + (close_df - cond2 * min_low) + (close_df <= delay_close) * max_high
     # 返回表达式的6期求和结果
-    return ta.SUM(expr, n)
+    return backend.SUM(expr, n)
 
 
 def alpha191_4(volume_df, close_df, n=8, m=20):
@@ -73,12 +75,12 @@ def alpha191_4(volume_df, close_df, n=8, m=20):
     :param m: 20
     :return:
     """
-    sum_close_n = ta.SUM(close_df, n) / n
-    std_close_n = ta.STDDEV(close_df, n)
+    sum_close_n = backend.SUM(close_df, n) / n
+    std_close_n = backend.STDDEV(close_df, n)
 
-    cond1 = (sum_close_n + std_close_n) < (ta.SUM(close_df, 2) / 2)
-    cond2 = (ta.SUM(close_df, 2) / 2) < (sum_close_n - std_close_n)
-    cond3 = (1 < (volume_df / ta.MA(volume_df, m))) | ((volume_df / ta.MA(volume_df, m)) == 1)
+    cond1 = (sum_close_n + std_close_n) < (backend.SUM(close_df, 2) / 2)
+    cond2 = (backend.SUM(close_df, 2) / 2) < (sum_close_n - std_close_n)
+    cond3 = (1 < (volume_df / backend.MA(volume_df, m))) | ((volume_df / backend.MA(volume_df, m)) == 1)
 
     return np.where(cond1, -1, np.where(cond2, 1, np.where(cond3, 1, -1)))
 
@@ -95,7 +97,7 @@ def alpha191_5(volume_df, high_df, n=5, m=3):
     :param m: 3
     :return:
     """
-    return -1 * ta.MAX(ta.CORREL(tsrank(volume_df, n), tsrank(high_df, n), n), m)
+    return -1 * backend.MAX(backend.CORREL(tsrank(volume_df, n), tsrank(high_df, n), n), m)
 
 
 def alpha191_6(open_df, high_df, n=4):
@@ -125,7 +127,7 @@ def alpha191_7(volume_df, close_df, vwap_df, n=3):
     :param n:
     :return:
     """
-    return (rank(ta.MAX((vwap_df - close_df), n)) + rank(ta.MIN((vwap_df - close_df), n))) * rank(
+    return (rank(backend.MAX((vwap_df - close_df), n)) + rank(backend.MIN((vwap_df - close_df), n))) * rank(
         delta(volume_df, n))
 
 
@@ -151,7 +153,7 @@ def alpha191_9(high_df, low_df, volume_df):
     :param volume_df:
     :return:
     """
-    return sma((((high_df + low_df) / 2 - (high_df.shift(1) + low_df.shift(1)) / 2) * (
+    return sma((((high_df + low_df) / 2 - (delay(high_df, 1) + delay(low_df, 1)) / 2) * (
             high_df - low_df) / zero_to_one(volume_df)), 7, 2)
 
 
@@ -163,8 +165,8 @@ def alpha191_10(close_df, ret_df=None):
     :return:
     """
     if ret_df is None:
-        ret_df = close_df.pct_change()
-    return rank(ta.MAX(((ret_df < 0) * ta.STDDEV(ret_df, 20) + (ret_df >= 0) * close_df) ** 2, 5))
+        ret_df = ret(close_df, 1)
+    return rank(backend.MAX(((ret_df < 0) * backend.STDDEV(ret_df, 20) + (ret_df >= 0) * close_df) ** 2, 5))
 
 
 def alpha191_11(close_df, high_df, low_df, volume_df, n=6):
@@ -177,7 +179,7 @@ def alpha191_11(close_df, high_df, low_df, volume_df, n=6):
     :param n: 6
     :return:
     """
-    return ta.SUM(((close_df - low_df) - (high_df - close_df)) / zero_to_one(high_df - low_df) * volume_df, n)
+    return backend.SUM(((close_df - low_df) - (high_df - close_df)) / zero_to_one(high_df - low_df) * volume_df, n)
 
 
 def alpha191_12(open_df, close_df, vwap_df):
@@ -188,7 +190,7 @@ def alpha191_12(open_df, close_df, vwap_df):
     :param vwap_df:
     :return:
     """
-    return (rank((open_df - (ta.SUM(vwap_df, 10) / 10)))) * (-1 * (rank(np.abs((close_df - vwap_df)))))
+    return (rank((open_df - (backend.SUM(vwap_df, 10) / 10)))) * (-1 * (rank(np.abs((close_df - vwap_df)))))
 
 
 def alpha191_13(high_df, low_df, vwap_df):
@@ -209,7 +211,7 @@ def alpha191_14(close_df, n=5):
     :param n: default 5
     :return:
     """
-    return close_df - close_df.shift(n)
+    return close_df - delay(close_df, n)
 
 
 def alpha191_15(open_df, close_df):
@@ -219,7 +221,7 @@ def alpha191_15(open_df, close_df):
     :param close_df:
     :return:
     """
-    return open_df / close_df.shift(1) - 1
+    return open_df / delay(close_df, 1) - 1
 
 
 def alpha191_16(volume_df, vwap_df, n=5):
@@ -230,7 +232,7 @@ def alpha191_16(volume_df, vwap_df, n=5):
     :param n: default 5
     :return:
     """
-    return -1 * ta.MAX(rank(ta.CORREL(rank(volume_df), rank(vwap_df), n)), n)
+    return -1 * backend.MAX(rank(backend.CORREL(rank(volume_df), rank(vwap_df), n)), n)
 
 
 def alpha191_17(vwap_df, close_df, n=5):
@@ -241,7 +243,7 @@ def alpha191_17(vwap_df, close_df, n=5):
     :param n: default 15
     :return:
     """
-    return np.power(rank(vwap_df - ta.MAX(vwap_df, n)), delta(close_df, n))
+    return np.power(rank(vwap_df - backend.MAX(vwap_df, n)), delta(close_df, n))
 
 
 def alpha191_18(close_df, n=5):
@@ -251,7 +253,7 @@ def alpha191_18(close_df, n=5):
     :param n: default 5
     :return:
     """
-    return close_df / close_df.shift(n)
+    return close_df / delay(close_df, n)
 
 
 def alpha191_19(close_df, n=5):
@@ -263,8 +265,8 @@ def alpha191_19(close_df, n=5):
     :param n: default 5
     :return:
     """
-    return np.where(close_df < close_df.shift(n), (close_df - close_df.shift(n)) / close_df.shift(n),
-                    np.where(close_df == close_df.shift(n), 0, (close_df - close_df.shift(n)) / close_df))
+    return np.where(close_df < delay(close_df, n), (close_df - delay(close_df, n)) / delay(close_df, n),
+                    np.where(close_df == delay(close_df, n), 0, (close_df - delay(close_df, n)) / close_df))
 
 
 def alpha191_20(close_df, n=6):
@@ -274,7 +276,7 @@ def alpha191_20(close_df, n=6):
     :param n: default 6
     :return:
     """
-    return (close_df - close_df.shift(n)) / close_df.shift(n) * 100
+    return (close_df - delay(close_df, n)) / delay(close_df, n) * 100
 
 
 def alpha191_21(close_df, n=6):
@@ -284,7 +286,7 @@ def alpha191_21(close_df, n=6):
     :param n: default 6
     :return:
     """
-    return regbeta(ta.MA(close_df, n), np.arange(len(close_df)), n)
+    return regbeta(backend.MA(close_df, n), sequence(n), n)
 
 
 def alpha191_22(close_df, n=6):
@@ -294,7 +296,7 @@ def alpha191_22(close_df, n=6):
     :param n: default 6
     :return:
     """
-    mean_n = ta.MA(close_df, n)
+    mean_n = backend.MA(close_df, n)
     diff_mean_n = close_df - mean_n
     return sma((diff_mean_n / mean_n - delta(diff_mean_n / mean_n, 3)), 12, 1)
 
@@ -312,17 +314,9 @@ def alpha191_23(close_df, n=20):
     # DELAY_CLOSE_1 = DELAY(CLOSE, 1)
     delay_close_1 = delay(close_df, 1)
     # 计算CLOSE序列的20天标准差值
-    std_close_20 = ta.STDDEV(close_df, n)
-    # 创建一个空数组，用于存储条件判断结果
-    COND = np.zeros(len(close_df))
-    # 对于每个位置i，根据条件判断赋值给COND数组
-    for i in range(len(close_df)):
-        # 如果CLOSE大于滞后值，则取标准差值
-        if close_df[i] > delay_close_1[i] and std_close_20[i] > 0:
-            COND[i] = std_close_20[i]
-        # 否则，取0
-        else:
-            COND[i] = 0
+    std_close_20 = backend.STDDEV(close_df, n)
+    # 如果CLOSE大于滞后值，则取标准差值，否则取0
+    COND = np.where((close_df > delay_close_1) & (std_close_20 > 0), std_close_20, 0)
     # 计算COND序列的20天中国SMA值，并乘以100
     SMA_COND_1 = sma(COND, n, 1) * 100
     # 计算COND序列的反向条件判断结果，并求其20天中国SMA值，并乘以100
@@ -339,7 +333,7 @@ def alpha191_24(close_df, n=5):
     :param n: default 5
     :return:
     """
-    return sma(close_df - close_df.shift(n), n, 1)
+    return sma(close_df - delay(close_df, n), n, 1)
 
 
 def alpha191_25(close_df, ret_df, volume_df, n=250):
@@ -353,8 +347,8 @@ def alpha191_25(close_df, ret_df, volume_df, n=250):
     :param n: default 250
     :return:
     """
-    return ((-1 * rank(delta(close_df, 7) * (1 - rank(decaylinear((volume_df / ta.MA(volume_df, 20)), 9))))) * (
-            1 + rank(ta.SUM(ret_df, n))))
+    return ((-1 * rank(delta(close_df, 7) * (1 - rank(decaylinear((volume_df / backend.MA(volume_df, 20)), 9))))) * (
+            1 + rank(backend.SUM(ret_df, n))))
 
 
 def alpha191_26(close_df, vwap_df, n=230):
@@ -365,7 +359,7 @@ def alpha191_26(close_df, vwap_df, n=230):
     :param n: default 230
     :return:
     """
-    return (ta.SUM(close_df, 7) / 7 - close_df) + ta.CORREL(vwap_df, close_df.shift(5), n)
+    return (backend.SUM(close_df, 7) / 7 - close_df) + backend.CORREL(vwap_df, delay(close_df, 5), n)
 
 
 def alpha191_27(close_df, n=12):
@@ -375,9 +369,9 @@ def alpha191_27(close_df, n=12):
     :param n: default 12
     :return:
     """
-    return ta.WMA(
-        (close_df - close_df.shift(3)) / close_df.shift(3) * 100 + (close_df - close_df.shift(6)) / close_df.shift(
-            6) * 100, n)
+    return backend.WMA(
+        (close_df - delay(close_df, 3)) / delay(close_df, 3) * 100 + (close_df - delay(close_df, 6)) / delay(
+            close_df, 6) * 100, n)
 
 
 def alpha191_28(close_df, high_df, low_df, n=9):
@@ -391,9 +385,9 @@ def alpha191_28(close_df, high_df, low_df, n=9):
     :param n: default 9
     :return:
     """
-    return 3 * sma((close_df - ta.MIN(low_df, n)) / (ta.MAX(high_df, n) - ta.MIN(low_df, n)) * 100, 3,
+    return 3 * sma((close_df - backend.MIN(low_df, n)) / (backend.MAX(high_df, n) - backend.MIN(low_df, n)) * 100, 3,
                    1) - 2 * sma(
-        sma((close_df - ta.MIN(low_df, n)) / (ta.MAX(high_df, n) - ta.MIN(low_df, n)) * 100, 3, 1), 3, 1)
+        sma((close_df - backend.MIN(low_df, n)) / (backend.MAX(high_df, n) - backend.MIN(low_df, n)) * 100, 3, 1), 3, 1)
 
 
 def alpha191_29(close_df, volume_df, n=6):
@@ -404,7 +398,7 @@ def alpha191_29(close_df, volume_df, n=6):
     :param n: default 6
     :return:
     """
-    return (close_df - close_df.shift(n)) / close_df.shift(n) * volume_df
+    return (close_df - delay(close_df, n)) / delay(close_df, n) * volume_df
 
 
 def alpha191_30(close_df, mkt_df, smb_df, hml_df, n=60, m=20):
@@ -418,7 +412,7 @@ def alpha191_30(close_df, mkt_df, smb_df, hml_df, n=60, m=20):
     :param m: default 20
     :return:
     """
-    return ta.WMA((regresi(close_df / close_df.shift(1) - 1, mkt_df, smb_df, hml_df, n)) ** 2, m)
+    return backend.WMA((regresi(close_df / delay(close_df, 1) - 1, mkt_df, smb_df, hml_df, n)) ** 2, m)
 
 
 def alpha191_31(close_df, n=12):
@@ -428,7 +422,7 @@ def alpha191_31(close_df, n=12):
     :param n: default 12
     :return:
     """
-    return (close_df - ta.MA(close_df, n)) / ta.MA(close_df, n) * 100
+    return (close_df - backend.MA(close_df, n)) / backend.MA(close_df, n) * 100
 
 
 def alpha191_32(high_df, volume_df, n=3):
@@ -439,7 +433,7 @@ def alpha191_32(high_df, volume_df, n=3):
     :param n: default 3
     :return:
     """
-    return -1 * ta.SUM(rank(ta.CORREL(rank(high_df), rank(volume_df), 3)), 3)
+    return -1 * backend.SUM(rank(backend.CORREL(rank(high_df), rank(volume_df), 3)), 3)
 
 
 def alpha191_33(close_df, low_df, volume_df, ret_df=None, n=5, m=240):
@@ -456,9 +450,9 @@ def alpha191_33(close_df, low_df, volume_df, ret_df=None, n=5, m=240):
     :return:
     """
     if ret_df is None:
-        ret_df = close_df.pct_change(1)
-    return (((-1 * ta.MIN(low_df, n)) + delay(ta.MIN(low_df, n), n)) *
-            rank(((ta.SUM(ret_df, m) - ta.SUM(ret_df, 20)) / 220))) * tsrank(volume_df, n)
+        ret_df = ret(close_df, 1)
+    return (((-1 * backend.MIN(low_df, n)) + delay(backend.MIN(low_df, n), n)) *
+            rank(((backend.SUM(ret_df, m) - backend.SUM(ret_df, 20)) / 220))) * tsrank(volume_df, n)
 
 
 def alpha191_34(close_df, n=12):
@@ -468,7 +462,7 @@ def alpha191_34(close_df, n=12):
     :param n: default 12
     :return:
     """
-    return ta.MA(close_df, n) / close_df
+    return backend.MA(close_df, n) / close_df
 
 
 def alpha191_35(open_df, volume_df, n=15, m=17):
@@ -483,7 +477,7 @@ def alpha191_35(open_df, volume_df, n=15, m=17):
     :return:
     """
     return np.minimum(rank(decaylinear(delta(open_df, 1), n)),
-                      rank(decaylinear(ta.CORREL(volume_df, ((open_df * 0.65) + (open_df * 0.35)), m), 7))) * -1
+                      rank(decaylinear(backend.CORREL(volume_df, ((open_df * 0.65) + (open_df * 0.35)), m), 7))) * -1
 
 
 def alpha191_36(volume_df, vwap_df, n=6):
@@ -494,7 +488,7 @@ def alpha191_36(volume_df, vwap_df, n=6):
     :param n: default 6
     :return:
     """
-    return tsrank(ta.SUM(ta.CORREL(rank(volume_df), rank(vwap_df)), n), 2)
+    return tsrank(backend.SUM(backend.CORREL(rank(volume_df), rank(vwap_df)), n), 2)
 
 
 def alpha191_37(open_df, ret_df=None, n=5, m=10):
@@ -507,8 +501,9 @@ def alpha191_37(open_df, ret_df=None, n=5, m=10):
     :return:
     """
     if ret_df is None:
-        ret_df = open_df.pct_change(1)
-    return -1 * rank(((ta.SUM(open_df, n) * ta.SUM(ret_df, n)) - delay((ta.SUM(open_df, n) * ta.SUM(ret_df, n)), m)))
+        ret_df = ret(open_df, 1)
+    return -1 * rank(((backend.SUM(open_df, n) * backend.SUM(ret_df, n)) -
+                      delay((backend.SUM(open_df, n) * backend.SUM(ret_df, n)), m)))
 
 
 def alpha191_38(high_df, n=20):
@@ -518,7 +513,7 @@ def alpha191_38(high_df, n=20):
     :param n: default 20
     :return:
     """
-    return np.where(((ta.SUM(high_df, n) / n) < high_df), (-1 * delta(high_df, 2)), 0)
+    return np.where(((backend.SUM(high_df, n) / n) < high_df), (-1 * delta(high_df, 2)), 0)
 
 
 def alpha191_39(close_df, open_df, volume_df, vwap_df, n=8, m=14, l=12):
@@ -536,8 +531,8 @@ def alpha191_39(close_df, open_df, volume_df, vwap_df, n=8, m=14, l=12):
     :return:
     """
     return ((rank(decaylinear(delta(close_df, 2), n)) -
-             rank(decaylinear(ta.CORREL(((vwap_df * 0.3) + (open_df * 0.7)),
-                                        ta.SUM(ta.MA(volume_df, 180), 37), m), l))) * -1)
+             rank(decaylinear(backend.CORREL(((vwap_df * 0.3) + (open_df * 0.7)),
+                                        backend.SUM(backend.MA(volume_df, 180), 37), m), l))) * -1)
 
 
 def alpha191_40(close_df, volume_df, n=26):
@@ -548,8 +543,8 @@ def alpha191_40(close_df, volume_df, n=26):
     :param n: default 26
     :return:
     """
-    return ta.SUM(np.where(close_df > delay(close_df, 1), volume_df, 0), n) / \
-        ta.SUM(np.where(close_df <= delay(close_df, 1), volume_df, 0), n) * 100
+    return backend.SUM(np.where(close_df > delay(close_df, 1), volume_df, 0), n) / \
+        backend.SUM(np.where(close_df <= delay(close_df, 1), volume_df, 0), n) * 100
 
 
 def alpha191_41(vwap_df, n=5):
@@ -559,7 +554,7 @@ def alpha191_41(vwap_df, n=5):
     :param n: default 5
     :return:
     """
-    return rank(ta.MAX(delta(vwap_df, 3), n)) * -1
+    return rank(backend.MAX(delta(vwap_df, 3), n)) * -1
 
 
 def alpha191_42(high_df, volume_df, n=10):
@@ -570,7 +565,7 @@ def alpha191_42(high_df, volume_df, n=10):
     :param n: default 10
     :return:
     """
-    return (-1 * rank(ta.STDDEV(high_df, n))) * ta.CORREL(high_df, volume_df, n)
+    return (-1 * rank(backend.STDDEV(high_df, n))) * backend.CORREL(high_df, volume_df, n)
 
 
 def alpha191_43(close_df, volume_df, n=6):
@@ -581,7 +576,7 @@ def alpha191_43(close_df, volume_df, n=6):
     :param n: default 6
     :return:
     """
-    return ta.SUM(np.where(close_df > delay(close_df, 1), volume_df,
+    return backend.SUM(np.where(close_df > delay(close_df, 1), volume_df,
                            np.where(close_df < delay(close_df, 1), -volume_df, 0)), n)
 
 
@@ -597,7 +592,7 @@ def alpha191_44(low_df, volume_df, vwap_df, n=10, m=7):
     :param m: default 7
     :return:
     """
-    return tsrank(decaylinear(ta.CORREL(low_df, ta.MA(volume_df, 10), m), 6), 4) + \
+    return tsrank(decaylinear(backend.CORREL(low_df, backend.MA(volume_df, 10), m), 6), 4) + \
         tsrank(decaylinear(delta(vwap_df, 3), n), 15)
 
 
@@ -613,7 +608,7 @@ def alpha191_45(close_df, open_df, volume_df, vwap_df, n=15):
     :return:
     """
     return rank(delta((close_df * 0.6 + open_df * 0.4), 1)) * \
-        rank(ta.CORREL(vwap_df, ta.MA(volume_df, 150), n))
+        rank(backend.CORREL(vwap_df, backend.MA(volume_df, 150), n))
 
 
 def alpha191_46(close_df, volume_df, n=3):
@@ -624,7 +619,7 @@ def alpha191_46(close_df, volume_df, n=3):
     :param n: default 12
     :return:
     """
-    return -1 * ta.SUM(rank(ta.CORREL(rank(close_df), rank(volume_df), 3)), n)
+    return -1 * backend.SUM(rank(backend.CORREL(rank(close_df), rank(volume_df), 3)), n)
 
 
 def alpha191_47(close_df, high_df, low_df, n=6, m=9):
@@ -637,7 +632,7 @@ def alpha191_47(close_df, high_df, low_df, n=6, m=9):
     :param m: default 9
     :return:
     """
-    return sma((ta.MAX(high_df, n) - close_df) / (ta.MAX(high_df, n) - ta.MIN(low_df, n)) * 100, m, 1)
+    return sma((backend.MAX(high_df, n) - close_df) / (backend.MAX(high_df, n) - backend.MIN(low_df, n)) * 100, m, 1)
 
 
 def alpha191_48(close_df, volume_df, n=5, m=20):
@@ -651,8 +646,9 @@ def alpha191_48(close_df, volume_df, n=5, m=20):
     :param m: default 20
     :return:
     """
-    return -1 * ((rank(((np.sign(close_df - close_df.shift(1)) + np.sign(close_df.shift(1) - close_df.shift(2))) +
-                        np.sign(close_df.shift(2) - close_df.shift(3))))) * ta.SUM(volume_df, n)) / ta.SUM(volume_df, m)
+    return -1 * ((rank(((np.sign(close_df - delay(close_df, 1)) + np.sign(delay(close_df, 1) - delay(close_df, 2))) +
+                        np.sign(delay(close_df, 2) - delay(close_df, 3))))) * backend.SUM(volume_df, n)) / \
+        backend.SUM(volume_df, m)
 
 
 def alpha191_49(high_df, low_df, n=12):
@@ -667,15 +663,15 @@ def alpha191_49(high_df, low_df, n=12):
     :param n: default 12
     :return:
     """
-    delay_high = np.roll(high_df, 1)
-    delay_low = np.roll(low_df, 1)
+    delay_high = delay(high_df, 1)
+    delay_low = delay(low_df, 1)
     cond1 = (high_df + low_df) >= (delay_high + delay_low)
     cond2 = (high_df + low_df) <= (delay_high + delay_low)
 
     max1 = np.maximum(np.abs(high_df - delay_high), np.abs(low_df - delay_low))
 
-    numerator = ta.SUM(np.where(cond1, 0, max1), n)
-    denominator = numerator + ta.SUM(np.where(cond2, 0, max1), n)
+    numerator = backend.SUM(np.where(cond1, 0, max1), n)
+    denominator = numerator + backend.SUM(np.where(cond2, 0, max1), n)
     result = numerator / denominator
     return result
 
@@ -695,16 +691,16 @@ def alpha191_50(high_df, low_df, n=12):
     :param n: default 12
     :return:
     """
-    delay_high = np.roll(high_df, 1)
-    delay_low = np.roll(low_df, 1)
+    delay_high = delay(high_df, 1)
+    delay_low = delay(low_df, 1)
     cond1 = (high_df + low_df) <= (delay_high + delay_low)
     cond2 = (high_df + low_df) >= (delay_high + delay_low)
 
     max1 = np.maximum(np.abs(high_df - delay_high), np.abs(low_df - delay_low))
 
-    numerator = ta.SUM(np.where(cond1, 0, max1), n)
-    denominator = numerator + ta.SUM(np.where(cond2, 0, max1), n)
-    result = (numerator - ta.SUM(np.where(cond2, 0, max1), n)) / denominator
+    numerator = backend.SUM(np.where(cond1, 0, max1), n)
+    denominator = numerator + backend.SUM(np.where(cond2, 0, max1), n)
+    result = (numerator - backend.SUM(np.where(cond2, 0, max1), n)) / denominator
     return result
 
 
@@ -720,15 +716,15 @@ def alpha191_51(high_df, low_df, n=12):
     :param n: default 12
     :return:
     """
-    delay_high = np.roll(high_df, 1)
-    delay_low = np.roll(low_df, 1)
+    delay_high = delay(high_df, 1)
+    delay_low = delay(low_df, 1)
     cond1 = (high_df + low_df) >= (delay_high + delay_low)
     cond2 = (high_df + low_df) <= (delay_high + delay_low)
 
     max1 = np.maximum(np.abs(high_df - delay_high), np.abs(low_df - delay_low))
 
-    numerator = ta.SUM(np.where(cond1, 0, max1), n)
-    denominator = numerator + ta.SUM(np.where(cond2, 0, max1), n)
+    numerator = backend.SUM(np.where(cond1, 0, max1), n)
+    denominator = numerator + backend.SUM(np.where(cond2, 0, max1), n)
     result = numerator / denominator
     return result
 
@@ -744,8 +740,8 @@ def alpha191_52(close_df, high_df, low_df, n=26):
     :param n: default 26
     :return:
     """
-    return ta.SUM(np.maximum(0, high_df - delay((high_df + low_df + close_df) / 3, 1)), n) / \
-        ta.SUM(np.maximum(0, delay((high_df + low_df + close_df) / 3, 1) - low_df), n) * 100
+    return backend.SUM(np.maximum(0, high_df - delay((high_df + low_df + close_df) / 3, 1)), n) / \
+        backend.SUM(np.maximum(0, delay((high_df + low_df + close_df) / 3, 1) - low_df), n) * 100
 
 
 def alpha191_53(df, change_flag=True, n=12):
@@ -756,7 +752,7 @@ def alpha191_53(df, change_flag=True, n=12):
     :param n: default 12
     :return:
     """
-    change = df.copy() if change_flag else df.pct_change(1)
+    change = df if change_flag else ret(df, 1)
     return count(change > 0, n) / n * 100
 
 
@@ -768,7 +764,8 @@ def alpha191_54(close_df, open_df, n=10):
     :param n: default 10
     :return:
     """
-    return -1 * rank(ta.STDDEV(np.abs(close_df - open_df)) + (close_df - open_df) + ta.CORREL(close_df, open_df, n))
+    return -1 * rank(backend.STDDEV(np.abs(close_df - open_df)) + (close_df - open_df) +
+                     backend.CORREL(close_df, open_df, n))
 
 
 def alpha191_55(close_df, open_df, high_df, low_df, n=20):
@@ -789,27 +786,24 @@ def alpha191_55(close_df, open_df, high_df, low_df, n=20):
     :return:
     """
     # 计算各种价格变化和绝对值
-    close_change = close_df - close_df.shift(1)
-    high_change = high_df - high_df.shift(1)
-    low_change = low_df - low_df.shift(1)
-    abs_close_change = np.abs(close_change)
-    abs_high_change = np.abs(high_change)
-    abs_low_change = np.abs(low_change)
-
-    # 计算分母中的条件表达式
-    cond1 = (abs_high_change > abs_low_change) & (abs_high_change > abs_high_change.shift(1))
-    cond2 = (abs_low_change > abs_high_change.shift(1)) & (abs_low_change > abs_high_change)
-
-    # 计算分母
-    denom = np.where(cond1, abs_high_change + abs_low_change / 2 + abs_close_change / 4,
-                     np.where(cond2, abs_low_change + abs_high_change / 2 + abs_close_change / 4,
-                              abs_high_change.shift(1) + abs_close_change / 4))
-
-    # 计算分子
-    numer = 16 * (close_change + (close_df - open_df) / 2 + close_df.shift(1) - open_df.shift(1))
+    delay_close = delay(close_df, 1)
+    abs_high_change = np.abs(high_df - delay(high_df, 1))
+    delay_abs_high = delay(abs_high_change, 1)
+
+    # 分子、分母中的条件表达式均为逐元素运算，融合为一个内核分块计算
+    body = fused(
+        '16 * (close - delay_close + (close - open) / 2 + delay_close - delay_open)'
+        ' / ((abs_high > ABS(low - delay_low) & abs_high > delay_abs_high)'
+        ' ? abs_high + ABS(low - delay_low) / 2 + ABS(close - delay_close) / 4'
+        ' : ((ABS(low - delay_low) > delay_abs_high & ABS(low - delay_low) > abs_high)'
+        ' ? ABS(low - delay_low) + abs_high / 2 + ABS(close - delay_close) / 4'
+        ' : delay_abs_high + ABS(close - delay_close) / 4))'
+        ' * MAX(abs_high, ABS(low - delay_low))',
+        close=close_df, open=open_df, low=low_df, delay_close=delay_close, delay_open=delay(open_df, 1),
+        delay_low=delay(low_df, 1), abs_high=abs_high_change, delay_abs_high=delay_abs_high)
 
     # 计算因子值
-    factor = ta.SUM(numer / denom * np.maximum(abs_high_change, abs_low_change), n)
+    factor = backend.SUM(body, n)
 
     return factor
 
@@ -829,8 +823,9 @@ def alpha191_56(open_df, high_df, low_df, volume_df, n1=12, n2=19, n3=40, n4=13)
     :param n4: default 13
     :return:
     """
-    rank1 = rank(open_df - ta.MIN(open_df, n1))
-    rank2 = rank(ta.CORREL(ta.SUM((high_df + low_df) / 2, n2), ta.SUM(ta.MA(volume_df, n3), n2), n4) ** 5)
+    rank1 = rank(open_df - backend.MIN(open_df, n1))
+    rank2 = rank(backend.CORREL(backend.SUM((high_df + low_df) / 2, n2), backend.SUM(backend.MA(volume_df, n3), n2),
+                                n4) ** 5)
     return np.where(rank1 < rank2, 1, 0)
 
 
@@ -843,7 +838,7 @@ def alpha191_57(close_df, high_df, low_df, n=9):
     :param n: default 9
     :return:
     """
-    return sma((close_df - ta.MIN(low_df, n)) / (ta.MAX(high_df, n) - ta.MIN(low_df, n)) * 100, 3, 1)
+    return sma((close_df - backend.MIN(low_df, n)) / (backend.MAX(high_df, n) - backend.MIN(low_df, n)) * 100, 3, 1)
 
 
 def alpha191_58(df, change_flag=True, n=20):
@@ -868,12 +863,12 @@ def alpha191_59(close_df, high_df, low_df, n=20):
     :param n: default 20
     :return:
     """
-    delay_close = np.roll(close_df, 1)
+    delay_close = delay(close_df, 1)
     cond1 = close_df == delay_close
     cond2 = close_df > delay_close
     result = np.where(cond1, 0, np.where(cond2, close_df - np.minimum(low_df, delay_close),
                                          close_df - np.maximum(high_df, delay_close)))
-    return ta.SUM(result, n)
+    return backend.SUM(result, n)
 
 
 def alpha191_60(close_df, high_df, low_df, volume_df, n=20):
@@ -886,7 +881,7 @@ def alpha191_60(close_df, high_df, low_df, volume_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.SUM(((close_df - low_df) - (high_df - close_df)) / zero_to_one(high_df - low_df) * volume_df, n)
+    return backend.SUM(((close_df - low_df) - (high_df - close_df)) / zero_to_one(high_df - low_df) * volume_df, n)
 
 
 def alpha191_61(vwap_df, low_df, volume_df, n1=80, n2=8, n3=12, n4=17):
@@ -904,7 +899,7 @@ def alpha191_61(vwap_df, low_df, volume_df, n1=80, n2=8, n3=12, n4=17):
     :return:
     """
     rank1 = rank(decaylinear(delta(vwap_df, 1), n3))
-    rank2 = rank(decaylinear(rank(ta.CORREL(low_df, ta.MA(volume_df, n1), n2)), n4))
+    rank2 = rank(decaylinear(rank(backend.CORREL(low_df, backend.MA(volume_df, n1), n2)), n4))
     return np.maximum(rank1, rank2) * -1
 
 
@@ -916,7 +911,7 @@ def alpha191_62(high_df, volume_df, n=5):
     :param n: default 5
     :return:
     """
-    return -1 * ta.CORREL(high_df, rank(volume_df), n)
+    return -1 * backend.CORREL(high_df, rank(volume_df), n)
 
 
 def alpha191_63(close_df, n=6):
@@ -926,8 +921,8 @@ def alpha191_63(close_df, n=6):
     :param n: default 6
     :return:
     """
-    return sma(np.maximum(close_df - np.roll(close_df, 1), 0), n, 1) / sma(
-        np.abs(close_df - np.roll(close_df, 1)), n, 1) * 100
+    return sma(np.maximum(close_df - delay(close_df, 1), 0), n, 1) / sma(
+        np.abs(close_df - delay(close_df, 1)), n, 1) * 100
 
 
 def alpha191_64(close_df, volume_df, n1=60, n2=4, n3=13, n4=14):
@@ -943,8 +938,8 @@ def alpha191_64(close_df, volume_df, n1=60, n2=4, n3=13, n4=14):
     :param n4: default 14
     :return:
     """
-    rank1 = rank(decaylinear(ta.CORREL(rank(close_df), rank(ta.MA(volume_df, n1)), n2), n3))
-    rank2 = rank(decaylinear(np.maximum(ta.CORREL(rank(close_df), rank(volume_df), n2), n3), n4))
+    rank1 = rank(decaylinear(backend.CORREL(rank(close_df), rank(backend.MA(volume_df, n1)), n2), n3))
+    rank2 = rank(decaylinear(np.maximum(backend.CORREL(rank(close_df), rank(volume_df), n2), n3), n4))
     return np.maximum(rank1, rank2) * -1
 
 
@@ -955,7 +950,7 @@ def alpha191_65(close_df, n=6):
     :param n: default 6
     :return:
     """
-    return ta.MA(close_df, n) / close_df
+    return backend.MA(close_df, n) / close_df
 
 
 def alpha191_66(close_df, n=6):
@@ -965,7 +960,7 @@ def alpha191_66(close_df, n=6):
     :param n: default 6
     :return:
     """
-    return (close_df - ta.MA(close_df, n)) / ta.MA(close_df, n) * 100
+    return (close_df - backend.MA(close_df, n)) / backend.MA(close_df, n) * 100
 
 
 def alpha191_67(close_df, n=24):
@@ -975,8 +970,8 @@ def alpha191_67(close_df, n=24):
     :param n: default 24
     :return:
     """
-    return sma(np.maximum(close_df - np.roll(close_df, 1), 0), n, 1) / sma(
-        np.abs(close_df - np.roll(close_df, 1)), n, 1) * 100
+    return sma(np.maximum(close_df - delay(close_df, 1), 0), n, 1) / sma(
+        np.abs(close_df - delay(close_df, 1)), n, 1) * 100
 
 
 def alpha191_68(high_df, low_df, volume_df, n=15):
@@ -988,24 +983,26 @@ def alpha191_68(high_df, low_df, volume_df, n=15):
     :param n: default 15
     :return:
     """
-    return sma(((high_df + low_df) / 2 - (np.roll(high_df, 1) + np.roll(low_df, 1)) / 2) *
+    return sma(((high_df + low_df) / 2 - (delay(high_df, 1) + delay(low_df, 1)) / 2) *
             high_df - low_df / zero_to_one(volume_df), n, 2)
 
 
-def alpha191_69(close_df, open_df, n=20):
+def alpha191_69(open_df, high_df, low_df, n=20):
     """
     Alpha69
     (SUM(DTM,20)>SUM(DBM,20)？(SUM(DTM,20)-SUM(DBM,20))/SUM(DTM,20)：(SUM(DTM,20)=SUM(DBM,20)？
     0：(SUM(DTM,20)-SUM(DBM,20))/SUM(DBM,20)))
-    :param close_df:
     :param open_df:
+    :param high_df:
+    :param low_df:
     :param n: default 20
     :return:
     """
-    dtm_df = dtm(close_df, open_df)
-    dbm_df = dbm(close_df, open_df)
-    dtm_sum = ta.SUM(dtm_df, n)
-    dbm_sum = ta.SUM(dbm_df, n)
+    dm = movement(open_df=open_df, high_df=high_df, low_df=low_df)
+    dtm_df = dm['dtm']
+    dbm_df = dm['dbm']
+    dtm_sum = backend.SUM(dtm_df, n)
+    dbm_sum = backend.SUM(dbm_df, n)
     return np.where(dtm_sum > dbm_sum, (dtm_sum - dbm_sum) / dtm_sum,
                     np.where(dtm_sum == dbm_sum, 0, (dtm_sum - dbm_sum) / dbm_sum))
 
@@ -1017,7 +1014,7 @@ def alpha191_70(amount_df, n=6):
     :param n: default 6
     :return:
     """
-    return ta.STDDEV(amount_df, n)
+    return backend.STDDEV(amount_df, n)
 
 
 def alpha191_71(close_df, n=24):
@@ -1027,7 +1024,7 @@ def alpha191_71(close_df, n=24):
     :param n: default 24
     :return:
     """
-    return (close_df - ta.MA(close_df, n)) / ta.MA(close_df, n) * 100
+    return (close_df - backend.MA(close_df, n)) / backend.MA(close_df, n) * 100
 
 
 def alpha191_72(close_df, high_df, low_df, n=15):
@@ -1039,7 +1036,7 @@ def alpha191_72(close_df, high_df, low_df, n=15):
     :param n: default 15
     :return:
     """
-    return sma((ta.MAX(high_df, 6) - close_df) / (ta.MAX(high_df, 6) - ta.MIN(low_df, 6)) * 100, n, 1)
+    return sma((backend.MAX(high_df, 6) - close_df) / (backend.MAX(high_df, 6) - backend.MIN(low_df, 6)) * 100, n, 1)
 
 
 def alpha191_73(close_df, volume_df, vwap_df, n1=10, n2=16, n3=4, n4=5, n5=3):
@@ -1057,8 +1054,8 @@ def alpha191_73(close_df, volume_df, vwap_df, n1=10, n2=16, n3=4, n4=5, n5=3):
     :param n5: default 3
     :return:
     """
-    return ((tsrank(decaylinear(decaylinear(ta.CORREL(close_df, volume_df, n1), n2), n3), n4) -
-             rank(decaylinear(ta.CORREL(vwap_df, ta.MA(volume_df, 30), n3), n5))) * -1)
+    return ((tsrank(decaylinear(decaylinear(backend.CORREL(close_df, volume_df, n1), n2), n3), n4) -
+             rank(decaylinear(backend.CORREL(vwap_df, backend.MA(volume_df, 30), n3), n5))) * -1)
 
 
 def alpha191_74(low_df, volume_df, vwap_df, n1=20, n2=40, n3=7, n4=6):
@@ -1075,8 +1072,9 @@ def alpha191_74(low_df, volume_df, vwap_df, n1=20, n2=40, n3=7, n4=6):
     :param n4: default 6
     :return:
     """
-    return (rank(ta.CORREL(ta.SUM(((low_df * 0.35) + (vwap_df * 0.65)), n1), ta.SUM(ta.MA(volume_df, n2), n1), n3)) +
-            rank(ta.CORREL(rank(vwap_df), rank(volume_df), n4)))
+    return (rank(backend.CORREL(backend.SUM(((low_df * 0.35) + (vwap_df * 0.65)), n1),
+                                backend.SUM(backend.MA(volume_df, n2), n1), n3)) +
+            rank(backend.CORREL(rank(vwap_df), rank(volume_df), n4)))
 
 
 def alpha191_75(close_df, open_df, benchmark_close_df, benchmark_open_df, n=50):
@@ -1106,8 +1104,8 @@ def alpha191_76(close_df, volume_df, n1=20, n2=20):
     :param n2: default 20
     :return:
     """
-    return (ta.STDDEV(np.abs((close_df / delay(close_df, 1) - 1)) / zero_to_one(volume_df), n1) /
-            ta.MA(np.abs((close_df / delay(close_df, 1) - 1)) / zero_to_one(volume_df), n2))
+    return (backend.STDDEV(np.abs((close_df / delay(close_df, 1) - 1)) / zero_to_one(volume_df), n1) /
+            backend.MA(np.abs((close_df / delay(close_df, 1) - 1)) / zero_to_one(volume_df), n2))
 
 
 def alpha191_77(high_df, low_df, volume_df, vwap_df, n1=20, n2=3, n3=6):
@@ -1125,7 +1123,7 @@ def alpha191_77(high_df, low_df, volume_df, vwap_df, n1=20, n2=3, n3=6):
     :return:
     """
     return np.minimum(rank(decaylinear((((high_df + low_df) / 2) + high_df) - (vwap_df + high_df), n1)),
-                      rank(decaylinear(ta.CORREL(((high_df + low_df) / 2), ta.MA(volume_df, 40), n2), n3)))
+                      rank(decaylinear(backend.CORREL(((high_df + low_df) / 2), backend.MA(volume_df, 40), n2), n3)))
 
 
 def alpha191_78(close_df, high_df, low_df, n=12):
@@ -1139,8 +1137,8 @@ def alpha191_78(close_df, high_df, low_df, n=12):
     :param n: default 12
     :return:
     """
-    return ((high_df + low_df + close_df) / 3 - ta.MA((high_df + low_df + close_df) / 3, n)) / (
-            0.015 * ta.MA(np.abs(close_df - ta.MA((high_df + low_df + close_df) / 3, n)), n))
+    return ((high_df + low_df + close_df) / 3 - backend.MA((high_df + low_df + close_df) / 3, n)) / (
+            0.015 * backend.MA(np.abs(close_df - backend.MA((high_df + low_df + close_df) / 3, n)), n))
 
 
 def alpha191_79(close_df, n=12):
@@ -1184,7 +1182,8 @@ def alpha191_82(close_df, high_df, low_df, n1=6, n2=20):
     :param n2: default 20
     :return:
     """
-    return sma((ta.MAX(high_df, n1) - close_df) / (ta.MAX(high_df, n1) - ta.MIN(low_df, n1)) * 100, n2, 1)
+    return sma((backend.MAX(high_df, n1) - close_df) / (backend.MAX(high_df, n1) - backend.MIN(low_df, n1)) * 100,
+               n2, 1)
 
 
 def alpha191_83(high_df, volume_df, n=5):
@@ -1206,7 +1205,7 @@ def alpha191_84(close_df, volume_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.SUM(np.where(close_df > delay(close_df, 1), volume_df, np.where(close_df < delay(close_df, 1),
+    return backend.SUM(np.where(close_df > delay(close_df, 1), volume_df, np.where(close_df < delay(close_df, 1),
                                                                               -volume_df, 0)), n)
 
 
@@ -1219,7 +1218,7 @@ def alpha191_85(close_df, volume_df, n1=20, n2=8):
     :param n2: default 8
     :return:
     """
-    return tsrank(volume_df / ta.MA(volume_df, n1), n1) * tsrank(-1 * delta(close_df, 7), n2)
+    return tsrank(volume_df / backend.MA(volume_df, n1), n1) * tsrank(-1 * delta(close_df, 7), n2)
 
 
 def alpha191_86(close_df, n1=10, n2=20):
@@ -1287,7 +1286,7 @@ def alpha191_90(vwap_df, volume_df, n=5):
     :param n: default 5
     :return:
     """
-    return rank(ta.CORREL(rank(vwap_df), rank(volume_df), n)) * -1
+    return rank(backend.CORREL(rank(vwap_df), rank(volume_df), n)) * -1
 
 
 def alpha191_91(close_df, volume_df, low_df, n1=5, n2=40):
@@ -1300,7 +1299,8 @@ def alpha191_91(close_df, volume_df, low_df, n1=5, n2=40):
     :param n2: default 40
     :return:
     """
-    return (rank((close_df - ta.MAX(close_df, n1))) * rank(ta.CORREL(ta.MA(volume_df, n2), low_df, n1))) * -1
+    return (rank((close_df - backend.MAX(close_df, n1))) *
+            rank(backend.CORREL(backend.MA(volume_df, n2), low_df, n1))) * -1
 
 
 def alpha191_92(close_df, vwap_df, volume_df, n1=2, n2=3, n3=13, n4=5, n5=15):
@@ -1318,7 +1318,8 @@ def alpha191_92(close_df, vwap_df, volume_df, n1=2, n2=3, n3=13, n4=5, n5=15):
     :return:
     """
     return (np.maximum(rank(decaylinear(delta(close_df * 0.35 + vwap_df * 0.65, n1), n2)),
-                       tsrank(decaylinear(np.abs(ta.CORREL(ta.MA(volume_df, 180), close_df, n3)), n4), n5))) * -1
+                       tsrank(decaylinear(np.abs(backend.CORREL(backend.MA(volume_df, 180), close_df, n3)), n4),
+                              n5))) * -1
 
 
 def alpha191_93(open_df, low_df, n=20):
@@ -1329,8 +1330,8 @@ def alpha191_93(open_df, low_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.SUM(np.where(open_df >= delay(open_df, 1), 0, np.maximum(open_df - low_df, open_df - delay(open_df, 1))),
-                  n)
+    return backend.SUM(np.where(open_df >= delay(open_df, 1), 0,
+                                np.maximum(open_df - low_df, open_df - delay(open_df, 1))), n)
 
 
 def alpha191_94(close_df, volume_df, n=30):
@@ -1341,7 +1342,7 @@ def alpha191_94(close_df, volume_df, n=30):
     :param n: default 30
     :return:
     """
-    return ta.SUM(np.where(close_df > delay(close_df, 1), volume_df,
+    return backend.SUM(np.where(close_df > delay(close_df, 1), volume_df,
                            np.where(close_df < delay(close_df, 1), -volume_df, 0)), n)
 
 
@@ -1352,7 +1353,7 @@ def alpha191_95(amount_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.STDDEV(amount_df, n)
+    return backend.STDDEV(amount_df, n)
 
 
 def alpha191_96(close_df, high_df, low_df, n1=9, n2=3):
@@ -1365,8 +1366,8 @@ def alpha191_96(close_df, high_df, low_df, n1=9, n2=3):
     :param n2: default 3
     :return:
     """
-    return sma(sma((close_df - ta.MIN(low_df, n1)) / (ta.MAX(high_df, n1) - ta.MIN(low_df, n1)) * 100, n2),
-               n2)
+    return sma(sma((close_df - backend.MIN(low_df, n1)) / (backend.MAX(high_df, n1) - backend.MIN(low_df, n1)) * 100,
+                   n2), n2)
 
 
 def alpha191_97(volume_df, n=10):
@@ -1376,7 +1377,7 @@ def alpha191_97(volume_df, n=10):
     :param n: default 10
     :return:
     """
-    return ta.STDDEV(volume_df, n)
+    return backend.STDDEV(volume_df, n)
 
 
 def alpha191_98(close_df, n1=100, n2=100, n3=3):
@@ -1390,9 +1391,9 @@ def alpha191_98(close_df, n1=100, n2=100, n3=3):
     :param n3: default 3
     :return:
     """
-    return np.where(((delta(ta.SUM(close_df, n1) / n1, n1) / delay(close_df, n1)) < 0.05) |
-                    ((delta(ta.SUM(close_df, n1) / n1, n1) / delay(close_df, n1)) == 0.05),
-                    (-1 * (close_df - ta.MIN(close_df, n2))), (-1 * delta(close_df, n3)))
+    return np.where(((delta(backend.SUM(close_df, n1) / n1, n1) / delay(close_df, n1)) < 0.05) |
+                    ((delta(backend.SUM(close_df, n1) / n1, n1) / delay(close_df, n1)) == 0.05),
+                    (-1 * (close_df - backend.MIN(close_df, n2))), (-1 * delta(close_df, n3)))
 
 
 def alpha191_99(close_df, volume_df, n=5):
@@ -1413,7 +1414,7 @@ def alpha191_100(volume_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.STDDEV(volume_df, n)
+    return backend.STDDEV(volume_df, n)
 
 
 def alpha191_101(close_df, volume_df, high_df, vwap_df, n1=30, n2=37, n3=15, n4=11):
@@ -1431,8 +1432,8 @@ def alpha191_101(close_df, volume_df, high_df, vwap_df, n1=30, n2=37, n3=15, n4=
     :param n4: default 11
     :return:
     """
-    return np.where(rank(ta.CORREL(close_df, ta.SUM(ta.MA(volume_df, n1), n2), n3)) <
-                    rank(ta.CORREL(rank(high_df * 0.1 + vwap_df * 0.9), rank(volume_df), n4)), -1, 1)
+    return np.where(rank(backend.CORREL(close_df, backend.SUM(backend.MA(volume_df, n1), n2), n3)) <
+                    rank(backend.CORREL(rank(high_df * 0.1 + vwap_df * 0.9), rank(volume_df), n4)), -1, 1)
 
 
 def alpha191_102(volume_df, n=6):
@@ -1453,7 +1454,7 @@ def alpha191_103(low_df, n=20):
     :param n: default 20
     :return:
     """
-    return (n - ta.MININDEX(low_df, n)) / n * 100
+    return (n - lowday(low_df, n)) / n * 100
 
 
 def alpha191_104(close_df, high_df, volume_df, n=5, m=20):
@@ -1466,7 +1467,7 @@ def alpha191_104(close_df, high_df, volume_df, n=5, m=20):
     :param m: default 20
     :return:
     """
-    return -1 * (delta(ta.CORREL(high_df, volume_df, n), n) * rank(ta.STDDEV(close_df, m)))
+    return -1 * (delta(backend.CORREL(high_df, volume_df, n), n) * rank(backend.STDDEV(close_df, m)))
 
 
 def alpha191_105(open_df, volume_df, n=10):
@@ -1477,7 +1478,7 @@ def alpha191_105(open_df, volume_df, n=10):
     :param n: default 10
     :return:
     """
-    return -1 * ta.CORREL(rank(open_df), rank(volume_df), n)
+    return -1 * backend.CORREL(rank(open_df), rank(volume_df), n)
 
 
 def alpha191_106(close_df, n=20):
@@ -1513,7 +1514,8 @@ def alpha191_108(high_df, vwap_df, volume_df, n=6, m=120):
     :param m: default 120
     :return:
     """
-    return np.power(rank(high_df - ta.MIN(high_df, 2)), rank(ta.CORREL(vwap_df, ta.MA(volume_df, m), n))) * -1
+    return np.power(rank(high_df - backend.MIN(high_df, 2)),
+                    rank(backend.CORREL(vwap_df, backend.MA(volume_df, m), n))) * -1
 
 
 def alpha191_109(high_df, low_df, n=10, m=2):
@@ -1537,8 +1539,8 @@ def alpha191_110(close_df, high_df, low_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.SUM(np.maximum(0, high_df - delay(close_df, 1)), n) / ta.SUM(np.maximum(0, delay(close_df, 1) - low_df),
-                                                                           n) * 100
+    return backend.SUM(np.maximum(0, high_df - delay(close_df, 1)), n) / \
+        backend.SUM(np.maximum(0, delay(close_df, 1) - low_df), n) * 100
 
 
 def alpha191_111(close_df, low_df, high_df, volume_df, n=11, m=2):
@@ -1567,10 +1569,10 @@ def alpha191_112(close_df, n=12):
     :param n: default 12
     :return:
     """
-    return (ta.SUM(np.where(close_df - delay(close_df, 1) > 0, close_df - delay(close_df, 1), 0), n) - ta.SUM(
+    return (backend.SUM(np.where(close_df - delay(close_df, 1) > 0, close_df - delay(close_df, 1), 0), n) - backend.SUM(
         np.where(close_df - delay(close_df, 1) < 0, np.abs(close_df - delay(close_df, 1)), 0), n)) / (
-            ta.SUM(np.where(close_df - delay(close_df, 1) > 0, close_df - delay(close_df, 1), 0),
-                   n) + ta.SUM(np.where(close_df - delay(close_df, 1) < 0,
+            backend.SUM(np.where(close_df - delay(close_df, 1) > 0, close_df - delay(close_df, 1), 0),
+                   n) + backend.SUM(np.where(close_df - delay(close_df, 1) < 0,
                                         np.abs(close_df - delay(close_df, 1)), 0), n)) * 100
 
 
@@ -1584,8 +1586,8 @@ def alpha191_113(close_df, volume_df, n=5, m=20):
     :param m: default 20
     :return:
     """
-    return -1 * ((rank(ta.SUM(delay(close_df, n), m) / m) * ta.CORREL(close_df, volume_df, 2)) * rank(
-        ta.CORREL(ta.SUM(close_df, n), ta.SUM(close_df, m), 2)))
+    return -1 * ((rank(backend.SUM(delay(close_df, n), m) / m) * backend.CORREL(close_df, volume_df, 2)) * rank(
+        backend.CORREL(backend.SUM(close_df, n), backend.SUM(close_df, m), 2)))
 
 
 def alpha191_114(close_df, high_df, low_df, volume_df, vwap_df, n=5):
@@ -1600,8 +1602,8 @@ def alpha191_114(close_df, high_df, low_df, volume_df, vwap_df, n=5):
     :param n: default 5
     :return:
     """
-    return (rank(delay((high_df - low_df) / (ta.SUM(close_df, n) / n), 2)) * rank(
-        rank(volume_df))) / (((high_df - low_df) / (ta.SUM(close_df, n) / n)) / (vwap_df - close_df))
+    return (rank(delay((high_df - low_df) / (backend.SUM(close_df, n) / n), 2)) * rank(
+        rank(volume_df))) / (((high_df - low_df) / (backend.SUM(close_df, n) / n)) / (vwap_df - close_df))
 
 
 def alpha191_115(close_df, high_df, low_df, volume_df, n=30, m=10):
@@ -1617,8 +1619,8 @@ def alpha191_115(close_df, high_df, low_df, volume_df, n=30, m=10):
     :param m: default 10
     :return:
     """
-    return (rank(ta.CORREL(((high_df * 0.9) + (close_df * 0.1)), ta.MA(volume_df, n), m)) ** rank(
-        ta.CORREL(tsrank(((high_df + low_df) / 2), 4), tsrank(volume_df, 10), 7)))
+    return (rank(backend.CORREL(((high_df * 0.9) + (close_df * 0.1)), backend.MA(volume_df, n), m)) ** rank(
+        backend.CORREL(tsrank(((high_df + low_df) / 2), 4), tsrank(volume_df, 10), 7)))
 
 
 def alpha191_116(close_df, n=20):
@@ -1656,7 +1658,7 @@ def alpha191_118(open_df, high_df, low_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.SUM(high_df - open_df, n) / ta.SUM(open_df - low_df, n) * 100
+    return backend.SUM(high_df - open_df, n) / backend.SUM(open_df - low_df, n) * 100
 
 
 def alpha191_119(open_df, vwap_df, volume_df, n=5, m=26):
@@ -1671,8 +1673,9 @@ def alpha191_119(open_df, vwap_df, volume_df, n=5, m=26):
     :param m: default 26
     :return:
     """
-    return (rank(decaylinear(ta.CORREL(vwap_df, ta.SUM(ta.MA(volume_df, n), m), 5), 7)) -
-            rank(decaylinear(tsrank(np.minimum(ta.CORREL(rank(open_df), rank(ta.MA(volume_df, 15)), 21), 9), 7), 8)))
+    return (rank(decaylinear(backend.CORREL(vwap_df, backend.SUM(backend.MA(volume_df, n), m), 5), 7)) -
+            rank(decaylinear(tsrank(np.minimum(backend.CORREL(rank(open_df), rank(backend.MA(volume_df, 15)), 21), 9),
+                                    7), 8)))
 
 
 def alpha191_120(close_df, vwap_df):
@@ -1696,7 +1699,7 @@ def alpha191_121(volume_df, vwap_df, n=20, m=60):
     :return:
     """
     return ((rank((vwap_df - np.minimum(vwap_df, 12))) ** tsrank(
-        ta.CORREL(tsrank(vwap_df, n), tsrank(ta.MA(volume_df, m), 2), 18), 3)) * -1)
+        backend.CORREL(tsrank(vwap_df, n), tsrank(backend.MA(volume_df, m), 2), 18), 3)) * -1)
 
 
 def alpha191_122(close_df, n=13):
@@ -1723,8 +1726,9 @@ def alpha191_123(high_df, low_df, volume_df, n=20, m=60):
     :param m: default 60
     :return:
     """
-    return ((rank(ta.CORREL(ta.SUM(((high_df + low_df) / 2), n), ta.SUM(ta.MA(volume_df, m), n), 9)) <
-             rank(ta.CORREL(low_df, volume_df, 6))) * -1)
+    return ((rank(backend.CORREL(backend.SUM(((high_df + low_df) / 2), n), backend.SUM(backend.MA(volume_df, m), n),
+                                 9)) <
+             rank(backend.CORREL(low_df, volume_df, 6))) * -1)
 
 
 def alpha191_124(close_df, vwamp_df, n=30):
@@ -1735,7 +1739,7 @@ def alpha191_124(close_df, vwamp_df, n=30):
     :param n: default 30
     :return:
     """
-    return (close_df - vwamp_df) / decaylinear(rank(ta.MAX(close_df, n)), 2)
+    return (close_df - vwamp_df) / decaylinear(rank(backend.MAX(close_df, n)), 2)
 
 
 def alpha191_125(close_df, volume_df, vwap_df, n=17, m=20):
@@ -1750,7 +1754,7 @@ def alpha191_125(close_df, volume_df, vwap_df, n=17, m=20):
     :param m: default 20
     :return:
     """
-    return (rank(decaylinear(ta.CORREL(vwap_df, ta.MA(volume_df, 80), n), m)) /
+    return (rank(decaylinear(backend.CORREL(vwap_df, backend.MA(volume_df, 80), n), m)) /
             rank(decaylinear(delta(((close_df * 0.5) + (vwap_df * 0.5)), 3), 16)))
 
 
@@ -1772,7 +1776,7 @@ def alpha191_127(close_df, n=12):
     :param n: default 12
     :return:
     """
-    return np.sqrt(ta.MA((100 * (close_df - ta.MAX(close_df, n)) / (ta.MAX(close_df, n))) ** 2, n))
+    return np.sqrt(backend.MA((100 * (close_df - backend.MAX(close_df, n)) / (backend.MAX(close_df, n))) ** 2, n))
 
 
 def alpha191_128(close_df, high_df, low_df, volume_df, n=14):
@@ -1786,10 +1790,10 @@ def alpha191_128(close_df, high_df, low_df, volume_df, n=14):
     :param n: default 14
     :return:
     """
-    return 100 - (100 / (1 + ta.SUM(((high_df + low_df + close_df) / 3 > delay((high_df + low_df + close_df) / 3, 1))
-                                    * volume_df, n) / ta.SUM(((high_df + low_df + close_df) / 3
-                                                              < delay((high_df + low_df + close_df) / 3,
-                                                                      1)) * volume_df, n)))
+    return 100 - (100 / (1 + backend.SUM(((high_df + low_df + close_df) / 3 >
+                                          delay((high_df + low_df + close_df) / 3, 1)) * volume_df, n) /
+                         backend.SUM(((high_df + low_df + close_df) / 3 <
+                                      delay((high_df + low_df + close_df) / 3, 1)) * volume_df, n)))
 
 
 def alpha191_129(close_df, n=12):
@@ -1799,7 +1803,7 @@ def alpha191_129(close_df, n=12):
     :param n: default 12
     :return:
     """
-    return ta.SUM(np.where(close_df - delay(close_df, 1) < 0, np.abs(close_df - delay(close_df, 1)), 0), n)
+    return backend.SUM(np.where(close_df - delay(close_df, 1) < 0, np.abs(close_df - delay(close_df, 1)), 0), n)
 
 
 def alpha191_130(high_df, low_df, volume_df, vwap_df, n=9, m=10, k=7, l=3):
@@ -1817,8 +1821,8 @@ def alpha191_130(high_df, low_df, volume_df, vwap_df, n=9, m=10, k=7, l=3):
     :param l: default 3
     :return:
     """
-    return (rank(decaylinear(ta.CORREL(((high_df + low_df) / 2), ta.MA(volume_df, 40), n), m)) /
-            rank(decaylinear(ta.CORREL(rank(vwap_df), rank(volume_df), k), l)))
+    return (rank(decaylinear(backend.CORREL(((high_df + low_df) / 2), backend.MA(volume_df, 40), n), m)) /
+            rank(decaylinear(backend.CORREL(rank(vwap_df), rank(volume_df), k), l)))
 
 
 def alpha191_131(close_df, volume_df, vwap_df, n=18, m=18):
@@ -1831,7 +1835,7 @@ def alpha191_131(close_df, volume_df, vwap_df, n=18, m=18):
     :param m: default 18
     :return:
     """
-    return rank(delta(vwap_df, 1)) ** tsrank(ta.CORREL(close_df, ta.MA(volume_df, 50), n), m)
+    return rank(delta(vwap_df, 1)) ** tsrank(backend.CORREL(close_df, backend.MA(volume_df, 50), n), m)
 
 
 def alpha191_132(amount_df, n=20):
@@ -1841,7 +1845,7 @@ def alpha191_132(amount_df, n=20):
     :param n: default 20
     :return:
     """
-    return ta.MA(amount_df, n)
+    return backend.MA(amount_df, n)
 
 
 def alpha191_133(high_df, low_df, n=20):
@@ -1852,7 +1856,7 @@ def alpha191_133(high_df, low_df, n=20):
     :param n: default 20
     :return:
     """
-    return ((n - ta.MAXINDEX(high_df, n)) / n) * 100 - ((n - ta.MININDEX(low_df, n)) / n) * 100
+    return ((n - highday(high_df, n)) / n) * 100 - ((n - lowday(low_df, n)) / n) * 100
 
 
 def alpha191_134(close_df, volume_df, n=12):
@@ -1884,7 +1888,7 @@ def alpha191_136(open_df, volume_df, n=10):
     :param n: default 10
     :return:
     """
-    return -1 * rank(delta(open_df, 3)) * ta.CORREL(open_df, volume_df, n)
+    return -1 * rank(delta(open_df, 3)) * backend.CORREL(open_df, volume_df, n)
 
 
 def alpha191_137(open_df, close_df, high_df, low_df):
@@ -1907,18 +1911,17 @@ def alpha191_137(open_df, close_df, high_df, low_df):
     delay_open = delay(open_df, 1)
     delay_low = delay(low_df, 1)
 
-    abs_high_close = np.abs(high_df - delay_close)
-    abs_low_close = np.abs(low_df - delay_close)
-    abs_high_low = np.abs(high_df - delay_low)
-
-    cond1 = (abs_high_close > abs_low_close) & (abs_high_close > abs_high_low)
-    cond2 = (abs_low_close > abs_high_low) & (abs_low_close > abs_high_close)
-
-    numerator = 16 * (close_df - delay_close + (close_df - open_df) / 2 + delay_close - delay_open)
-    denominator = np.where(cond1, abs_high_close + abs_low_close / 2 + np.abs(delay_close - delay_open) / 4,
-                           np.where(cond2, abs_low_close + abs_high_close / 2 + np.abs(delay_close - delay_open) / 4,
-                                    abs_high_low + np.abs(delay_close - delay_open) / 4))
-    result = numerator / denominator * np.maximum(abs_high_close, abs_low_close)
+    # 其余部分全部为逐元素运算，融合为一个内核分块计算
+    result = fused(
+        '16 * (close - delay_close + (close - open) / 2 + delay_close - delay_open)'
+        ' / ((ABS(high - delay_close) > ABS(low - delay_close) & ABS(high - delay_close) > ABS(high - delay_low))'
+        ' ? ABS(high - delay_close) + ABS(low - delay_close) / 2 + ABS(delay_close - delay_open) / 4'
+        ' : ((ABS(low - delay_close) > ABS(high - delay_low) & ABS(low - delay_close) > ABS(high - delay_close))'
+        ' ? ABS(low - delay_close) + ABS(high - delay_close) / 2 + ABS(delay_close - delay_open) / 4'
+        ' : ABS(high - delay_low) + ABS(delay_close - delay_open) / 4))'
+        ' * MAX(ABS(high - delay_close), ABS(low - delay_close))',
+        close=close_df, open=open_df, high=high_df, low=low_df, delay_close=delay_close, delay_open=delay_open,
+        delay_low=delay_low)
     return result
 
 
@@ -1939,9 +1942,9 @@ def alpha191_138(close_df, volume_df, vwap_df, n=20):
     rank_df = rank(decay_df)
 
     tsrank_df = tsrank(low_df, 8)
-    mean_df = ta.MA(volume_df, 60)
+    mean_df = backend.MA(volume_df, 60)
     tsrank_df1 = tsrank(mean_df, 17)
-    corr_df = ta.CORREL(tsrank_df, tsrank_df1, 5)
+    corr_df = backend.CORREL(tsrank_df, tsrank_df1, 5)
     tsrank_df2 = tsrank(corr_df, 19)
     decay_df1 = decaylinear(tsrank_df2, 16)
     tsrank_df3 = tsrank(decay_df1, 7)
@@ -1957,7 +1960,7 @@ def alpha191_139(open_df, volume_df, n=10):
     :param n: default 10
     :return:
     """
-    return -1 * ta.CORREL(open_df, volume_df, n)
+    return -1 * backend.CORREL(open_df, volume_df, n)
 
 
 def alpha191_140(open_df, close_df, high_df, low_df, volume_df, n=8):
@@ -1985,9 +1988,9 @@ def alpha191_140(open_df, close_df, high_df, low_df, volume_df, n=8):
     rank_decay_df = rank(decay_df)
 
     tsrank_close_df = tsrank(close_df, 8)
-    mean_volume_df = ta.MA(volume_df, 60)
+    mean_volume_df = backend.MA(volume_df, 60)
     tsrank_mean_volume_df = tsrank(mean_volume_df, 20)
-    corr_df = ta.CORREL(tsrank_close_df, tsrank_mean_volume_df, 8)
+    corr_df = backend.CORREL(tsrank_close_df, tsrank_mean_volume_df, 8)
     decay_df1 = decaylinear(corr_df, 7)
     tsrank_decay_df1 = tsrank(decay_df1, 3)
 
@@ -2003,9 +2006,9 @@ def alpha191_141(high_df, volume_df, n=9):
     :return:
     """
     rank_high_df = rank(high_df)
-    mean_volume_df = ta.MA(volume_df, 15)
+    mean_volume_df = backend.MA(volume_df, 15)
     rank_mean_volume_df = rank(mean_volume_df)
-    corr_df = ta.CORREL(rank_high_df, rank_mean_volume_df, n)
+    corr_df = backend.CORREL(rank_high_df, rank_mean_volume_df, n)
     rank_corr_df = rank(corr_df)
 
     return rank_corr_df * -1
@@ -2030,7 +2033,7 @@ def alpha191_142(close_df, volume_df, n1=10, n2=1, n3=5):
     delta_delta_close_df = delta(delta_close_df, n2)
     rank_delta_delta_close_df = rank(delta_delta_close_df)
 
-    mean_volume_df = ta.MA(volume_df, 20)
+    mean_volume_df = backend.MA(volume_df, 20)
     volume_mean_volume_df = volume_df / mean_volume_df
     tsrank_volume_mean_volume_df = tsrank(volume_mean_volume_df, n3)
     rank_tsrank_volume_mean_volume_df = rank(tsrank_volume_mean_volume_df)
@@ -2044,15 +2047,10 @@ def alpha191_143(close_df):
     :param close_df:
     :return:
     """
-    close_df1 = np.zeros_like(close_df)
-    start_index = close_df.index[0] + 1
-    for i in range(start_index, len(close_df)):
-        if close_df[i] > close_df[i - 1]:
-            close_df1[i] = (close_df[i] - close_df[i - 1]) / close_df[i - 1] * close_df1[i - 1]
-        else:
-            close_df1[i] = close_df1[i - 1]
-
-    return close_df1
+    delay_close = delay(close_df, 1)
+    # SELF 以 1 为初值，上涨时乘以涨幅，否则保持不变
+    factor = np.where(close_df > delay_close, (close_df - delay_close) / delay_close, 1)
+    return cumprod(factor)
 
 
 def alpha191_144(close_df, amount_df, n=20):
@@ -2084,9 +2082,9 @@ def alpha191_145(volume_df, n1=9, n2=26, n3=12):
     :param n3: default 12
     :return:
     """
-    mean_volume_df1 = ta.MA(volume_df, n1)
-    mean_volume_df2 = ta.MA(volume_df, n2)
-    mean_volume_df3 = ta.MA(volume_df, n3)
+    mean_volume_df1 = backend.MA(volume_df, n1)
+    mean_volume_df2 = backend.MA(volume_df, n2)
+    mean_volume_df3 = backend.MA(volume_df, n3)
 
     return (mean_volume_df1 - mean_volume_df2) / mean_volume_df3 * 100
 
@@ -2113,7 +2111,7 @@ def alpha191_146(close_df, n1=20, n2=61, n3=60, m=2):
     diff = close_diff_ratio - sma_diff_ratio
     sma_diff_squared = sma(diff ** 2, n3)
 
-    result = ta.MA(diff * diff / sma_diff_squared, n1)
+    result = backend.MA(diff * diff / sma_diff_squared, n1)
 
     return result
 
@@ -2137,14 +2135,14 @@ def alpha191_148(open_df, volume_df, n1=6, n2=14):
     :param n2: default 14
     :return:
     """
-    mean_volume_df = ta.MA(volume_df, 60)
-    sum_mean_volume_df = sum(mean_volume_df, 9)
+    mean_volume_df = backend.MA(volume_df, 60)
+    sum_mean_volume_df = backend.SUM(mean_volume_df, 9)
 
-    # corr_result = ta.CORREL(open_df, sum_mean_volume_df, n1)
+    # corr_result = backend.CORREL(open_df, sum_mean_volume_df, n1)
     # corr_rank = rank(corr_result)
 
     open_shifted = delay(open_df, 1)
-    open_min = ta.MIN(open_df, n2)
+    open_min = backend.MIN(open_df, n2)
 
     open_condition = open_df < open_shifted
     open_min_condition = open_df < open_min
@@ -2169,9 +2167,9 @@ def alpha191_149(close_df, benchmark_close_df, close_ret_df=None, benchmark_clos
     :return:
     """
     # 计算收盘价的日收益率
-    ret_close = close_ret_df if close_ret_df is not None else close_df.pct_change(1)
+    ret_close = close_ret_df if close_ret_df is not None else ret(close_df, 1)
     # 计算基准指数收盘价的日收益率
-    ret_index = benchmark_close_ret_df if benchmark_close_ret_df is not None else benchmark_close_df.pct_change(1)
+    ret_index = benchmark_close_ret_df if benchmark_close_ret_df is not None else ret(benchmark_close_df, 1)
     # 过滤出基准指数收盘价下跌的日收益率
     ret_close_filtered = filter_cond(ret_close, ret_index < 0)
     ret_index_filtered = filter_cond(ret_index, ret_index < 0)
@@ -2223,10 +2221,10 @@ def alpha191_152(close_df, n=9, m=12, l=26):
     sma_close_ratio = sma(close_ratio_shifted, n, 1)
 
     sma_close_ratio_shifted = delay(sma_close_ratio, 1)
-    sma_close_ratio_mean = ta.MA(sma_close_ratio_shifted, m)
+    sma_close_ratio_mean = backend.MA(sma_close_ratio_shifted, m)
 
     sma_close_ratio_mean_shifted = delay(sma_close_ratio_mean, 1)
-    sma_close_ratio_mean_mean = ta.MA(sma_close_ratio_mean_shifted, l)
+    sma_close_ratio_mean_mean = backend.MA(sma_close_ratio_mean_shifted, l)
 
     return sma_close_ratio_mean - sma_close_ratio_mean_mean
 
@@ -2237,10 +2235,10 @@ def alpha191_153(close_df):
     :param close_df:
     :return:
     """
-    mean3 = ta.MA(close_df, 3)
-    mean6 = ta.MA(close_df, 6)
-    mean12 = ta.MA(close_df, 12)
-    mean24 = ta.MA(close_df, 24)
+    mean3 = backend.MA(close_df, 3)
+    mean6 = backend.MA(close_df, 6)
+    mean12 = backend.MA(close_df, 12)
+    mean24 = backend.MA(close_df, 24)
 
     return (mean3 + mean6 + mean12 + mean24) / 4
 
@@ -2255,14 +2253,14 @@ def alpha191_154(vwap_df, volume_df, n=180, m=16, l=18):
     :param l: default 18
     :return:
     """
-    vwap_min = ta.MIN(vwap_df, m)
+    vwap_min = backend.MIN(vwap_df, m)
     vwap_min_shifted = delay(vwap_min, 1)
     vwap_diff = vwap_df - vwap_min_shifted
 
-    volume_mean = ta.MA(volume_df, n)
+    volume_mean = backend.MA(volume_df, n)
     volume_mean_shifted = delay(volume_mean, 1)
 
-    return ta.CORREL(vwap_diff, volume_mean_shifted, l)
+    return backend.CORREL(vwap_diff, volume_mean_shifted, l)
 
 
 def alpha191_155(volume_df, n=13, m=27, l=10):
@@ -2322,11 +2320,11 @@ def alpha191_157(close_df, high_df, volume_df, vwap_df, n=30, m=37):
     :param m: default 20
     :return:
     """
-    volume_mean = ta.MA(volume_df, n)
-    volume_mean_sum = ta.SUM(volume_mean, m)
+    volume_mean = backend.MA(volume_df, n)
+    volume_mean_sum = backend.SUM(volume_mean, m)
     volume_mean_sum_shifted = delay(volume_mean_sum, 1)
 
-    corr1 = ta.CORREL(close_df, volume_mean_sum_shifted, 15)
+    corr1 = backend.CORREL(close_df, volume_mean_sum_shifted, 15)
     corr1_rank = rank(corr1)
 
     high_vwap = high_df * 0.1 + vwap_df * 0.9
@@ -2334,7 +2332,7 @@ def alpha191_157(close_df, high_df, volume_df, vwap_df, n=30, m=37):
 
     volume_rank = rank(volume_df)
 
-    corr2 = ta.CORREL(high_vwap_rank, volume_rank, 11)
+    corr2 = backend.CORREL(high_vwap_rank, volume_rank, 11)
     corr2_rank = rank(corr2)
 
     return corr1_rank < corr2_rank
@@ -2373,12 +2371,12 @@ def alpha191_159(close_df, high_df, low_df, n=6, m=12, l=24):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = (close_df - ta.SUM(np.minimum(low_df, delay(close_df, 1)), n)) / \
-            ta.SUM(np.maximum(high_df, delay(close_df, 1)) - np.minimum(low_df, delay(close_df, 1)), n)
-    part2 = (close_df - ta.SUM(np.minimum(low_df, delay(close_df, 1)), m)) / \
-            ta.SUM(np.maximum(high_df, delay(close_df, 1)) - np.minimum(low_df, delay(close_df, 1)), m)
-    part3 = (close_df - ta.SUM(np.minimum(low_df, delay(close_df, 1)), l)) / \
-            ta.SUM(np.maximum(high_df, delay(close_df, 1)) - np.minimum(low_df, delay(close_df, 1)), l)
+    part1 = (close_df - backend.SUM(np.minimum(low_df, delay(close_df, 1)), n)) / \
+            backend.SUM(np.maximum(high_df, delay(close_df, 1)) - np.minimum(low_df, delay(close_df, 1)), n)
+    part2 = (close_df - backend.SUM(np.minimum(low_df, delay(close_df, 1)), m)) / \
+            backend.SUM(np.maximum(high_df, delay(close_df, 1)) - np.minimum(low_df, delay(close_df, 1)), m)
+    part3 = (close_df - backend.SUM(np.minimum(low_df, delay(close_df, 1)), l)) / \
+            backend.SUM(np.maximum(high_df, delay(close_df, 1)) - np.minimum(low_df, delay(close_df, 1)), l)
 
     # 计算最终结果并乘以100
     result = (part1 * m * l + part2 * n * l + part3 * n * l) * 100 / (n * m + n * l + m * l)
@@ -2395,7 +2393,7 @@ def alpha191_160(close_df, n=20, m=1):
     :param m: default 1
     :return:
     """
-    close_std = ta.STDDEV(close_df, n)
+    close_std = backend.STDDEV(close_df, n)
     close_std_shifted = delay(close_std, 1)
 
     close_le_close_shifted = close_df <= close_std_shifted
@@ -2418,7 +2416,7 @@ def alpha191_161(close_df, high_df, low_df, n=12):
     part3 = np.abs(delay(close_df, 1) - low_df)
 
     # 计算最终结果
-    result = ta.MA(np.maximum(np.maximum(part1, part2), part3), n)
+    result = backend.MA(np.maximum(np.maximum(part1, part2), part3), n)
 
     # 返回结果
     return result
@@ -2441,8 +2439,8 @@ def alpha191_162(close_df, n=12, m=1):
     part2 = sma(np.abs(close_df - delay(close_df, 1)), n, m)
 
     # 计算最终结果
-    result = (part1 / part2 * 100 - ta.MIN(part1 / part2 * 100, n)) / \
-             (ta.MAX(part1 / part2 * 100, n) - ta.MIN(part1 / part2 * 100, n))
+    result = (part1 / part2 * 100 - backend.MIN(part1 / part2 * 100, n)) / \
+             (backend.MAX(part1 / part2 * 100, n) - backend.MIN(part1 / part2 * 100, n))
 
     # 返回结果
     return result
@@ -2460,7 +2458,7 @@ def alpha191_163(close_df, volume_df, vwap_df, high_df, n=20):
     """
     # 计算公式中的各个部分
     part1 = -1 * ret(close_df)
-    part2 = ta.MA(volume_df, n)
+    part2 = backend.MA(volume_df, n)
     part3 = vwap_df
     part4 = high_df - close_df
 
@@ -2485,7 +2483,7 @@ def alpha191_164(close_df, high_df, low_df, l=12, n=13, m=2):
     """
     # 计算公式中的各个部分
     part1 = (close_df > delay(close_df, 1)) / (close_df - delay(close_df, 1))
-    part2 = ta.MIN((close_df > delay(close_df, 1)) / (close_df - delay(close_df, 1)), l)
+    part2 = backend.MIN((close_df > delay(close_df, 1)) / (close_df - delay(close_df, 1)), l)
     part3 = high_df - low_df
 
     # 计算最终结果
@@ -2504,11 +2502,11 @@ def alpha191_165(close_df, n=48):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = ta.SUM(close_df - ta.MA(close_df, n))
-    part2 = ta.STDDEV(close_df, n)
+    part1 = backend.SUM(close_df - backend.MA(close_df, n))
+    part2 = backend.STDDEV(close_df, n)
 
     # 计算最终结果
-    result = ta.MAX(part1, n) - ta.MIN(part1, n) / part2
+    result = backend.MAX(part1, n) - backend.MIN(part1, n) / part2
 
     # 返回结果
     return result
@@ -2524,11 +2522,11 @@ def alpha191_166(close_df, n=20):
     """
     # 计算公式中的各个部分
     part1 = close_df / delay(close_df, 1) - 1
-    part2 = ta.MA(close_df / delay(close_df, 1) - 1, n)
-    part3 = ta.SUM(close_df / delay(close_df, 1), 20) ** 2
+    part2 = backend.MA(close_df / delay(close_df, 1) - 1, n)
+    part3 = backend.SUM(close_df / delay(close_df, 1), 20) ** 2
 
     # 计算最终结果
-    result = -20 * (n - 1) ** 1.5 * ta.SUM(part1 - part2, n) / ((n - 1) * (n - 2) * part3 ** 1.5)
+    result = -20 * (n - 1) ** 1.5 * backend.SUM(part1 - part2, n) / ((n - 1) * (n - 2) * part3 ** 1.5)
 
     # 返回结果
     return result
@@ -2545,7 +2543,7 @@ def alpha191_167(close_df, n=12):
     part1 = close_df - delay(close_df, 1)
 
     # 计算最终结果
-    result = ta.SUM(np.where(part1 > 0, part1, 0), n)
+    result = backend.SUM(np.where(part1 > 0, part1, 0), n)
 
     # 返回结果
     return result
@@ -2562,7 +2560,7 @@ def alpha191_168(volume_df, n=20):
     part1 = volume_df
 
     # 计算最终结果
-    result = -1 * part1 / ta.MA(part1, n)
+    result = -1 * part1 / backend.MA(part1, n)
 
     # 返回结果
     return result
@@ -2603,8 +2601,8 @@ def alpha191_170(close_df, volume_df, high_df, vwap_df, n=5):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = rank(1 / close_df) * volume_df / ta.MA(volume_df, 20)
-    part2 = high_df * rank(high_df - close_df) / (ta.SUM(high_df, n) / n)
+    part1 = rank(1 / close_df) * volume_df / backend.MA(volume_df, 20)
+    part2 = high_df * rank(high_df - close_df) / (backend.SUM(high_df, n) / n)
     part3 = rank(vwap_df - delay(vwap_df, n))
 
     # 计算最终结果
@@ -2646,17 +2644,18 @@ def alpha191_172(close_df, high_df, low_df, n=14):
     :param n: default 14
     :return:
     """
-    trange = ta.TRANGE(high_df, low_df, close_df)
-    low_change = get_ld(low_df)
-    high_change = get_hd(high_df)
+    dm = movement(high_df=high_df, low_df=low_df, close_df=close_df)
+    trange = dm['tr']
+    low_change = dm['ld']
+    high_change = dm['hd']
     # 计算公式中的各个部分
     part1 = np.where((low_change > 0) & (low_change > high_change), low_change, 0)  # 选择满足条件的low_change，否则为0
     part2 = np.where((high_change > 0) & (high_change > low_change), high_change, 0)  # 选择满足条件的high_change，否则为0
-    part3 = ta.SUM(part1, n) * 100 / ta.SUM(trange, n)  # 计算part1在n天内的累加值占tr在n天内的累加值的百分比
-    part4 = ta.SUM(part2, n) * 100 / ta.SUM(trange, n)  # 计算part2在n天内的累加值占tr在n天内的累加值的百分比
+    part3 = backend.SUM(part1, n) * 100 / backend.SUM(trange, n)  # 计算part1在n天内的累加值占tr在n天内的累加值的百分比
+    part4 = backend.SUM(part2, n) * 100 / backend.SUM(trange, n)  # 计算part2在n天内的累加值占tr在n天内的累加值的百分比
 
     # 计算最终结果
-    result = ta.MA(np.abs(part3 - part4) / (part3 + part4) * 100, 6)
+    result = backend.MA(np.abs(part3 - part4) / (part3 + part4) * 100, 6)
 
     # 返回结果
     return result
@@ -2689,7 +2688,7 @@ def alpha191_174(close_df, n=20):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = np.where(close_df > delay(close_df, 1), ta.STDDEV(close_df, n), 0)
+    part1 = np.where(close_df > delay(close_df, 1), backend.STDDEV(close_df, n), 0)
 
     # 计算最终结果
     result = sma(part1, n, 1)
@@ -2713,7 +2712,7 @@ def alpha191_175(close_df, high_df, low_df, n=6):
     part3 = np.maximum(part1, part2)
 
     # 计算最终结果
-    result = ta.MA(part3, n)
+    result = backend.MA(part3, n)
 
     # 返回结果
     return result
@@ -2731,12 +2730,12 @@ def alpha191_176(close_df, high_df, low_df, volume_df, n=12, m=6):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = (close_df - ta.MIN(low_df, n)) / (ta.MAX(high_df, n) - ta.MIN(low_df, n))
+    part1 = (close_df - backend.MIN(low_df, n)) / (backend.MAX(high_df, n) - backend.MIN(low_df, n))
     part2 = rank(part1)
     part3 = rank(volume_df)
 
     # 计算最终结果
-    result = ta.CORREL(part2, part3, m)
+    result = backend.CORREL(part2, part3, m)
 
     # 返回结果
     return result
@@ -2750,7 +2749,7 @@ def alpha191_177(high_df, n=20):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = n - ta.MAXINDEX(high_df, n)
+    part1 = n - highday(high_df, n)
 
     # 计算最终结果
     result = part1 / n * 100
@@ -2767,7 +2766,7 @@ def alpha191_178(close_df, n=20):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = n - ta.MININDEX(close_df, n)
+    part1 = n - lowday(close_df, n)
 
     # 计算最终结果
     result = part1 / n * 100
@@ -2788,8 +2787,8 @@ def alpha191_179(volume_df, vwap_df, low_df, n=50, m=4, l=12):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = rank(ta.CORREL(vwap_df, volume_df, m))
-    part2 = rank(ta.CORREL(rank(low_df), rank(ta.MA(volume_df, n)), l))
+    part1 = rank(backend.CORREL(vwap_df, volume_df, m))
+    part2 = rank(backend.CORREL(rank(low_df), rank(backend.MA(volume_df, n)), l))
 
     # 计算最终结果
     result = part1 * part2
@@ -2809,7 +2808,7 @@ def alpha191_180(close_df, volume_df, n=20, m=7):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = ta.MA(volume_df, n)
+    part1 = backend.MA(volume_df, n)
     part2 = np.where(part1 < volume_df, -1 * tsrank(np.abs(delta(close_df, m)), 60) * np.sign(delta(close_df, m)),
                      -1 * volume_df)
 
@@ -2828,12 +2827,12 @@ def alpha191_181(close_df, benchmark_close_df, n=20):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = ((close_df / delay(close_df, 1) - 1) - ta.MA((close_df / delay(close_df, 1) - 1), n)) - (
-            benchmark_close_df - ta.MA(benchmark_close_df, n)) ** 2
-    part2 = (benchmark_close_df - ta.MA(benchmark_close_df, n)) ** 3
+    part1 = ((close_df / delay(close_df, 1) - 1) - backend.MA((close_df / delay(close_df, 1) - 1), n)) - (
+            benchmark_close_df - backend.MA(benchmark_close_df, n)) ** 2
+    part2 = (benchmark_close_df - backend.MA(benchmark_close_df, n)) ** 3
 
     # 计算最终结果
-    result = sum(part1, n) / sum(part2, n)
+    result = backend.SUM(part1, n) / backend.SUM(part2, n)
 
     # 返回结果
     return result
@@ -2870,15 +2869,15 @@ def alpha191_183(close_df, n=24):
     :return:
     """
     # 计算CLOSE和它的24天平均值的差值
-    diff = close_df - ta.MA(close_df, n)
+    diff = close_df - backend.MA(close_df, n)
     # 计算diff的累加值
-    sumac = ta.SUM(np.abs(diff), n)
+    sumac = backend.SUM(np.abs(diff), n)
     # 计算sumac的最大值和最小值
-    max_sumac = ta.MAX(sumac, n)
-    min_sumac = ta.MIN(sumac, n)
+    max_sumac = backend.MAX(sumac, n)
+    min_sumac = backend.MIN(sumac, n)
 
     # 计算CLOSE的24天标准差
-    std_close = ta.STDDEV(close_df, n)
+    std_close = backend.STDDEV(close_df, n)
     # 计算最终结果
     result = (max_sumac - min_sumac) / std_close
     # 返回结果
@@ -2894,7 +2893,7 @@ def alpha191_184(close_df, open_df, n=200):
     :return:
     """
     # 计算公式中的各个部分
-    part1 = rank(ta.CORREL(delay(open_df - close_df, 1), close_df, n))
+    part1 = rank(backend.CORREL(delay(open_df - close_df, 1), close_df, n))
     part2 = rank(open_df - close_df)
 
     # 计算最终结果
@@ -2939,11 +2938,11 @@ def alpha191_186(close_df, high_df, low_df, n=14, m=6):
     :return:
     """
     # 计算公式中的各个部分
-    # 计算LD和HD
-    ld = get_ld(low_df)
-    hd = get_hd(high_df)
-    # 计算TR
-    trange = ta.TRANGE(high_df, low_df, close_df)
+    # 一次计算LD、HD和TR
+    dm = movement(high_df=high_df, low_df=low_df, close_df=close_df)
+    ld = dm['ld']
+    hd = dm['hd']
+    trange = dm['tr']
     # 计算LD>0 & LD>HD
     ld_gt0 = ld > 0
     ld_gt0_hd = ld_gt0 & (ld > hd)
@@ -2951,11 +2950,11 @@ def alpha191_186(close_df, high_df, low_df, n=14, m=6):
     hd_gt0 = hd > 0
     hd_gt0_ld = hd_gt0 & (hd > ld)
     # 计算SUM((LD>0 & LD>HD)?LD:0,14)
-    sum_ld = ta.SUM(np.where(ld_gt0_hd, ld, 0), n)
+    sum_ld = backend.SUM(np.where(ld_gt0_hd, ld, 0), n)
     # 计算SUM((HD>0 & HD>LD)?HD:0,14)
-    sum_hd = ta.SUM(np.where(hd_gt0_ld, hd, 0), n)
+    sum_hd = backend.SUM(np.where(hd_gt0_ld, hd, 0), n)
     # 计算SUM(TR,14)
-    sum_tr = ta.SUM(trange, n)
+    sum_tr = backend.SUM(trange, n)
     # 计算sum_ld*100/sum_tr
     part1 = sum_ld * 100 / sum_tr
     # 计算sum_hd*100/sum_tr
@@ -2969,7 +2968,7 @@ def alpha191_186(close_df, high_df, low_df, n=14, m=6):
     # 计算part5 * 100
     part6 = part5 * 100
     # 计算MEAN(part6, 6)
-    part7 = ta.MA(part6, m)
+    part7 = backend.MA(part6, m)
     # 计算DELAY(part7, 6)
     part8 = delay(part7, m)
     # 计算part7 + part8
@@ -2990,14 +2989,10 @@ def alpha191_187(open_df, high_df, n=20):
     :return:
     """
     # 计算公式中的各个部分
-    # 计算OPEN<=DELAY(OPEN,1)
-    open_le_delay_open = open_df <= delay(open_df, 1)
-    # 计算MAX((HIGH-OPEN),(OPEN-DELAY(OPEN,1)))
-    part1 = np.maximum(high_df - open_df, open_df - delay(open_df, 1))
-    # 计算OPEN<=DELAY(OPEN,1)?0:MAX((HIGH-OPEN),(OPEN-DELAY(OPEN,1)))
-    part2 = np.where(open_le_delay_open, 0, part1)
+    # 计算DTM: OPEN<=DELAY(OPEN,1)?0:MAX((HIGH-OPEN),(OPEN-DELAY(OPEN,1)))
+    part2 = dtm(open_df, high_df)
     # 计算SUM(part2, 20)
-    result = ta.SUM(part2, n)
+    result = backend.SUM(part2, n)
 
     # 返回结果
     return result
@@ -3037,11 +3032,11 @@ def alpha191_189(close_df, n=6):
     """
     # 计算公式中的各个部分
     # 计算CLOSE-MEAN(CLOSE,6)
-    part1 = close_df - ta.MA(close_df, n)
+    part1 = close_df - backend.MA(close_df, n)
     # 计算ABS(CLOSE-MEAN(CLOSE,6))
     part2 = np.abs(part1)
     # 计算MEAN(ABS(CLOSE-MEAN(CLOSE,6)),6)
-    result = ta.MA(part2, n)
+    result = backend.MA(part2, n)
 
     # 返回结果
     return result
@@ -3059,35 +3054,17 @@ def alpha191_190(close_df, n=20):
     :param n: default 20
     :return:
     """
-    # 计算公式中的各个部分
-    # 计算CLOSE/DELAY(CLOSE)
-    close_div_delay_close = close_df / delay(close_df, 1)
-    # 计算CLOSE/DELAY(CLOSE,19)
-    close_div_delay_close_19 = close_df / delay(close_df, 19)
-    # 计算(CLOSE/DELAY(CLOSE,19))^(1/20)
-    part1 = np.power(close_div_delay_close_19, 1 / 20)
-    # 计算CLOSE/DELAY(CLOSE)-1
-    part2 = close_div_delay_close - 1
-    # 计算part2-part1-1
-    part3 = part2 - part1 - 1
-    # 计算COUNT(part3>0, 20)
-    part4 = count(part3 > 0, n)
-    # 计算COUNT(part3<0, 20)
-    part5 = count(part3 < 0, n)
-    # 计算SUMIF(part3^2, 20, part3<0)
-    part6 = sum_if(np.power(part3, 2), n, part3 < 0)
-    # 计算SUMIF(part3^2, 20, part3>0)
-    part7 = sum_if(np.power(part3, 2), n, part3 > 0)
-    # 计算part4-1
-    part8 = part4 - 1
-    # 计算part5*part6
-    part9 = part5 * part6
-    # 计算part8*part9
-    part10 = part8 * part9
-    # 计算part5*part7
-    part11 = part5 * part7
-    # 计算log(part10/part11)
-    result = np.log(part10 / part11)
+    # 计算公式中的各个部分，逐元素部分融合为内核分块计算
+    # 计算CLOSE/DELAY(CLOSE)-1-(CLOSE/DELAY(CLOSE,19))^(1/20)-1
+    part3 = fused('close / delay_close - 1 - (close / delay_close_19) ^ (1 / 20) - 1',
+                  close=close_df, delay_close=delay(close_df, 1), delay_close_19=delay(close_df, 19))
+    # 计算COUNT(part3>0, 20)和COUNT(part3<0, 20)
+    part4, part5 = count([part3 > 0, part3 < 0], n)
+    # 计算SUMIF(part3^2, 20, part3<0)和SUMIF(part3^2, 20, part3>0)
+    part6, part7 = sum_if(np.power(part3, 2), n, [part3 < 0, part3 > 0])
+    # 计算log((part4-1)*(part5*part6)/(part5*part7))
+    result = fused('LOG((count_up - 1) * (count_down * sum_down) / (count_down * sum_up))',
+                   count_up=part4, count_down=part5, sum_down=part6, sum_up=part7)
 
     # 返回结果
     return result
@@ -3106,9 +3083,9 @@ def alpha191_191(close_df, high_df, low_df, volume_df, n=20, m=5):
     """
     # 计算公式中的各个部分
     # 计算MEAN(VOLUME,20)
-    part1 = ta.MA(volume_df, n)
+    part1 = backend.MA(volume_df, n)
     # 计算CORR(MEAN(VOLUME,20), LOW, 5)
-    part2 = ta.CORREL(part1, low_df, m)
+    part2 = backend.CORREL(part1, low_df, m)
     # 计算(HIGH + LOW) / 2
     part3 = (high_df + low_df) / 2
     # 计算CORR(MEAN(VOLUME,20), LOW, 5) + ((HIGH + LOW) / 2)
@@ -3120,3 +3097,8 @@ def alpha191_191(close_df, high_df, low_df, volume_df, n=20, m=5):
     return result
 
 #%%
+
+
+# 所有因子均可直接以 Panel 调用，如 alpha191_1(panel)
+for _name in [_name for _name in globals() if _name.startswith('alpha191_')]:
+    globals()[_name] = accepts_panel(globals()[_name])
@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+
+from . import Alpha191
+from .Cache import sharing
+
+
+def factor_names(alphas=None):
+    """
+    将因子编号或名称列表规范化为 alpha191_* 函数名，默认全部 191 个因子
+    :param alphas: 如 [1, 5, 'alpha191_9']
+    :return:
+    """
+    if alphas is None:
+        alphas = range(1, 192)
+    names = []
+    for alpha in alphas:
+        name = f'alpha191_{alpha}' if isinstance(alpha, int) else str(alpha)
+        if not callable(getattr(Alpha191, name, None)):
+            raise KeyError(f'unknown factor {alpha!r}')
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def _bind_fields(store, panel):
+    for name in panel.fields + ('ret', 'benchmark_ret'):
+        if name in panel:
+            store.bind(name, panel[name])
+
+
+def plan(panel, names, params=None, rows=20):
+    """
+    在面板开头的少量日期上试算一遍，记录每个因子用到的算子调用，得到各中间结果最后一次被使用的因子位置
+    :param panel: Panel
+    :param names: 因子函数名列表
+    :param params: 各因子的额外参数
+    :param rows: 试算使用的日期数
+    :return: ({算子调用键: 最后使用它的因子下标}, {算子调用键: 每次调用所在的因子下标})
+    """
+    params = params or {}
+    sample = panel.slice(0, rows)
+    with sharing() as store:
+        _bind_fields(store, sample)
+        for i, name in enumerate(names):
+            store.factor = i
+            getattr(Alpha191, name)(sample, **params.get(name, {}))
+        store.clear()
+    return {key: factors[-1] for key, factors in store.uses.items()}, store.uses
+
+
+class BatchReport(object):
+    """
+    批量计算的统计：每个因子的耗时，以及每个算子的调用次数、实际计算次数和复用节省的时间
+    """
+
+    def __init__(self, operators, timings, shared=0, peak=0):
+        self.operators = operators
+        self.timings = timings
+        self.shared = shared
+        self.peak = peak
+
+    @property
+    def calls(self):
+        return sum(stats['calls'] for stats in self.operators.values())
+
+    @property
+    def reused(self):
+        return sum(stats['reused'] for stats in self.operators.values())
+
+    @property
+    def saved_seconds(self):
+        return sum(stats['saved_seconds'] for stats in self.operators.values())
+
+    @property
+    def seconds(self):
+        return sum(self.timings.values())
+
+    def __repr__(self):
+        lines = [f'{len(self.timings)} factors in {self.seconds:.3f}s, {self.reused} of {self.calls} operator calls '
+                 f'reused, ~{self.saved_seconds:.3f}s of recomputation avoided',
+                 f'{self.shared} intermediates shared by several factors, at most {self.peak} held at once',
+                 f'{"operator":<12}{"calls":>8}{"computed":>10}{"reused":>8}{"saved(s)":>10}']
+        for name, stats in sorted(self.operators.items(), key=lambda item: -item[1]['saved_seconds']):
+            lines.append(f'{name:<12}{stats["calls"]:>8}{stats["computed"]:>10}{stats["reused"]:>8}'
+                         f'{stats["saved_seconds"]:>10.3f}')
+        return '\n'.join(lines)
+
+
+def compute_all(panel, alphas=None, params=None, report=False):
+    """
+    在同一个面板上批量计算多个因子，各因子共用的算子结果(如 delay(close, 1)、MA(volume, 20)、rank(vwap))
+    在整个批次内只计算一次；先在少量日期上试算得到各中间结果最后被使用的位置，之后不再需要的结果及时释放
+    :param panel: Panel
+    :param alphas: 因子编号或名称列表，默认全部 191 个因子
+    :param params: 各因子的额外参数，如 {'alpha191_1': {'n': 10}}
+    :param report: 是否同时返回 BatchReport
+    :return: 按请求顺序排列的 {因子名: 结果}，report 为 True 时返回 (结果, BatchReport)
+    """
+    params = params or {}
+    names = factor_names(alphas)
+    last_use, uses = plan(panel, names, params)
+    expiring = {}
+    for key, i in last_use.items():
+        expiring.setdefault(i, []).append(key)
+    results, timings, peak = OrderedDict(), OrderedDict(), 0
+    with sharing() as store:
+        _bind_fields(store, panel)
+        for i, name in enumerate(names):
+            start = time.perf_counter()
+            results[name] = getattr(Alpha191, name)(panel, **params.get(name, {}))
+            timings[name] = time.perf_counter() - start
+            peak = max(peak, len(store))
+            store.release(expiring.get(i, ()))
+        store.clear()
+    if report:
+        shared = sum(len(set(factors)) > 1 for factors in uses.values())
+        return results, BatchReport(store.stats, timings, shared, peak)
+    return results
@@ -0,0 +1,175 @@
+"""
+因子函数体中纯逐元素部分的融合计算(类似 numexpr)：
+
+    result = fused('numerator / (a > b ? a + b / 2 : b) * MAX(a, b)', numerator=numerator, a=a, b=b)
+
+表达式使用公式语言的逐元素部分(四则运算、^、比较、& |、?:、ABS、LOG、SIGN、EXP、SQRT、双参数 MAX/MIN)，
+变量名对应关键字参数。表达式经 Optimize 合并相同子式、折叠常量后融合为一个内核，按行切分为缓存大小的块逐块执行，
+每块的中间结果只占用几个块大小的缓冲区，不再为每个中间步骤分配整面板数组；各块可由线程池并行执行(ufunc 计算时释放 GIL)。
+运算顺序与逐步计算完全相同，结果逐位一致
+"""
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .Formula import OPERATIONS, FormulaError, Parser, walk
+from .Kernel import as_2d
+from .Optimize import ELEMENTWISE, Graph, fuse
+
+# 每块中单个数组的目标字节数，一块的输入与中间结果合计约为二级缓存大小
+BLOCK_BYTES = 2 ** 18
+
+_settings = {'enabled': True, 'threads': os.cpu_count() or 1, 'block_bytes': BLOCK_BYTES}
+_executor = None
+# 只对当前线程生效的线程数，见 set_fused 的 local
+_local = threading.local()
+
+
+def set_fused(enabled=True, threads=None, block_bytes=None, local=False):
+    """
+    设置融合计算模式
+    :param enabled: 为 False 时 fused() 按表达式逐步计算，每个中间步骤分配整面板数组(用于对照)
+    :param threads: 并行执行各块的线程数，默认 CPU 核数
+    :param block_bytes: 每块中单个数组的目标字节数
+    :param local: 为 True 时只设置当前线程的 threads(None 为恢复全局设置)，其余设置不变；
+                  用于已经并行计算多个因子的工作线程，如 set_fused(threads=1, local=True)
+    :return:
+    """
+    global _executor
+    if local:
+        _local.threads = threads
+        return
+    _settings['enabled'] = enabled
+    if threads is not None and threads != _settings['threads']:
+        _settings['threads'] = threads
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+    if block_bytes is not None:
+        _settings['block_bytes'] = block_bytes
+
+
+def get_fused():
+    """
+    :return: 当前线程的融合计算设置
+    """
+    return dict(_settings, threads=_threads())
+
+
+def _threads():
+    return getattr(_local, 'threads', None) or _settings['threads']
+
+
+class Expression(object):
+    """
+    编译后的逐元素表达式：variables 为表达式引用的变量名(大写)，计算时按此顺序传入输入
+    """
+
+    def __init__(self, text):
+        parser = Parser(text)
+        parser.variables = {}
+        root = parser.parse()
+        for node in walk([root]):
+            if node.op not in ELEMENTWISE and node.op not in ('VAR', 'CONST'):
+                raise FormulaError(f'{node.op} is not elementwise in {text!r}')
+        self.text = text
+        self.root = Graph().add(text, root)
+        self.variables = [node.params[0] for node in walk([self.root]) if node.op == 'VAR']
+        self.plan = walk(fuse([self.root]))
+
+    def _run(self, order, values):
+        bound = dict(zip(self.variables, values))
+        results = {}
+        with np.errstate(all='ignore'):
+            for node in order:
+                if node.op == 'VAR':
+                    results[id(node)] = bound[node.params[0]]
+                elif node.op == 'CONST':
+                    results[id(node)] = node.params[0]
+                else:
+                    results[id(node)] = OPERATIONS[node.op](*[results[id(arg)] for arg in node.args], *node.params)
+        return results[id(order[-1])]
+
+    def steps(self, values):
+        """
+        逐步计算，每个中间步骤分配整面板数组
+        :param values: 与 variables 对应的输入
+        :return:
+        """
+        return self._run(walk([self.root]), values)
+
+    def blocks(self, values, out, rows):
+        """
+        按行分块执行融合后的表达式图，结果写入 out
+        :param values: 与 variables 对应的输入
+        :param out: 结果数组
+        :param rows: 每块的行数
+        :return:
+        """
+        def run(start):
+            stop = start + rows
+            block = [value[start:stop] if np.ndim(value) == 2 and value.shape[0] > 1 else value for value in values]
+            out[start:stop] = self._run(self.plan, block)
+
+        starts = range(0, out.shape[0], rows)
+        if _threads() > 1 and len(starts) > 1:
+            list(_pool().map(run, starts))
+        else:
+            for start in starts:
+                run(start)
+        return out
+
+    def __repr__(self):
+        return f'Expression({self.text!r})'
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(_settings['threads'])
+    return _executor
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(text):
+    """
+    :param text: 逐元素表达式
+    :return: Expression，相同的表达式只编译一次
+    """
+    return Expression(text)
+
+
+def fused(text, **arrays):
+    """
+    融合计算逐元素表达式
+    :param text: 逐元素表达式，如 '16 * (close - delay_close) / MAX(a, b)'
+    :param arrays: 表达式中的变量，ndarray / DataFrame / Series 或标量
+    :return: 与形状等于广播结果的第一个数组输入同类型的结果，没有这样的输入时返回 ndarray
+    """
+    expression = compile_expression(text)
+    values, restores = [], []
+    for name in expression.variables:
+        key = next((key for key in arrays if key.upper() == name), None)
+        if key is None:
+            raise FormulaError(f'missing variable {name.lower()!r} for {text!r}')
+        value = arrays[key]
+        if np.ndim(value) == 0:
+            values.append(value)
+            continue
+        value, restore = as_2d(value)
+        restores.append((value.shape, restore))
+        values.append(value)
+    shape = np.broadcast_shapes(*[np.shape(value) for value in values])
+    # 一维基准序列在前、二维面板在后时，结果应按面板还原，而不是按第一个输入展平
+    wrap = next((restore for value_shape, restore in restores if value_shape == shape), lambda res: res)
+    if not _settings['enabled'] or len(shape) != 2:
+        return wrap(np.asarray(expression.steps(values)))
+    # 结果类型由表达式在单个元素上试算得到
+    dtype = np.asarray(expression._run(expression.plan, [value[:1, :1] if np.ndim(value) == 2 else value
+                                                          for value in values])).dtype
+    out = np.empty(shape, dtype=dtype)
+    rows = max(1, _settings['block_bytes'] // (8 * shape[1]))
+    return wrap(expression.blocks(values, out, rows))
@@ -0,0 +1,359 @@
+import functools
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# 当前生效的结果存储，为 None 时算子直接计算
+_store = None
+# 只对当前线程生效的状态，见 direct
+_local = threading.local()
+
+
+class Unkeyable(Exception):
+    """参数无法构成缓存键(如任意对象)，该次调用不经过缓存"""
+
+
+def _freeze(result):
+    # 共享结果对所有调用方可见，设为只读以免某个因子原地修改影响其他因子
+    if isinstance(result, np.ndarray):
+        result.flags.writeable = False
+    elif isinstance(result, tuple):
+        for item in result:
+            _freeze(item)
+    elif isinstance(result, dict):
+        for item in result.values():
+            _freeze(item)
+    return result
+
+
+class SharedResults(object):
+    """
+    一次批量计算内的算子结果存储：同一算子以相同参数再次调用时直接返回已有结果。
+    数组参数按其来源构成结构化的键——面板字段以字段名表示，算子结果以产生它的调用表示，
+    因此 rank(delay(close, 1)) 这类链式调用可以整体复用，且同一批因子在不同面板上得到相同的键；
+    临时计算出的数组无法被其他调用共享，这类调用直接计算
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._tokens = {}
+        self._fields = []
+        self.parent = None
+        self.factor = None
+        self.uses = OrderedDict()
+        self.operators = OrderedDict()
+        self.stats = OrderedDict()
+
+    def bind(self, name, values):
+        """
+        登记面板字段，以字段名作为其在键中的表示
+        :param name:
+        :param values:
+        :return:
+        """
+        self._tokens[id(values)] = 'field', name
+        self._fields.append(values)
+
+    def _key(self, arg):
+        # 参数转换为可哈希的键：数组按来源，标量按值，列表/元组逐项转换
+        if isinstance(arg, (np.ndarray, pd.Series, pd.DataFrame)):
+            if id(arg) not in self._tokens:
+                raise Unkeyable(type(arg).__name__)
+            return self._tokens[id(arg)]
+        if arg is None or isinstance(arg, (bool, int, float, str, np.number)):
+            return type(arg).__name__, arg
+        if isinstance(arg, (list, tuple)):
+            return tuple(self._key(item) for item in arg)
+        cache_key = getattr(arg, 'cache_key', None)
+        if cache_key is None:
+            raise Unkeyable(type(arg).__name__)
+        return cache_key
+
+    def call(self, name, func, args, kwargs):
+        """
+        :param name: 算子名称
+        :param func: 实际计算函数
+        :param args: 位置参数
+        :param kwargs: 关键字参数
+        :return:
+        """
+        if self.factor is not None:
+            self.operators.setdefault(self.factor, set()).add(name)
+        try:
+            key = name, self._key(args), self._key(tuple(sorted(kwargs.items())))
+        except Unkeyable:
+            return func(*args, **kwargs)
+        if self.factor is not None:
+            self.uses.setdefault(key, []).append(self.factor)
+        stats = self.stats.setdefault(name, {'calls': 0, 'computed': 0, 'reused': 0, 'seconds': 0.0,
+                                             'saved_seconds': 0.0})
+        stats['calls'] += 1
+        if key in self._results:
+            result, seconds = self._results[key]
+            stats['reused'] += 1
+            stats['saved_seconds'] += seconds
+            return result
+        start = time.perf_counter()
+        # 外层还有生效的存储(如 OperatorCache)时交给它计算，跨批次的缓存同样生效
+        result = _freeze(self.parent.call(name, func, args, kwargs) if self.parent is not None
+                         else func(*args, **kwargs))
+        seconds = time.perf_counter() - start
+        stats['computed'] += 1
+        stats['seconds'] += seconds
+        self._results[key] = result, seconds
+        if isinstance(result, (np.ndarray, pd.Series, pd.DataFrame)):
+            self._tokens[id(result)] = key
+        return result
+
+    def __len__(self):
+        return len(self._results)
+
+    def release(self, keys):
+        """
+        释放不再被后续因子使用的结果
+        :param keys:
+        :return:
+        """
+        for key in keys:
+            if key in self._results:
+                result, _ = self._results.pop(key)
+                self._tokens.pop(id(result), None)
+
+    def clear(self):
+        self._results.clear()
+        self._tokens.clear()
+        self._fields.clear()
+
+
+def _read_only(values):
+    # 数组及其所有 numpy 基底都不可写时，内容在其生命周期内不会改变
+    while isinstance(values, np.ndarray):
+        if values.flags.writeable:
+            return False
+        values = values.base
+    return True
+
+
+def _nbytes(result):
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (pd.Series, pd.DataFrame)):
+        return int(np.sum(result.memory_usage(index=False)))
+    if isinstance(result, tuple):
+        return sum(_nbytes(item) for item in result)
+    if isinstance(result, dict):
+        return sum(_nbytes(item) for item in result.values())
+    return 0
+
+
+class OperatorCache(object):
+    """
+    可选的算子结果缓存，跨因子、跨批次复用 delay(close, 1)、MA(close, n)、rank(vwap) 等相同的中间结果
+    键由算子名、参数值和输入数组的内容指纹组成；只读数组(面板字段、算子结果)的指纹按对象记忆，只计算一次。
+    缓存结果的总字节数超过 max_bytes 时按最近最少使用的顺序淘汰
+    """
+
+    def __init__(self, max_bytes=2 ** 30):
+        """
+        :param max_bytes: 缓存结果占用内存的上限(字节)
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._results = OrderedDict()
+        self._fingerprints = {}
+        self.hits = self.misses = self.evictions = 0
+        self.operators = OrderedDict()
+        # 多线程计算因子时(Parallel.compute_threaded)保护缓存的读写，算子本身在锁外计算
+        self._lock = threading.RLock()
+
+    def fingerprint(self, values):
+        """
+        数组内容的指纹(形状、类型与数据的 blake2b 摘要)，Series / DataFrame 同时包含行列索引
+        :param values:
+        :return:
+        """
+        memo = self._fingerprints.get(id(values))
+        if memo is not None and memo[0]() is values:
+            return memo[1]
+        digest = hashlib.blake2b(digest_size=16)
+        if isinstance(values, (pd.Series, pd.DataFrame)):
+            digest.update(pd.util.hash_pandas_object(values.index).to_numpy().tobytes())
+            if isinstance(values, pd.DataFrame):
+                digest.update(pd.util.hash_pandas_object(values.columns).to_numpy().tobytes())
+            array = values.to_numpy()
+        else:
+            array = values
+        digest.update(f'{type(values).__name__}{array.shape}{array.dtype}'.encode())
+        digest.update(memoryview(np.ascontiguousarray(array)).cast('B'))
+        key = digest.hexdigest()
+        if isinstance(values, np.ndarray) and _read_only(values):
+            ident = id(values)
+
+            def forget(ref):
+                if self._fingerprints.get(ident, (None,))[0] is ref:
+                    del self._fingerprints[ident]
+
+            self._fingerprints[ident] = weakref.ref(values, forget), key
+        return key
+
+    def _key(self, arg):
+        if isinstance(arg, (np.ndarray, pd.Series, pd.DataFrame)):
+            return 'fingerprint', self.fingerprint(arg)
+        if arg is None or isinstance(arg, (bool, int, float, str, np.number)):
+            return type(arg).__name__, arg
+        if isinstance(arg, (list, tuple)):
+            return tuple(self._key(item) for item in arg)
+        cache_key = getattr(arg, 'cache_key', None)
+        if cache_key is None:
+            raise Unkeyable(type(arg).__name__)
+        return cache_key
+
+    def call(self, name, func, args, kwargs):
+        """
+        :param name: 算子名称
+        :param func: 实际计算函数
+        :param args: 位置参数
+        :param kwargs: 关键字参数
+        :return:
+        """
+        try:
+            with self._lock:
+                key = name, self._key(args), self._key(tuple(sorted(kwargs.items())))
+        except Unkeyable:
+            return func(*args, **kwargs)
+        with self._lock:
+            stats = self.operators.setdefault(name, {'hits': 0, 'misses': 0})
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                stats['hits'] += 1
+                return self._results[key][0]
+            self.misses += 1
+            stats['misses'] += 1
+        result = _freeze(func(*args, **kwargs))
+        size = _nbytes(result)
+        if size <= self.max_bytes:
+            with self._lock:
+                if key not in self._results:
+                    self._results[key] = result, size
+                    self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, (_, evicted) = self._results.popitem(last=False)
+                    self.nbytes -= evicted
+                    self.evictions += 1
+        return result
+
+    def __len__(self):
+        return len(self._results)
+
+    @property
+    def stats(self):
+        """
+        :return: 命中、未命中、淘汰次数，当前条目数与占用字节数，以及各算子的命中统计
+        """
+        calls = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / calls if calls else 0.0,
+                'evictions': self.evictions, 'entries': len(self._results), 'nbytes': self.nbytes,
+                'operators': {name: dict(stats) for name, stats in self.operators.items()}}
+
+    def __repr__(self):
+        stats = self.stats
+        return (f'OperatorCache({stats["entries"]} entries, {self.nbytes / 2 ** 20:.1f}/{self.max_bytes / 2 ** 20:.1f} '
+                f'MiB, hits={self.hits}, misses={self.misses}, evictions={self.evictions})')
+
+    def clear(self):
+        self._results.clear()
+        self._fingerprints.clear()
+        self.nbytes = 0
+
+
+def shared(name):
+    """
+    算子装饰器：存在生效的结果存储时经由存储调用，否则直接计算
+    :param name: 统计中使用的算子名称
+    :return:
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _store is None or getattr(_local, 'direct', False):
+                return func(*args, **kwargs)
+            return _store.call(name, func, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class sharing(object):
+    """
+    上下文管理器：在 with 块内启用结果存储，退出时恢复之前的状态
+    """
+
+    def __init__(self, store=None):
+        self.store = SharedResults() if store is None else store
+
+    def __enter__(self):
+        global _store
+        self._previous = _store
+        self.store.parent = _store
+        _store = self.store
+        return self.store
+
+    def __exit__(self, *exc):
+        global _store
+        _store = self._previous
+        return False
+
+
+class direct(object):
+    """
+    上下文管理器：在当前线程的 with 块内绕过结果存储，算子每次都实际计算；
+    不改变全局的 _store，其他线程的批量共享与算子缓存不受影响
+    """
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'direct', False)
+        _local.direct = True
+        return self
+
+    def __exit__(self, *exc):
+        _local.direct = self._previous
+        return False
+
+
+def caching(cache=None, max_bytes=2 ** 30):
+    """
+    在 with 块内启用算子缓存，如 with caching() as cache: compute_all(panel)
+    :param cache: 已有的 OperatorCache，默认新建
+    :param max_bytes: 新建缓存的内存上限(字节)
+    :return:
+    """
+    return sharing(OperatorCache(max_bytes) if cache is None else cache)
+
+
+def enable_cache(max_bytes=2 ** 30):
+    """
+    全局启用算子缓存，直到 disable_cache()
+    :param max_bytes: 内存上限(字节)
+    :return: OperatorCache
+    """
+    global _store
+    _store = OperatorCache(max_bytes)
+    return _store
+
+
+def disable_cache():
+    """
+    关闭全局算子缓存并释放缓存的结果
+    :return:
+    """
+    global _store
+    if isinstance(_store, OperatorCache):
+        _store.clear()
+        _store = None
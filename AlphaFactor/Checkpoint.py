@@ -0,0 +1,135 @@
+"""
+增量计算状态的检查点：sma 等递归算子依赖全部历史，截取短窗口计算会有偏差，
+每日运行后保存各因子的在线算子状态(SMA 的上一期值、滑动窗口的缓冲区与累加和等)，次日读入后只需计算新的一期，
+结果与从头计算逐位一致
+
+    >>> evaluators = start(history)                 # 首次：按期回放全部历史
+    >>> save_checkpoint(evaluators, 'alpha.npz')
+    >>> evaluators, results = resume('alpha.npz', today)   # 之后每日：读入检查点，只计算新的日期
+    >>> save_checkpoint(evaluators, 'alpha.npz')
+
+检查点为单个 .npz 文件：状态中的数组逐个保存为其中的条目，其余结构与标量保存为 JSON，读取时不需要 pickle
+"""
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .Batch import factor_names
+from .Registry import registry
+from .Stream import Incremental, bars
+
+# 检查点格式的版本，格式变化时递增
+VERSION = 1
+
+
+def recursive_factors(alphas=None):
+    """
+    :param alphas: 候选因子，默认全部
+    :return: 注册表中依赖全部历史(sma 递推、SELF 累乘)、需要检查点才能精确续算的因子
+    """
+    return [name for name in factor_names(alphas) if registry()[name]['recursive']]
+
+
+def _split(value, arrays):
+    # 数组替换为对 .npz 条目的引用，其余部分可以写为 JSON
+    if isinstance(value, np.ndarray):
+        key = f'a{len(arrays)}'
+        arrays[key] = value
+        return {'__array__': key}
+    if isinstance(value, dict):
+        return {key: _split(item, arrays) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_split(item, arrays) for item in value]
+    return value
+
+
+def _join(value, arrays):
+    if isinstance(value, dict) and '__array__' in value:
+        return arrays[value['__array__']]
+    if isinstance(value, dict):
+        return {key: _join(item, arrays) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_join(item, arrays) for item in value]
+    return value
+
+
+def _evaluators(evaluators):
+    if isinstance(evaluators, Incremental):
+        return [evaluators]
+    return list(evaluators.values()) if isinstance(evaluators, dict) else list(evaluators)
+
+
+def save_checkpoint(evaluators, path):
+    """
+    保存增量计算器的状态；先写入临时文件再替换，中途失败不会损坏已有的检查点
+    :param evaluators: Incremental，或其 list / {因子名: Incremental}
+    :param path: 文件路径，通常以 .npz 结尾
+    :return:
+    """
+    arrays = {}
+    meta = {'version': VERSION, 'factors': [_split(evaluator.state(), arrays) for evaluator in _evaluators(evaluators)]}
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        np.savez(f, __meta__=np.array(json.dumps(meta)), **arrays)
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    """
+    读取检查点
+    :param path:
+    :return: {因子名: Incremental}，按保存时的顺序排列
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['__meta__']))
+        if meta['version'] != VERSION:
+            raise ValueError(f'checkpoint version {meta["version"]} is not supported, expected {VERSION}')
+        states = [_join(state, data) for state in meta['factors']]
+    evaluators = [Incremental.from_state(state) for state in states]
+    return OrderedDict((evaluator.name, evaluator) for evaluator in evaluators)
+
+
+def advance(evaluators, panel):
+    """
+    把面板的各期依次送入增量计算器
+    :param evaluators: {因子名: Incremental}
+    :param panel: Panel，日期接在检查点之后
+    :return: {因子名: (T, N) 的逐期结果}
+    """
+    results = OrderedDict((name, []) for name in evaluators)
+    for date, bar in bars(panel):
+        for name, evaluator in evaluators.items():
+            results[name].append(evaluator.update(bar, date))
+    return OrderedDict((name, np.vstack(rows) if rows else np.empty((0, len(panel.assets))))
+                       for name, rows in results.items())
+
+
+def start(panel, alphas=None, params=None):
+    """
+    从头回放历史，得到可以保存为检查点的增量计算器
+    :param panel: Panel，全部历史
+    :param alphas: 因子编号或名称列表，默认 recursive_factors()
+    :param params: 各因子的额外参数，如 {'alpha191_9': {'n': 7}}
+    :return: {因子名: Incremental}
+    """
+    params = params or {}
+    names = recursive_factors() if alphas is None else factor_names(alphas)
+    evaluators = OrderedDict((name, Incremental(name, params.get(name), panel.assets)) for name in names)
+    advance(evaluators, panel)
+    return evaluators
+
+
+def resume(path, panel):
+    """
+    读取检查点并计算其后的新日期
+    :param path: 检查点路径
+    :param panel: Panel，只包含检查点之后的日期，资产与检查点一致
+    :return: ({因子名: Incremental}, {因子名: (T, N) 的逐期结果})
+    """
+    evaluators = load_checkpoint(path)
+    for evaluator in evaluators.values():
+        if evaluator.assets is not None and list(evaluator.assets) != list(panel.assets):
+            raise ValueError(f'{evaluator.name}: panel assets differ from the checkpoint')
+    return evaluators, advance(evaluators, panel)
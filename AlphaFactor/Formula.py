@@ -0,0 +1,491 @@
+"""
+国泰君安 191 因子公式语言的解析与执行
+
+公式字符串(如 alpha191_1 文档中的 (-1 * CORR(RANK(DELTA(LOG(VOLUME), 1)), RANK(((CLOSE - OPEN) / OPEN)), 6)))
+先解析为表达式图，再在 Panel 上逐节点调用 Basic 中的面板算子执行，新因子无需手写 Python 即可按向量化内核的速度计算:
+
+    >>> formula = compile_formula('(-1 * CORR(RANK(DELTA(LOG(VOLUME), 1)), RANK(((CLOSE - OPEN) / OPEN)), 6))')
+    >>> formula(panel)
+"""
+import re
+from collections import Counter
+
+import numpy as np
+
+from . import Alpha191, Basic
+
+# 公式中的行情变量与面板字段的对应关系
+FIELDS = {
+    'OPEN': 'open',
+    'HIGH': 'high',
+    'LOW': 'low',
+    'CLOSE': 'close',
+    'VOLUME': 'volume',
+    'AMOUNT': 'amount',
+    'VWAP': 'vwap',
+    'RET': 'ret',
+    'BANCHMARKINDEXOPEN': 'benchmark_open',
+    'BANCHMARKINDEXCLOSE': 'benchmark_close',
+    'BENCHMARKINDEXOPEN': 'benchmark_open',
+    'BENCHMARKINDEXCLOSE': 'benchmark_close',
+    'MKT': 'mkt',
+    'SMB': 'smb',
+    'HML': 'hml',
+}
+
+# 报告中定义的派生变量，解析时展开为公式
+MACROS = {
+    'DTM': '(OPEN<=DELAY(OPEN,1)?0:MAX((HIGH-OPEN),(OPEN-DELAY(OPEN,1))))',
+    'DBM': '(OPEN>=DELAY(OPEN,1)?0:MAX((OPEN-LOW),(OPEN-DELAY(OPEN,1))))',
+    'TR': 'MAX(MAX(HIGH-LOW,ABS(HIGH-DELAY(CLOSE,1))),ABS(LOW-DELAY(CLOSE,1)))',
+    'HD': '(HIGH-DELAY(HIGH,1))',
+    'LD': '(DELAY(LOW,1)-LOW)',
+}
+
+
+# 函数签名：'a' 为数组参数，'n' 为整数参数(可带默认值 'n=1')，'a*' 为可变个数的数组参数
+FUNCTIONS = {
+    'RANK': ('a',),
+    'TSRANK': ('a', 'n'),
+    'DELAY': ('a', 'n=1'),
+    'DELTA': ('a', 'n=1'),
+    'SUM': ('a', 'n'),
+    'SUMAC': ('a', 'n=30'),
+    'MEAN': ('a', 'n'),
+    'MA': ('a', 'n'),
+    'STD': ('a', 'n'),
+    'CORR': ('a', 'a', 'n'),
+    'COVIANCE': ('a', 'a', 'n'),
+    'SMA': ('a', 'n', 'n'),
+    'WMA': ('a', 'n'),
+    'DECAYLINEAR': ('a', 'n'),
+    'TSMAX': ('a', 'n'),
+    'TSMIN': ('a', 'n'),
+    'HIGHDAY': ('a', 'n'),
+    'LOWDAY': ('a', 'n'),
+    'COUNT': ('a', 'n'),
+    'SUMIF': ('a', 'n', 'a'),
+    'REGBETA': ('a', 'a', 'n'),
+    'REGRESI': ('a', 'a*', 'n'),
+    'FILTER': ('a', 'a'),
+    'SEQUENCE': ('n',),
+    'MAX': ('a', 'a'),
+    'MIN': ('a', 'a'),
+    'ABS': ('a',),
+    'LOG': ('a',),
+    'SIGN': ('a',),
+    'EXP': ('a',),
+    'SQRT': ('a',),
+}
+
+
+class FormulaError(ValueError):
+    """公式无法解析，或引用了不支持的函数、变量"""
+
+
+class Node(object):
+    """
+    表达式图的节点
+    op 为 'FIELD'(params 为面板字段名)、'CONST'(params 为数值)、运算符或函数名；
+    args 为数组类型的子节点，params 为窗口长度等标量参数
+    """
+    __slots__ = ('op', 'args', 'params')
+
+    def __init__(self, op, args=(), params=()):
+        self.op = op
+        self.args = tuple(args)
+        self.params = tuple(params)
+
+    def __repr__(self):
+        if self.op in ('FIELD', 'VAR'):
+            return self.params[0].upper()
+        if self.op == 'CONST':
+            return f'{self.params[0]:g}'
+        if self.op == 'NEG':
+            return f'(-{self.args[0]!r})'
+        if self.op == '?:':
+            return '({!r}?{!r}:{!r})'.format(*self.args)
+        if self.op == 'FUSED':
+            return self.params[0].expression([repr(arg) for arg in self.args])
+        if self.op in BINARY:
+            return f'({self.args[0]!r}{self.op}{self.args[1]!r})'
+        return f'{self.op}({", ".join([repr(arg) for arg in self.args] + [f"{p:g}" for p in self.params])})'
+
+    def walk(self):
+        """
+        按依赖顺序(子节点在前)遍历图中的全部节点，共享的节点只出现一次
+        :return:
+        """
+        return walk([self])
+
+
+def walk(roots):
+    """
+    按依赖顺序(子节点在前)遍历多个根节点共用的表达式图，共享的节点只出现一次
+    :param roots:
+    :return:
+    """
+    seen, order, stack = set(), [], [(root, False) for root in reversed(roots)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in seen:
+            continue
+        if expanded:
+            seen.add(id(node))
+            order.append(node)
+        else:
+            stack.append((node, True))
+            stack.extend((arg, False) for arg in reversed(node.args) if id(arg) not in seen)
+    return order
+
+
+_TOKEN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+)|([A-Za-z_][A-Za-z_0-9]*)|'
+                    r'(\|\||&&|<=|>=|==|!=|[-+*/^?:(),<>=&|]))')
+
+
+def tokenize(text):
+    """
+    :param text: 公式字符串，全角符号视为半角，MATLAB 风格的 .* ./ 视为 * /，末尾的分号忽略
+    :return: [(类型, 值)]，类型为 'num'、'name' 或 'op'
+    """
+    for old, new in (('，', ','), ('（', '('), ('）', ')'), ('？', '?'), ('：', ':'), ('–', '-'), ('.*', '*'),
+                     ('./', '/')):
+        text = text.replace(old, new)
+    text = text.strip().rstrip(';')
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise FormulaError(f'unexpected character {text[pos]!r} at {pos} in {text!r}')
+        number, name, op = match.groups()
+        if number is not None:
+            tokens.append(('num', float(number)))
+        elif name is not None and name.upper() in ('AND', 'OR'):
+            tokens.append(('op', '&' if name.upper() == 'AND' else '|'))
+        elif name is not None:
+            tokens.append(('name', name.upper()))
+        else:
+            tokens.append(('op', {'&&': '&', '||': '|', '=': '=='}.get(op, op)))
+        pos = match.end()
+    return tokens
+
+
+# 二元运算符按优先级从低到高排列
+BINARY_LEVELS = (('|',), ('&',), ('==', '!='), ('<', '>', '<=', '>='), ('+', '-'), ('*', '/'))
+BINARY = tuple(op for level in BINARY_LEVELS for op in level) + ('^',)
+
+
+class Parser(object):
+    """
+    递归下降解析器，优先级从低到高为 ?:、|、&、== !=、< > <= >=、+ -、* /、一元负号、^(右结合)
+    同一公式中展开的派生变量(TR、HD 等)共用同一组节点
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.macros = {}
+        # 不为 None 时按变量解析标识符(Blockwise 的逐元素表达式)，变量名优先于行情字段
+        self.variables = None
+
+    def parse(self):
+        node = self.ternary()
+        if self.pos != len(self.tokens):
+            raise FormulaError(f'unexpected {self.tokens[self.pos][1]!r} in {self.text!r}')
+        if any(item.op == 'SEQUENCE' and not item.params for item in node.walk()):
+            raise FormulaError(f'SEQUENCE without a length outside REGBETA in {self.text!r}')
+        return node
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def accept(self, *ops):
+        kind, value = self.peek()
+        if kind == 'op' and value in ops:
+            self.pos += 1
+            return value
+        return None
+
+    def expect(self, op):
+        if self.accept(op) is None:
+            raise FormulaError(f'expected {op!r} at token {self.pos} in {self.text!r}')
+
+    def ternary(self):
+        cond = self.binary(0)
+        if self.accept('?'):
+            left = self.ternary()
+            self.expect(':')
+            return Node('?:', (cond, left, self.ternary()))
+        return cond
+
+    def binary(self, level):
+        if level == len(BINARY_LEVELS):
+            return self.unary()
+        node = self.binary(level + 1)
+        while True:
+            op = self.accept(*BINARY_LEVELS[level])
+            if op is None:
+                return node
+            node = Node(op, (node, self.binary(level + 1)))
+
+    def unary(self):
+        if self.accept('-'):
+            return Node('NEG', (self.unary(),))
+        if self.accept('+'):
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        base = self.atom()
+        if self.accept('^'):
+            return Node('^', (base, self.unary()))
+        return base
+
+    def atom(self):
+        kind, value = self.peek()
+        if kind is None:
+            raise FormulaError(f'unexpected end of {self.text!r}')
+        self.pos += 1
+        if kind == 'num':
+            return Node('CONST', params=(value,))
+        if kind == 'op':
+            if value != '(':
+                raise FormulaError(f'unexpected {value!r} in {self.text!r}')
+            node = self.ternary()
+            self.expect(')')
+            return node
+        if self.accept('('):
+            args = []
+            if not self.accept(')'):
+                args.append(self.ternary())
+                while self.accept(','):
+                    args.append(self.ternary())
+                self.expect(')')
+            return self.call(value, args)
+        if self.variables is not None:
+            if value not in self.variables:
+                self.variables[value] = Node('VAR', params=(value,))
+            return self.variables[value]
+        if value in FIELDS:
+            return Node('FIELD', params=(FIELDS[value],))
+        if value in MACROS:
+            if value not in self.macros:
+                self.macros[value] = Parser(MACROS[value]).parse()
+            return self.macros[value]
+        if value == 'SEQUENCE':
+            # 不带长度的 SEQUENCE 只能作为 REGBETA 的自变量，长度取自 REGBETA 的窗口，见 call
+            return Node('SEQUENCE')
+        raise FormulaError(f'unknown variable {value!r} in {self.text!r}')
+
+    def call(self, name, args):
+        if name not in FUNCTIONS:
+            raise FormulaError(f'unknown function {name!r} in {self.text!r}')
+        if name == 'REGBETA':
+            args = self.sequence_window(args)
+        signature = FUNCTIONS[name]
+        arrays, params = [], []
+        variadic = len(args) - len(signature) + 1 if 'a*' in signature else None
+        slots = [kind for kind in signature for _ in range(variadic if kind == 'a*' else 1)]
+        if len(args) > len(slots) or len(args) < sum('=' not in kind for kind in slots):
+            raise FormulaError(f'{name} expects {len(signature)} arguments, got {len(args)} in {self.text!r}')
+        for i, kind in enumerate(slots):
+            if kind.startswith('n'):
+                params.append(_constant(args[i], name) if i < len(args) else float(kind.split('=')[1]))
+            else:
+                arrays.append(args[i])
+        return Node(name, arrays, params)
+
+    def sequence_window(self, args):
+        # 报告中 REGBETA 的两种简写：REGBETA(A, SEQUENCE(n)) 省略窗口，窗口即序列长度；
+        # REGBETA(A, SEQUENCE, n) 省略序列长度，长度即窗口
+        if len(args) == 2 and args[1].op == 'SEQUENCE' and args[1].params:
+            return [args[0], args[1], Node('CONST', params=args[1].params)]
+        if len(args) == 3 and args[1].op == 'SEQUENCE' and not args[1].params:
+            return [args[0], Node('SEQUENCE', params=(_constant(args[2], 'REGBETA'),)), args[2]]
+        return args
+
+
+def _constant(node, name):
+    # 窗口长度等参数必须是常数表达式
+    if node.op == 'CONST':
+        return node.params[0]
+    if node.op == 'NEG':
+        return -_constant(node.args[0], name)
+    if node.op in ('+', '-', '*', '/'):
+        left, right = _constant(node.args[0], name), _constant(node.args[1], name)
+        return {'+': left + right, '-': left - right, '*': left * right, '/': left / right}[node.op]
+    raise FormulaError(f'{name} requires a constant window, got {node!r}')
+
+
+def parse(text):
+    """
+    :param text: 公式字符串
+    :return: 表达式图的根节点
+    """
+    return Parser(text).parse()
+
+
+def _int(value):
+    return int(round(value))
+
+
+# 各运算在面板上的实现，统一经由 Basic / backend 调用，使算子后端、批量共享和算子缓存同样生效
+OPERATIONS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '^': lambda a, b: np.power(a, b),
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '&': lambda a, b: np.logical_and(a, b),
+    '|': lambda a, b: np.logical_or(a, b),
+    'NEG': lambda a: -a,
+    '?:': lambda cond, a, b: np.where(cond, a, b),
+    'RANK': lambda a: Basic.rank(a),
+    'TSRANK': lambda a, n: Basic.tsrank(a, _int(n)),
+    'DELAY': lambda a, n: Basic.delay(a, _int(n)),
+    'DELTA': lambda a, n: Basic.delta(a, _int(n)),
+    'SUM': lambda a, n: Basic.backend.SUM(a, _int(n)),
+    'SUMAC': lambda a, n: Basic.backend.SUM(a, _int(n)),
+    'MEAN': lambda a, n: Basic.backend.MA(a, _int(n)),
+    'MA': lambda a, n: Basic.backend.MA(a, _int(n)),
+    'STD': lambda a, n: Basic.backend.STDDEV(a, _int(n)),
+    'CORR': lambda a, b, n: Basic.backend.CORREL(a, b, _int(n)),
+    'COVIANCE': lambda a, b, n: Basic.coviance(a, b, _int(n)),
+    'SMA': lambda a, n, m: Basic.sma(a, _int(n), _int(m)),
+    'WMA': lambda a, n: Basic.backend.WMA(a, _int(n)),
+    'DECAYLINEAR': lambda a, n: Basic.decaylinear(a, _int(n)),
+    'TSMAX': lambda a, n: Basic.tsmax(a, _int(n)),
+    'TSMIN': lambda a, n: Basic.tsmin(a, _int(n)),
+    'HIGHDAY': lambda a, n: Basic.highday(a, _int(n)),
+    'LOWDAY': lambda a, n: Basic.lowday(a, _int(n)),
+    'COUNT': lambda a, n: Basic.count(a, _int(n)),
+    'SUMIF': lambda a, cond, n: Basic.sum_if(a, _int(n), cond),
+    'REGBETA': lambda a, b, n: Basic.regbeta(a, b, _int(n)),
+    'REGRESI': lambda a, *args: Basic.regresi(a, *args[:-1], _int(args[-1])),
+    'FILTER': lambda a, cond: Basic.filter_cond(a, cond),
+    'SEQUENCE': lambda n: Basic.sequence(_int(n)),
+    'MAX': lambda a, b: np.maximum(a, b),
+    'MIN': lambda a, b: np.minimum(a, b),
+    'ABS': lambda a: np.abs(a),
+    'LOG': lambda a: np.log(a),
+    'SIGN': lambda a: np.sign(a),
+    'EXP': lambda a: np.exp(a),
+    'SQRT': lambda a: np.sqrt(a),
+    # Optimize 融合得到的逐元素内核，内核本身作为最后一个参数
+    'FUSED': lambda *args: args[-1](*args[:-1]),
+}
+
+# 需要完整 (日期 × 资产) 数组输入的运算，常数参数按面板形状展开
+_WINDOWED = {name for name, signature in FUNCTIONS.items()
+             if any(kind.startswith('n') for kind in signature) or name in ('RANK', 'FILTER')}
+
+
+def _as_panel(value, shape):
+    if np.ndim(value) == 0:
+        return np.full(shape, float(value))
+    if value.dtype == bool:
+        return value
+    return np.asarray(value, dtype=np.float64)
+
+
+def evaluate(root, panel):
+    """
+    在面板上执行表达式图，每个节点只计算一次
+    :param root: 根节点
+    :param panel: Panel
+    :return: (日期 × 资产) 数组
+    """
+    return evaluate_all([root], panel)[0]
+
+
+def evaluate_all(roots, panel):
+    """
+    在面板上执行多个根节点共用的表达式图，每个节点只计算一次，中间结果在最后一个使用它的节点计算后释放
+    :param roots: 根节点列表
+    :param panel: Panel
+    :return: 与 roots 对应的 (日期 × 资产) 数组列表
+    """
+    order = walk(roots)
+    remaining = Counter(id(arg) for node in order for arg in node.args)
+    keep = {id(root) for root in roots}
+    values = {}
+    with np.errstate(all='ignore'):
+        for node in order:
+            if node.op == 'FIELD':
+                values[id(node)] = panel[node.params[0]]
+                continue
+            if node.op == 'CONST':
+                values[id(node)] = node.params[0]
+                continue
+            args = [values[id(arg)] for arg in node.args]
+            if node.op in _WINDOWED:
+                args = [_as_panel(arg, panel.shape) for arg in args]
+            values[id(node)] = OPERATIONS[node.op](*args, *node.params)
+            del args
+            for arg in node.args:
+                remaining[id(arg)] -= 1
+                if not remaining[id(arg)] and id(arg) not in keep:
+                    values.pop(id(arg), None)
+    results = [values[id(root)] for root in roots]
+    return [np.broadcast_to(result, panel.shape) if np.ndim(result) == 0 else result for result in results]
+
+
+class Formula(object):
+    """
+    编译后的公式：formula(panel) 返回以面板日期、资产为索引的 DataFrame
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.root = parse(text)
+
+    @property
+    def nodes(self):
+        return self.root.walk()
+
+    @property
+    def fields(self):
+        """
+        :return: 公式用到的面板字段
+        """
+        return sorted({node.params[0] for node in self.nodes if node.op == 'FIELD'})
+
+    def __call__(self, panel):
+        return panel.frame(np.asarray(evaluate(self.root, panel), dtype=np.float64))
+
+    def __repr__(self):
+        return f'Formula({self.root!r})'
+
+
+def compile_formula(text):
+    """
+    :param text: 公式字符串
+    :return: Formula
+    """
+    return Formula(text)
+
+
+def formula_text(alpha):
+    """
+    从 alpha191_* 的文档中取出公式原文：因子编号之后、第一行中文说明或参数说明之前的内容，
+    换行处的断词直接拼接
+    :param alpha: 因子编号或名称
+    :return:
+    """
+    name = f'alpha191_{alpha}' if isinstance(alpha, int) else alpha
+    lines = getattr(Alpha191, name).__doc__.strip().splitlines()
+    first = re.sub(r'^Alpha\s*#?\s*\d+', '', lines[0].strip())
+    parts = [first] if first.strip() else []
+    for line in lines[1:]:
+        line = line.strip()
+        if not line or line.startswith(':') or re.search(r'[一-鿿]', line):
+            break
+        parts.append(line)
+    return ''.join(part.strip() for part in parts)
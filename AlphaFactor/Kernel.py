@@ -0,0 +1,761 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+
+def as_2d(A):
+    """
+    将 Series / DataFrame / ndarray 统一转换为 (日期 × 资产) 的二维 float64 数组
+    :param A: 输入序列或面板
+    :return: (二维数组, 还原函数)，还原函数把计算结果包装回与输入相同的类型
+    """
+    if isinstance(A, pd.DataFrame):
+        index, columns = A.index, A.columns
+        values = np.ascontiguousarray(A.to_numpy(dtype=np.float64, na_value=np.nan))
+        return values, lambda res: pd.DataFrame(res, index=index, columns=columns)
+    if isinstance(A, pd.Series):
+        index, name = A.index, A.name
+        values = np.ascontiguousarray(A.to_numpy(dtype=np.float64, na_value=np.nan)).reshape(-1, 1)
+        return values, lambda res: pd.Series(res.ravel(), index=index, name=name)
+    values = np.asarray(A, dtype=np.float64)
+    if values.ndim == 1:
+        return np.ascontiguousarray(values).reshape(-1, 1), lambda res: res.ravel()
+    return np.ascontiguousarray(values), lambda res: res
+
+
+# 排名中视为并列的相对差异，数学上相等而只差浮点误差的值不分先后
+_RANK_TIE = 1e-10
+
+
+def valid_count(values, n):
+    """
+    计算每个位置过去 n 期(含当期)非 NaN 样本的个数，使用整数累加和
+    :param values: 二维数组
+    :param n: 窗口长度
+    :return: 与 values 同形状的 int64 数组
+    """
+    csum = np.cumsum(~np.isnan(values), axis=0, dtype=np.int64)
+    out = csum.copy()
+    out[n:] -= csum[:-n]
+    return out
+
+
+def rolling_rank(A, n, min_periods=None):
+    """
+    TSRANK(A, n) 的向量化实现：末位值在过去 n 期窗口中的排位(窗口内小于等于它的个数，取值 1~n)
+    对 (日期 × 资产) 面板一次性计算，按滞后期逐层比较，复杂度 O(T·N·n) 但全部在 numpy 中完成
+    :param A: Series / DataFrame / ndarray，二维时行为日期、列为资产
+    :param n: 窗口长度
+    :param min_periods: 窗口内最少的有效样本数，不足时结果为 NaN，默认为 n(与 ta.* 的预热期一致)
+    :return: 与输入同类型的排位结果
+    """
+    values, wrap = as_2d(A)
+    if min_periods is None:
+        min_periods = n
+    T = values.shape[0]
+    counts = np.zeros(values.shape, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        # 第 k 层比较 A[t-k] <= A[t]，NaN 参与比较时为 False，自动被忽略；
+        # 相差不超过该列最大绝对值 _RANK_TIE 倍的值视为相等
+        upper = values + _RANK_TIE * np.nanmax(np.abs(values), axis=0, initial=0.0)
+        for k in range(min(n, T)):
+            counts[k:] += values[:T - k] <= upper[k:]
+    result = np.where((valid_count(values, n) >= min_periods) & ~np.isnan(values), counts, np.nan)
+    return wrap(result)
+
+
+def rolling_sum(values, n):
+    """
+    二维数组沿日期方向的 n 期滑动求和(累加和差分实现)，NaN 视为 0，前 n-1 期为部分和
+    :param values: 二维数组
+    :param n: 窗口长度
+    :return: 与 values 同形状的数组
+    """
+    if np.isnan(values).any():
+        values = np.nan_to_num(values)
+    csum = np.cumsum(values, axis=0)
+    csum[n:] = csum[n:] - csum[:-n]
+    return csum
+
+
+def _column_center(values):
+    # 按列的非 NaN 均值，全为 NaN 的列(如未上市、已退市)取 0
+    # 由 nansum 与计数相除得到，与 nanmean 结果相同，但不会对空列发出 "Mean of empty slice" 警告
+    count = np.count_nonzero(~np.isnan(values), axis=0)
+    return np.nan_to_num(np.nansum(values, axis=0) / np.maximum(count, 1))
+
+
+def _demean(values):
+    # 按列减去均值，降低累加和差分时的数值误差(回归斜率对平移不变)
+    return values - _column_center(values)
+
+
+def rolling_beta(A, B, n):
+    """
+    REGBETA(A, B, n) 的滑动实现：每 n 期样本 A 对 B 回归所得的斜率 cov(A, B) / var(B)
+    基于 x、y、xy、x² 的滑动和，每一步 O(1)，整个面板一次完成
+    当 B 为 None 或长度恰为 n 的一维数组(如 SEQUENCE(n))时，B 作为每个窗口内固定的自变量，
+    其矩为常数；SEQUENCE(n) 还会进一步使用加权累加和的 O(1) 递推
+    :param A: 因变量，Series / DataFrame / ndarray
+    :param B: 自变量，与 A 同长度的序列/面板(一维时各列共用)，或长度为 n 的窗口内自变量，None 表示 SEQUENCE(n)
+    :param n: 窗口长度
+    :return: 与 A 同类型的斜率序列，窗口内存在 NaN 时为 NaN
+    """
+    y, wrap = as_2d(A)
+    T = y.shape[0]
+    if B is None:
+        B = np.arange(1, n + 1, dtype=np.float64)
+    x = np.asarray(B.to_numpy(dtype=np.float64, na_value=np.nan) if isinstance(B, (pd.Series, pd.DataFrame)) else B,
+                   dtype=np.float64)
+    if x.ndim == 1 and len(x) == n and T != n:
+        return wrap(_window_beta(y, x, n))
+    if x.ndim == 1:
+        x = x.reshape(-1, 1)
+    x, y = np.broadcast_arrays(x, y)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(valid, _demean(x), 0.0)
+    y = np.where(valid, _demean(y), 0.0)
+    cnt = rolling_sum(valid.astype(np.float64), n)
+    sx, sy = rolling_sum(x, n), rolling_sum(y, n)
+    sxy, sxx = rolling_sum(x * y, n), rolling_sum(x * x, n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    return wrap(np.where(cnt >= n, beta, np.nan))
+
+
+def _window_beta(y, x, n):
+    # 自变量在每个窗口内固定为 x[0..n-1]，斜率等于 y 的固定权重滑动加权和
+    T = y.shape[0]
+    xc = x - x.mean()
+    sxx = np.sum(xc * xc)
+    valid = ~np.isnan(y)
+    y0 = np.where(valid, _demean(y), 0.0)
+    out = np.full(y.shape, np.nan)
+    if T < n:
+        return out
+    if np.allclose(np.diff(x), x[1] - x[0] if n > 1 else 0.0):
+        # 等差序列(SEQUENCE)：Σ(k - k̄)·y 由 Σy 与 Σt·y 两个累加和 O(1) 得到
+        step = x[1] - x[0] if n > 1 else 0.0
+        t = np.arange(T, dtype=np.float64).reshape(-1, 1)
+        sy = rolling_sum(y0, n)
+        sty = rolling_sum(t * y0, n)
+        # 窗口 [t-n+1, t] 内位置 k = s - (t-n+1)，均值为 (n-1)/2
+        weighted = sty - (t - n + 1) * sy - (n - 1) / 2.0 * sy
+        num = step * weighted
+    else:
+        num = np.zeros(y.shape)
+        for k in range(n):
+            num[n - 1:] += xc[k] * y0[k:T - n + 1 + k]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = num / sxx
+    out[n - 1:] = beta[n - 1:]
+    out[valid_count(y, n) < n] = np.nan
+    return out
+
+
+def _regressor(B, T):
+    # 自变量统一为 (T, 1) 或 (T, N) 的二维数组，一维时各资产共用
+    x = np.asarray(B.to_numpy(dtype=np.float64, na_value=np.nan) if isinstance(B, (pd.Series, pd.DataFrame)) else B,
+                   dtype=np.float64)
+    if x.ndim == 1:
+        x = x.reshape(-1, 1)
+    if x.shape[0] != T:
+        raise ValueError(f'regressor length {x.shape[0]} does not match dependent length {T}')
+    return x
+
+
+def rolling_resid_std(A, X, n):
+    """
+    REGRESI(A, B1, ..., Bk, n) 的滑动实现：每 n 期样本 A 对 k 个自变量(含截距)做多元回归所得残差的标准差
+    正规方程 X'X、X'y、y'y 由累加和差分滑动更新，不对每个窗口重新拟合；
+    自变量为各资产共用的一维序列(如 MKT/SMB/HML)时，X'X 及其逆对所有资产只计算一次
+    :param A: 因变量，Series / DataFrame / ndarray
+    :param X: 自变量列表，每个元素为与 A 同长度的一维序列或同形状的面板
+    :param n: 窗口长度
+    :return: 与 A 同类型的残差标准差(总体标准差，ddof=0)，窗口内存在 NaN 时为 NaN
+    """
+    y, wrap = as_2d(A)
+    T = y.shape[0]
+    xs = [_demean(_regressor(B, T)) for B in X]
+    y = _demean(y)
+    valid = ~np.isnan(y)
+    for x in xs:
+        valid = valid & ~np.isnan(x)
+    width = y.shape[1] if any(x.shape[1] > 1 for x in xs) else 1
+    design = np.stack([np.ones((T, width))] + [np.broadcast_to(x, (T, width)) for x in xs], axis=-1)
+    k = design.shape[-1]
+    xx = rolling_sum(design[..., :, None] * design[..., None, :], n)
+    xy = rolling_sum(design * y[..., None], n)
+    yy = rolling_sum(y * y, n)
+    # 预热期及自变量缺失的窗口以单位阵占位，避免奇异矩阵求逆
+    x_valid = np.ones((T, width), dtype=bool)
+    for x in xs:
+        x_valid = x_valid & ~np.isnan(np.broadcast_to(x, (T, width)))
+    x_ok = valid_count(np.where(x_valid, 0.0, np.nan), n) >= n
+    xx[~x_ok] = np.eye(k)
+    try:
+        inv = np.linalg.inv(xx)
+    except np.linalg.LinAlgError:
+        inv = np.linalg.pinv(xx)
+    beta = np.matmul(inv, xy[..., None])[..., 0]
+    rss = yy - np.sum(beta * xy, axis=-1)
+    result = np.sqrt(np.maximum(rss, 0.0) / n)
+    return wrap(np.where(valid_count(np.where(valid, 0.0, np.nan), n) >= n, result, np.nan))
+
+
+def linear_decay(A, n):
+    """
+    DECAYLINEAR(A, n) 的向量化实现：权重依次为 1, 2, …, n(最新一期权重最大，权重和归一为 1)的移动加权平均
+    Σk·x 由 Σx 与 Σt·x 两个累加和差分得到，每一步 O(1)，整个面板一次完成，结果与 rolling(n) 对齐
+    :param A: Series / DataFrame / ndarray
+    :param n: 窗口长度
+    :return: 与输入同类型的结果，窗口内存在 NaN 时为 NaN
+    """
+    values, wrap = as_2d(A)
+    T = values.shape[0]
+    center = _column_center(values)
+    x = values - center
+    t = np.arange(T, dtype=np.float64).reshape(-1, 1)
+    sx = rolling_sum(x, n)
+    stx = rolling_sum(t * x, n)
+    # 窗口 [t-n+1, t] 内 s 期的权重为 s - (t-n)
+    weighted = stx - (t - n) * sx
+    result = weighted / (n * (n + 1) / 2.0) + center
+    # 常数窗口直接取该值，不带累加和差分的残余误差(如恒为 0 的相关系数)
+    result = np.where(_flat_windows(values, n), values, result)
+    return wrap(np.where(valid_count(values, n) >= n, result, np.nan))
+
+
+def recursive_sma(A, n, m=1, start=None):
+    """
+    SMA(A, n, m) 的面板实现：Y[t] = (A[t]·m + Y[t-1]·(n-m)) / n，每列在首个非 NaN 处以 A 的值作为初值
+    递推沿日期方向逐行进行，每一步对全部资产向量化计算；初值之后出现的 NaN 会沿递推向后传播
+    :param A: Series / DataFrame / ndarray
+    :param n:
+    :param m:
+    :param start: 每列开始递推的行号(如新股上市日)，整数或长度为资产数的数组，此前的值被忽略，默认为 0
+    :return: 与输入同类型的结果
+    """
+    values, wrap = as_2d(A)
+    T, N = values.shape
+    alpha, beta = m / n, (n - m) / n
+    if start is not None:
+        start = np.broadcast_to(np.asarray(start, dtype=np.int64), (N,))
+        values = np.where(np.arange(T).reshape(-1, 1) < start, np.nan, values)
+    out = np.empty((T, N))
+    prev = np.full(N, np.nan)
+    seeded = np.zeros(N, dtype=bool)
+    for t in range(T):
+        x = values[t]
+        seed = ~seeded & ~np.isnan(x)
+        prev = np.where(seeded, x * alpha + prev * beta, np.where(seed, x, np.nan))
+        seeded |= seed
+        out[t] = prev
+    return wrap(out)
+
+
+def cs_rank(A):
+    """
+    RANK(A) 的截面实现：每个日期(行)内对全部资产做升序百分位排名，取值 (0, 1]
+    NaN(停牌等)不参与排名且结果保持 NaN，并列值取平均排名；一维输入视为单个截面
+    相差不超过该截面最大绝对值 _RANK_TIE 倍的值视为并列，数学上相等的值(如对排名求相关得到的相关系数)
+    不会因为浮点误差而被排出先后
+    :param A: Series / DataFrame / ndarray，二维时行为日期、列为资产
+    :return: 与输入同类型的百分位排名
+    """
+    values, wrap = as_2d(A)
+    if np.ndim(A) == 1:
+        values = values.reshape(1, -1)
+    T, N = values.shape
+    order = np.argsort(values, axis=1, kind='stable')  # NaN 排在最后
+    ordered = np.take_along_axis(values, order, axis=1)
+    pos = np.broadcast_to(np.arange(N), (T, N))
+    # 并列组的起止位置：组首由前向累积最大值得到，组尾由反向累积最小值得到
+    new_group = np.ones((T, N), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        scale = _RANK_TIE * np.nanmax(np.abs(ordered), axis=1, initial=0.0, keepdims=True)
+        new_group[:, 1:] = ~(ordered[:, 1:] - ordered[:, :-1] <= scale)
+    first = np.maximum.accumulate(np.where(new_group, pos, 0), axis=1)
+    last_group = np.ones((T, N), dtype=bool)
+    last_group[:, :-1] = new_group[:, 1:]
+    last = np.minimum.accumulate(np.where(last_group, pos, N - 1)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty((T, N))
+    np.put_along_axis(ranks, order, (first + last) / 2.0 + 1.0, axis=1)
+    valid = ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = np.where(valid, ranks / valid.sum(axis=1, keepdims=True), np.nan)
+    if np.ndim(A) == 1:
+        result = result.reshape(-1, 1)
+    return wrap(result)
+
+
+# 成对滑动矩按列分块计算，使中间数组保持在缓存大小附近
+_COLUMN_BLOCK = 64
+# 窗口方差不足平方和的该比例时，一遍求和的相消误差可能超过排名的并列容差，改为逐窗口两遍计算
+_REFINE = 1e-4
+
+
+def _flat_windows(values, n):
+    # 过去 n 期内数值没有任何变化的窗口(NaN 视为变化)，由变化次数的整数累加和精确判断
+    changes = np.zeros(values.shape, dtype=np.int64)
+    changes[1:] = values[1:] != values[:-1]
+    csum = np.cumsum(changes, axis=0)
+    out = csum.copy()
+    if n - 1 < values.shape[0]:
+        out[n - 1:] -= csum[:values.shape[0] - n + 1]
+    return out == 0
+
+
+def _block_centers(x, n, valid):
+    # 每块的平移量：无 NaN 时取块首期的值，否则取块内成对有效样本的最大值，全部缺失的块沿用相邻块的平移量
+    if valid is None:
+        return x[::n]
+    T, w = x.shape
+    full = T // n * n
+    values = np.where(valid, x, np.nan)
+    centers = np.fmax.reduce(values[:full].reshape(-1, n, w), axis=1)
+    if full < T:
+        centers = np.concatenate([centers, np.fmax.reduce(values[full:], axis=0, keepdims=True)])
+    missing = np.isnan(centers)
+    if missing.any():
+        blocks = np.arange(len(centers)).reshape(-1, 1)
+        centers = np.take_along_axis(centers, np.maximum.accumulate(np.where(missing, 0, blocks), axis=0), axis=0)
+        last = len(centers) - 1
+        backward = np.minimum.accumulate(np.where(np.isnan(centers), last, blocks)[::-1], axis=0)[::-1]
+        centers = np.nan_to_num(np.take_along_axis(centers, backward, axis=0))
+    return centers
+
+
+def _shift_blocks(x, centers, n, out):
+    # out[t] = x[t] - centers[t // n]
+    T, w = x.shape
+    full = T // n * n
+    np.subtract(x[:full].reshape(-1, n, w), centers[:full // n, None], out=out[:full].reshape(-1, n, w))
+    if full < T:
+        np.subtract(x[full:], centers[full // n], out=out[full:T])
+
+
+def _block_moments(x, y, n, prefix, suffix, valid=None, head=False):
+    # 离差、离差乘积及与前一期是否不同交错写入缓冲区，按长度 n 分块求块内前缀和与后缀和，
+    # 窗口 [t-n+1, t] 的和 = 后缀[t-n+1] + 前缀[t](窗口恰为一整块时后缀取 0)。不需要逐窗口的掩码，
+    # 每个和最多累加 2n 项，不随历史长度累积误差。
+    # 前缀按本块的平移量、后缀按下一块的平移量求离差，同一窗口的两部分平移量相同，且与窗口内的数值相近，
+    # 价格远离全样本均值时短窗口的方差也不被相消误差淹没。
+    # valid 不为 None 时缺失值的离差记为 0，第 8 个通道累加成对有效样本数；
+    # 返回第 n-1 期起完整窗口的矩，head 为 True 时同时返回前 n-1 期的部分窗口(第一块的前缀和)
+    T = x.shape[0]
+    cx, cy = _block_centers(x, n, valid), _block_centers(y, n, valid)
+    prefix[T:] = 0.0
+    suffix[T:] = 0.0
+    prefix[0, 5:7] = 0.0
+    with np.errstate(invalid='ignore'):
+        np.not_equal(x[1:], x[:-1], out=prefix[1:T, 5])
+        np.not_equal(y[1:], y[:-1], out=prefix[1:T, 6])
+    if valid is not None:
+        prefix[:T, 7] = valid
+        invalid = ~valid
+    suffix[:T, 5:] = prefix[:T, 5:]
+    for buffer, shift in ((prefix, 0), (suffix, 1)):
+        dx, dy = buffer[:T, 0], buffer[:T, 1]
+        _shift_blocks(x, np.concatenate([cx[shift:], cx[len(cx) - shift:]]), n, dx)
+        _shift_blocks(y, np.concatenate([cy[shift:], cy[len(cy) - shift:]]), n, dy)
+        if valid is not None:
+            np.copyto(dx, 0.0, where=invalid)
+            np.copyto(dy, 0.0, where=invalid)
+        np.multiply(dx, dy, out=buffer[:T, 2])
+        np.multiply(dx, dx, out=buffer[:T, 3])
+        np.multiply(dy, dy, out=buffer[:T, 4])
+    # 按块内位置逐步累加，每一步同时处理所有块
+    blocks = prefix.reshape(-1, n, prefix.shape[1] * prefix.shape[2])
+    tail = suffix.reshape(blocks.shape)
+    for i in range(1, n):
+        np.add(blocks[:, i - 1], blocks[:, i], out=blocks[:, i])
+        np.add(tail[:, n - i], tail[:, n - i - 1], out=tail[:, n - i - 1])
+    tail[:, 0] = 0.0
+    stop = max(T - n + 1, 0)
+    window = _finish_moments(np.add(prefix[n - 1:T], suffix[:stop], out=suffix[:stop]), x, y, n, valid, n - 1)
+    if not head:
+        return window
+    return _finish_moments(prefix[:min(n - 1, T)].copy(), x, y, n, valid, 0), window
+
+
+def _finish_moments(sums, x, y, n, valid, first):
+    # sums 为第 first 期起各窗口的和：常数窗口的离差置为精确的 0，病态窗口逐窗口重新计算
+    sx, sy, sxy, sxx, syy = sums[:, 0], sums[:, 1], sums[:, 2], sums[:, 3], sums[:, 4]
+    # 窗口首期与窗口前一期的比较不属于窗口，扣除后变化次数为 0 的一方为常数窗口
+    flat_x, flat_y = sums[:, 5] == 0, sums[:, 6] == 0
+    lo = max(n - first, 0)
+    if lo < len(sums):
+        start, stop = lo + first - n + 1, first + len(sums) - n + 1
+        flat_x[lo:] |= (sums[lo:, 5] == 1) & (x[start:stop] != x[start - 1:stop - 1])
+        flat_y[lo:] |= (sums[lo:, 6] == 1) & (y[start:stop] != y[start - 1:stop - 1])
+    flat = flat_x | flat_y
+    sx[flat_x], sxx[flat_x] = 0.0, 0.0
+    sy[flat_y], syy[flat_y] = 0.0, 0.0
+    sxy[flat] = 0.0
+    # 病态窗口：方差 sxx - sx²/cnt 不足 sxx 的 _REFINE 倍，即 sx² > (1 - _REFINE)·cnt·sxx
+    cnt = n if valid is None else sums[:, 7]
+    scale = (1.0 - _REFINE) * cnt
+    bad = sx * sx > scale * sxx
+    bad |= sy * sy > scale * syy
+    rows, cols = np.nonzero(bad)
+    if len(rows):
+        for target, value, keep in zip((sx, sy, sxy, sxx, syy),
+                                       _window_moments(x, y, n, valid, rows + first, cols),
+                                       (flat_x, flat_y, flat, flat_x, flat_y)):
+            target[rows, cols] = np.where(keep[rows, cols], 0.0, value)
+    return cnt, sx, sy, sxy, sxx, syy
+
+
+def _window_moments(x, y, n, valid, rows, cols):
+    # 取出 rows 期结束的 n 期窗口(cols 列)交给 window_moments，窗口超出起点的部分视为缺失
+    index = rows.reshape(-1, 1) + np.arange(1 - n, 1)
+    inside = index >= 0
+    index = np.maximum(index, 0)
+    cols = cols.reshape(-1, 1)
+    ok = inside if valid is None else inside & valid[index, cols]
+    return window_moments(np.where(ok, x[index, cols], 0.0), np.where(ok, y[index, cols], 0.0), ok)
+
+
+def window_moments(xw, yw, ok):
+    """
+    逐个窗口先求窗口均值再对离差求矩，只用于一遍求和可能失准的少数病态窗口，rolling_cov / rolling_corr
+    与 Stream 中的在线算子共用。结果只取决于窗口内容，数学上相等的窗口(如只取 ±1 的两期相关系数)逐位相同
+    :param xw: 形状 (窗口数, n) 的 C 连续数组，由旧到新排列，缺失处为 0
+    :param yw: 同 xw
+    :param ok: 成对有效的位置
+    :return: sx, sy, sxy, sxx, syy
+    """
+    cnt = ok.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = np.where(ok, xw - xw.sum(axis=1, keepdims=True) / cnt, 0.0)
+        dy = np.where(ok, yw - yw.sum(axis=1, keepdims=True) / cnt, 0.0)
+    return dx.sum(axis=1), dy.sum(axis=1), (dx * dy).sum(axis=1), (dx * dx).sum(axis=1), (dy * dy).sum(axis=1)
+
+
+def _pair_moments(A, B, n, min_periods, reduce):
+    # 对 A、B 的成对有效样本计算中心化滑动矩，并按列块交给 reduce(cnt, sx, sy, sxy, sxx, syy) 汇总
+    x, wrap = as_2d(A)
+    y = _regressor(B, x.shape[0]) if np.ndim(B) == 1 else as_2d(B)[0]
+    x, y = np.broadcast_arrays(x, y)
+    need = n if min_periods is None else max(min_periods, 1)
+    T, N = x.shape
+    out = np.full(x.shape, np.nan)
+    if T == 0:
+        return wrap(out)
+    # 缓冲区按形状在各列块间复用
+    buffers = {}
+
+    def buffer(rows, channels, width):
+        shape = (-(-rows // n) * n, channels, width)
+        if shape not in buffers:
+            buffers.clear()
+            buffers[shape] = [np.empty(shape) for _ in range(2)]
+        return buffers[shape]
+
+    for j in range(0, N, _COLUMN_BLOCK):
+        xb, yb = x[:, j:j + _COLUMN_BLOCK], y[:, j:j + _COLUMN_BLOCK]
+        block = out[:, j:j + _COLUMN_BLOCK]
+        valid = ~(np.isnan(xb) | np.isnan(yb))
+        missing = np.nonzero(~valid.all(axis=1))[0]
+        start = missing[-1] + 1 if len(missing) else 0
+        if need >= n and T - start >= n and not valid[:start].any():
+            # 快速路径：没有 NaN，或 NaN 只出现在各列全部缺失的前 start 期(如上游算子的预热期)，
+            # 包含这些期的窗口保持 NaN
+            with np.errstate(invalid='ignore', divide='ignore'):
+                block[start + n - 1:] = reduce(*_block_moments(xb[start:], yb[start:], n,
+                                                               *buffer(T - start, 7, xb.shape[1])))
+            continue
+        if need < n:
+            head, window = _block_moments(xb, yb, n, *buffer(T, 8, xb.shape[1]), valid=valid, head=True)
+            pieces = [(block[:n - 1], head), (block[n - 1:], window)]
+        else:
+            pieces = [(block[n - 1:], _block_moments(xb, yb, n, *buffer(T, 8, xb.shape[1]), valid=valid))]
+        for target, moments in pieces:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                target[:] = np.where(moments[0] >= need, reduce(*moments), np.nan)
+    return wrap(out)
+
+
+def cov_from_moments(cnt, sx, sy, sxy, sxx, syy, ddof=1):
+    """
+    由成对样本的中心化矩得到协方差，rolling_cov 与 Stream 中的在线算子共用
+    :return:
+    """
+    return (sxy - sx * sy / cnt) / (cnt - ddof)
+
+
+def corr_from_moments(cnt, sx, sy, sxy, sxx, syy, flat=np.nan):
+    """
+    由成对样本的中心化矩得到相关系数，rolling_corr 与 Stream 中的在线算子共用
+    :return:
+    """
+    var_x = sxx - sx * sx / cnt
+    var_y = syy - sy * sy / cnt
+    # 累加和差分的残余误差可能使零方差窗口略偏离 0，按量级截断
+    corr = (sxy - sx * sy / cnt) / np.sqrt(var_x * var_y)
+    return np.where((var_x > 1e-12 * sxx) & (var_y > 1e-12 * syy), np.clip(corr, -1.0, 1.0), flat)
+
+
+def rolling_cov(A, B, n, min_periods=None, ddof=1):
+    """
+    COVIANCE(A, B, n) 的面板实现：A 与 B 过去 n 期的滑动协方差
+    滑动矩由按块平移的分块前缀和与后缀和得到，避免价格水平远大于波动时的相消误差；NaN 按成对有效样本计数
+    :param A: Series / DataFrame / ndarray
+    :param B: 与 A 同形状，或各列共用的一维序列
+    :param n: 窗口长度
+    :param min_periods: 窗口内最少的成对有效样本数，默认为 n
+    :param ddof: 自由度修正，默认 1(与 pandas 一致)
+    :return: 与 A 同类型的结果
+    """
+    return _pair_moments(A, B, n, min_periods, functools.partial(cov_from_moments, ddof=ddof))
+
+
+def rolling_corr(A, B, n, min_periods=None, flat=np.nan):
+    """
+    CORR(A, B, n) 的面板实现：A 与 B 过去 n 期的滑动相关系数，整个面板一次完成
+    :param A: Series / DataFrame / ndarray
+    :param B: 与 A 同形状，或各列共用的一维序列
+    :param n: 窗口长度
+    :param min_periods: 窗口内最少的成对有效样本数，默认为 n(与 ta.CORREL 一致)
+    :param flat: 任一方窗口内方差为 0 时的取值，默认 NaN(与 pandas 一致)，ta.CORREL 取 0
+    :return: 与 A 同类型的结果
+    """
+    return _pair_moments(A, B, n, min_periods, functools.partial(corr_from_moments, flat=flat))
+
+
+def _sliding_extreme(values, n, ufunc):
+    # 倍增表：每层把窗口长度翻倍，窗口 n 由两个重叠的 2^k 窗口合成，共 O(log n) 次整面板比较；
+    # 两个缓冲区轮流存放各层及结果，NaN 由 np.maximum / np.minimum 自动传播到包含它的窗口
+    T = values.shape[0]
+    if T < n:
+        return np.full(values.shape, np.nan)
+    buffers = [np.empty(values.shape)]
+    level, span = values, 1
+    while span * 2 <= n:
+        if len(buffers) == 1:
+            buffers.append(np.empty(values.shape))
+        buffers.reverse()
+        ufunc(level[:T - span], level[span:T], out=buffers[0][:T - span])
+        level, span = buffers[0], span * 2
+    out = buffers[-1]
+    ufunc(level[:T - n + 1], level[n - span:T - span + 1], out=out[n - 1:])
+    out[:n - 1] = np.nan
+    return out
+
+
+def rolling_max(A, n):
+    """
+    TSMAX(A, n) 的面板实现：只求过去 n 期的最大值，不计算位置，结果与 rolling_extrema 逐位相同
+    :param A: Series / DataFrame / ndarray
+    :param n: 窗口长度
+    :return: 与输入同类型的结果，窗口内存在 NaN 时为 NaN
+    """
+    values, wrap = as_2d(A)
+    return wrap(_sliding_extreme(values, n, np.maximum))
+
+
+def rolling_min(A, n):
+    """
+    TSMIN(A, n) 的面板实现，见 rolling_max
+    :param A: Series / DataFrame / ndarray
+    :param n: 窗口长度
+    :return: 与输入同类型的结果，窗口内存在 NaN 时为 NaN
+    """
+    values, wrap = as_2d(A)
+    return wrap(_sliding_extreme(values, n, np.minimum))
+
+
+def rolling_extrema(A, n, how='max'):
+    """
+    TSMAX/TSMIN 与 HIGHDAY/LOWDAY 的共用实现：一次计算过去 n 期的极值及其距今的期数
+    采用 van Herk/Gil-Werman 分块算法：按 n 分块后求块内前缀、后缀极值，任一窗口的极值为
+    后缀[t-n+1] 与前缀[t] 中的较大者，每一步摊还 O(1) 次比较，整个面板一次完成
+    :param A: Series / DataFrame / ndarray
+    :param n: 窗口长度
+    :param how: 'max' 或 'min'
+    :return: (极值, 极值距今期数)，均与输入同类型；并列时取最近的一期，窗口内存在 NaN 时为 NaN
+    """
+    values, wrap = as_2d(A)
+    if how not in ('max', 'min'):
+        raise ValueError(f"how must be 'max' or 'min', got {how!r}")
+    T, N = values.shape
+    # 极值由倍增表求得(窗口内有 NaN 时为 NaN)，分块算法只用于位置
+    value = _sliding_extreme(values, n, np.maximum if how == 'max' else np.minimum)
+    offset = np.full((T, N), np.nan)
+    if T < n:
+        return wrap(value), wrap(offset)
+    rows = -(-T // n) * n
+    padded = np.full((rows, N), -np.inf)
+    np.multiply(values, 1.0 if how == 'max' else -1.0, out=padded[:T])
+    padded[:T][np.isnan(values)] = -np.inf
+    blocks = padded.reshape(-1, n, N)
+    # 位置用 int32 存放，减少中间数组的内存
+    pos = np.arange(rows, dtype=np.int32).reshape(-1, n, 1)
+    # 块内前缀、后缀极值及其位置按块内位置逐步递推，每一步同时处理所有块(比沿中间轴的 accumulate 快)
+    prefix, suffix = blocks.copy(), blocks.copy()
+    prefix_at = np.broadcast_to(pos, blocks.shape).copy()
+    suffix_at = prefix_at.copy()
+    for i in range(1, n):
+        # 前缀：与当前前缀极值相等时取最近的位置
+        keep = prefix[:, i - 1] > prefix[:, i]
+        np.maximum(prefix[:, i - 1], prefix[:, i], out=prefix[:, i])
+        np.copyto(prefix_at[:, i], prefix_at[:, i - 1], where=keep)
+        # 后缀：自右向左只有严格更大才更新，相等时保留离起点最近者
+        j = n - 1 - i
+        keep = suffix[:, j + 1] >= suffix[:, j]
+        np.maximum(suffix[:, j + 1], suffix[:, j], out=suffix[:, j])
+        np.copyto(suffix_at[:, j], suffix_at[:, j + 1], where=keep)
+    take_prefix = prefix.reshape(-1, N)[n - 1:T] >= suffix.reshape(-1, N)[:T - n + 1]
+    at = np.where(take_prefix, prefix_at.reshape(-1, N)[n - 1:T], suffix_at.reshape(-1, N)[:T - n + 1])
+    np.subtract(np.arange(n - 1, T).reshape(-1, 1), at, out=offset[n - 1:])
+    offset[np.isnan(value)] = np.nan
+    return wrap(value), wrap(offset)
+
+
+def delay_2d(values, n=1):
+    """
+    二维数组沿日期方向滞后 n 期，前 n 期为 NaN
+    :param values: 二维数组
+    :param n:
+    :return:
+    """
+    out = np.full(values.shape, np.nan)
+    if n < values.shape[0]:
+        out[n:] = values[:values.shape[0] - n]
+    return out
+
+
+def directional_movement(open_df=None, high_df=None, low_df=None, close_df=None, n=1):
+    """
+    一次计算 OHLC 面板的 DTM、DBM、HD、LD、TR，共用同一组 DELAY 结果，只计算输入允许的部分
+    DTM: (OPEN<=DELAY(OPEN,1)?0:MAX((HIGH-OPEN),(OPEN-DELAY(OPEN,1))))
+    DBM: (OPEN>=DELAY(OPEN,1)?0:MAX((OPEN-LOW),(OPEN-DELAY(OPEN,1))))
+    HD: HIGH-DELAY(HIGH,1)
+    LD: DELAY(LOW,1)-LOW
+    TR: MAX(MAX(HIGH-LOW,ABS(HIGH-DELAY(CLOSE,1))),ABS(LOW-DELAY(CLOSE,1)))
+    :param open_df:
+    :param high_df:
+    :param low_df:
+    :param close_df:
+    :param n: DELAY 的期数
+    :return: dict，键为 'dtm'、'dbm'、'hd'、'ld'、'tr'，值与输入同类型
+    """
+    fields = {name: as_2d(df) for name, df in
+              (('open', open_df), ('high', high_df), ('low', low_df), ('close', close_df)) if df is not None}
+    wrap = next(iter(fields.values()))[1]
+    values = {name: pair[0] for name, pair in fields.items()}
+    delayed = {name: delay_2d(arr, n) for name, arr in values.items()}
+    result = {}
+    with np.errstate(invalid='ignore'):
+        if 'open' in values:
+            o, do = values['open'], delayed['open']
+            gap = o - do
+            if 'high' in values:
+                result['dtm'] = np.where(o <= do, 0.0, np.maximum(values['high'] - o, gap))
+            if 'low' in values:
+                result['dbm'] = np.where(o >= do, 0.0, np.maximum(o - values['low'], gap))
+        if 'high' in values:
+            result['hd'] = values['high'] - delayed['high']
+        if 'low' in values:
+            result['ld'] = delayed['low'] - values['low']
+        if {'high', 'low', 'close'} <= values.keys():
+            h, l, dc = values['high'], values['low'], delayed['close']
+            result['tr'] = np.maximum(np.maximum(h - l, np.abs(h - dc)), np.abs(l - dc))
+    return {name: wrap(arr) for name, arr in result.items()}
+
+
+def _condition(cond, T):
+    # 条件统一为二维布尔数组，浮点条件中的 NaN 视为不满足
+    values = np.asarray(cond.to_numpy() if isinstance(cond, (pd.Series, pd.DataFrame)) else cond)
+    if values.dtype != bool:
+        values = np.asarray(values, dtype=np.float64)
+        values = (values != 0) & ~np.isnan(values)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    if values.shape[0] != T:
+        raise ValueError(f'condition length {values.shape[0]} does not match length {T}')
+    return values
+
+
+def _stacked_window_sum(stack, n):
+    # 对 (k, T, N) 的堆叠数组沿日期方向一次性做 n 期滑动和，前 n-1 期置为 NaN
+    csum = np.cumsum(stack, axis=1)
+    csum[:, n:] = csum[:, n:] - csum[:, :-n]
+    out = csum.astype(np.float64)
+    out[:, :n - 1] = np.nan
+    return out
+
+
+def rolling_count(conditions, n):
+    """
+    COUNT(condition, n) 的面板实现：前 n 期满足条件的样本个数，使用整数累加和
+    传入多个条件时堆叠后一次累加完成
+    :param conditions: 布尔 Series / DataFrame / ndarray，或它们组成的 list / tuple
+    :param n: 窗口长度
+    :return: 与条件同类型的计数(前 n-1 期为 NaN)；传入多个条件时返回同长度的 list
+    """
+    many = isinstance(conditions, (list, tuple))
+    conditions = list(conditions) if many else [conditions]
+    like, wrap = as_2d(conditions[0])
+    masks = [_condition(cond, like.shape[0]) for cond in conditions]
+    shape = np.broadcast_shapes(*[mask.shape for mask in masks])
+    stack = np.stack([np.broadcast_to(mask, shape) for mask in masks]).astype(np.int64)
+    result = [wrap(arr) for arr in _stacked_window_sum(stack, n)]
+    return result if many else result[0]
+
+
+def rolling_sumif(A, n, conditions):
+    """
+    SUMIF(A, n, condition) 的面板实现：前 n 期满足条件的 A 值之和
+    传入多个条件时共用同一份 A，堆叠后一次累加完成；满足条件的样本为 NaN 时该窗口为 NaN，
+    不会像 ta.SUM 那样污染之后的全部结果
+    :param A: Series / DataFrame / ndarray
+    :param n: 窗口长度
+    :param conditions: 布尔 Series / DataFrame / ndarray，或它们组成的 list / tuple
+    :return: 与 A 同类型的结果(前 n-1 期为 NaN)；传入多个条件时返回同长度的 list
+    """
+    many = isinstance(conditions, (list, tuple))
+    conditions = list(conditions) if many else [conditions]
+    values, wrap = as_2d(A)
+    masks = [_condition(cond, values.shape[0]) for cond in conditions]
+    missing = np.isnan(values)
+    filled = np.where(missing, 0.0, values)
+    sums = _stacked_window_sum(np.stack([np.where(mask, filled, 0.0) for mask in masks]), n)
+    holes = _stacked_window_sum(np.stack([mask & missing for mask in masks]).astype(np.int64), n)
+    result = [wrap(np.where(hole > 0, np.nan, total)) for total, hole in zip(sums, holes)]
+    return result if many else result[0]
+
+
+def rolling_mean(A, n):
+    """
+    MEAN(A, n) 的面板实现：过去 n 期的滑动均值，窗口内存在 NaN 时为 NaN
+    :param A: Series / DataFrame / ndarray
+    :param n: 窗口长度
+    :return: 与输入同类型的结果
+    """
+    values, wrap = as_2d(A)
+    center = _column_center(values)
+    result = rolling_sum(values - center, n) / n + center
+    # 常数窗口直接取该值，不带累加和差分的残余误差
+    result = np.where(_flat_windows(values, n), values, result)
+    return wrap(np.where(valid_count(values, n) >= n, result, np.nan))
+
+
+def rolling_std(A, n, ddof=1):
+    """
+    STD(A, n) 的面板实现：过去 n 期的滑动标准差，数据按列中心化后由累加和差分计算
+    :param A: Series / DataFrame / ndarray
+    :param n: 窗口长度
+    :param ddof: 自由度修正，1 与 pandas 一致，0 与 ta.STDDEV 一致
+    :return: 与输入同类型的结果，窗口内存在 NaN 时为 NaN
+    """
+    values, wrap = as_2d(A)
+    x = _demean(values)
+    sx, sxx = rolling_sum(x, n), rolling_sum(x * x, n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = np.maximum(sxx - sx * sx / n, 0.0) / (n - ddof)
+        # 累加和差分的残余误差按量级截断，保证常数窗口的标准差为 0
+        var[var <= 1e-14 * sxx / n] = 0.0
+    return wrap(np.where(valid_count(values, n) >= n, np.sqrt(var), np.nan))
@@ -0,0 +1,318 @@
+"""
+公式表达式图的优化：
+
+1. 合并相同子式：结构相同的子树(跨多个公式)只保留一个节点，如 alpha191_55 中反复出现的 ABS(HIGH-DELAY(CLOSE,1))，
+   加法、乘法等可交换运算的参数按固定顺序排列，A+B 与 B+A 视为同一子式
+2. 常量折叠：全部参数为常数的逐元素运算、条件为常数的 ?:、乘 1、除 1 等在编译时化简
+3. 逐元素运算融合：只被一个逐元素运算使用的逐元素子式并入使用者，整条运算链成为一个内核，
+   内核在复用的缓冲区上原地计算，整面板大小的临时数组只保留同时存活的少数几个
+
+    >>> program = compile_formulas({'alpha191_55': formula_text(55), 'alpha191_137': formula_text(137)})
+    >>> program.stats
+    >>> program(panel)
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from .Formula import BINARY, OPERATIONS, Node, evaluate_all, parse, walk
+
+# 逐元素运算：可以融合为一个内核
+ELEMENTWISE = set(BINARY) | {'NEG', '?:', 'MAX', 'MIN', 'ABS', 'LOG', 'SIGN', 'EXP', 'SQRT'}
+# 交换参数不改变结果(浮点运算同样成立)
+COMMUTATIVE = {'+', '*', '==', '!=', '&', '|', 'MAX', 'MIN'}
+# 结果为布尔数组
+BOOLEAN = {'<', '>', '<=', '>=', '==', '!=', '&', '|'}
+
+# 融合内核中各运算对应的 ufunc，可直接写入指定的缓冲区
+UFUNCS = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.true_divide,
+    '^': np.power,
+    '<': np.less,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    '&': np.logical_and,
+    '|': np.logical_or,
+    'NEG': np.negative,
+    'MAX': np.maximum,
+    'MIN': np.minimum,
+    'ABS': np.abs,
+    'LOG': np.log,
+    'SIGN': np.sign,
+    'EXP': np.exp,
+    'SQRT': np.sqrt,
+}
+
+
+def _const(node):
+    return node.op == 'CONST'
+
+
+def _simplify(op, args, params):
+    # 返回化简后的节点，无法化简时返回 None
+    if op not in ELEMENTWISE:
+        return None
+    if all(_const(arg) for arg in args):
+        with np.errstate(all='ignore'):
+            return Node('CONST', params=(float(OPERATIONS[op](*[arg.params[0] for arg in args])),))
+    if op == '?:' and _const(args[0]):
+        return args[1] if args[0].params[0] else args[2]
+    if op == 'NEG' and args[0].op == 'NEG':
+        return args[0].args[0]
+    # 恒等运算：x*1、1*x、x/1、x-0、x^1；布尔数组乘 1 会变为整数，不化简
+    left, right = (args + [None])[:2]
+    if op in ('*', '/', '-', '^') and _const(right) and right.params[0] == (0 if op == '-' else 1) \
+            and left.op not in BOOLEAN:
+        return left
+    if op == '*' and _const(left) and left.params[0] == 1 and right.op not in BOOLEAN:
+        return right
+    return None
+
+
+class Graph(object):
+    """
+    哈希共享的表达式图：加入的每个公式逐节点规范化，结构相同的子式在整个图中只有一个节点
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self._serial = {}
+        self.roots = OrderedDict()
+
+    def add(self, name, root):
+        """
+        :param name: 公式名称
+        :param root: 公式的根节点
+        :return: 规范化后的根节点
+        """
+        canonical = {}
+        for node in root.walk():
+            canonical[id(node)] = self._make(node.op, [canonical[id(arg)] for arg in node.args], node.params)
+        self.roots[name] = canonical[id(root)]
+        return self.roots[name]
+
+    def _make(self, op, args, params):
+        simplified = _simplify(op, args, params)
+        if simplified is not None:
+            # 化简结果要么是已规范化的子节点，要么是新的常数
+            return self._make('CONST', [], simplified.params) if _const(simplified) else simplified
+        if op in COMMUTATIVE:
+            args = sorted(args, key=lambda arg: self._serial[id(arg)])
+        key = op, tuple(id(arg) for arg in args), params
+        if key not in self._nodes:
+            node = Node(op, args, params)
+            self._nodes[key] = node
+            self._serial[id(node)] = len(self._serial)
+        return self._nodes[key]
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+class Fused(object):
+    """
+    融合后的逐元素内核
+    steps 为依次执行的 (运算, 操作数)，操作数为 ('input', i)、('const', 数值) 或 ('step', j)；最后一步为内核结果。
+    执行时每一步写入缓冲区，操作数在最后一次使用后其缓冲区交给后续步骤复用
+    """
+
+    def __init__(self, steps):
+        self.steps = tuple(steps)
+        last = {}
+        for i, (_, operands) in enumerate(self.steps):
+            for kind, value in operands:
+                if kind == 'step':
+                    last[value] = i
+        self._last = last
+        self._types = {}
+
+    def expression(self, inputs):
+        """
+        :param inputs: 各输入的表示
+        :return: 内核的表达式文本
+        """
+        texts = []
+        for op, operands in self.steps:
+            items = [inputs[value] if kind == 'input' else f'{value:g}' if kind == 'const' else texts[value]
+                     for kind, value in operands]
+            if op == 'NEG':
+                texts.append(f'(-{items[0]})')
+            elif op == '?:':
+                texts.append('({}?{}:{})'.format(*items))
+            elif op in BINARY:
+                texts.append(f'({items[0]}{op}{items[1]})')
+            else:
+                texts.append(f'{op}({", ".join(items)})')
+        return f'FUSED[{texts[-1]}]'
+
+    @property
+    def scratch(self):
+        """
+        :return: 执行时同时存活的中间缓冲区个数(不含结果)
+        """
+        free = peak = 0
+        for i, (_, operands) in enumerate(self.steps[:-1]):
+            if free:
+                free -= 1
+            else:
+                peak += 1
+            free += sum(kind == 'step' and self._last[value] == i for kind, value in operands)
+        return peak
+
+    def __call__(self, *inputs):
+        values, pool = [], {}
+        dtypes = self._dtypes(inputs)
+        for i, (op, operands) in enumerate(self.steps):
+            args = [inputs[value] if kind == 'input' else value if kind == 'const' else values[value]
+                    for kind, value in operands]
+            shape = np.broadcast_shapes(*[np.shape(arg) for arg in args])
+            free = pool.get((dtypes[i], shape))
+            out = free.pop() if free and i < len(self.steps) - 1 else np.empty(shape, dtype=dtypes[i])
+            if op == '?:':
+                cond = args[0] if np.asarray(args[0]).dtype == bool else np.asarray(args[0]).astype(bool)
+                np.copyto(out, args[2])
+                np.copyto(out, args[1], where=np.broadcast_to(cond, out.shape))
+            else:
+                UFUNCS[op](*args, out=out)
+            values.append(out)
+            # 本步之后不再使用的中间结果，缓冲区放回池中
+            for kind, value in operands:
+                if kind == 'step' and self._last[value] == i and values[value] is not None:
+                    buffer, values[value] = values[value], None
+                    pool.setdefault((buffer.dtype, buffer.shape), []).append(buffer)
+        return values[-1]
+
+    def _dtypes(self, inputs):
+        # 各步结果的类型与不融合时逐步计算得到的类型一致，按输入类型在单个元素上试算一次后记忆
+        signature = tuple(np.asarray(arg).dtype if np.ndim(arg) else type(arg) for arg in inputs)
+        if signature not in self._types:
+            samples, values = [np.zeros(1, dtype=arg.dtype) if np.ndim(arg) else arg for arg in inputs], []
+            with np.errstate(all='ignore'):
+                for op, operands in self.steps:
+                    values.append(OPERATIONS[op](*[samples[value] if kind == 'input' else value if kind == 'const'
+                                                   else values[value] for kind, value in operands]))
+            self._types[signature] = [np.asarray(value).dtype for value in values]
+        return self._types[signature]
+
+    def __repr__(self):
+        return self.expression([f'${i}' for i in range(self.inputs)])
+
+    @property
+    def inputs(self):
+        return 1 + max((value for _, operands in self.steps for kind, value in operands if kind == 'input'),
+                       default=-1)
+
+
+def fuse(roots):
+    """
+    把只被一个逐元素运算使用的逐元素子式并入使用者，得到融合后的表达式图
+    :param roots: 根节点列表(通常为 Graph 的根节点)
+    :return: 与 roots 对应的新根节点列表
+    """
+    order = walk(roots)
+    consumers = {}
+    for node in order:
+        for arg in {id(arg): arg for arg in node.args}.values():
+            consumers.setdefault(id(arg), []).append(node)
+    root_ids = {id(root) for root in roots}
+
+    def absorbed(node):
+        users = consumers.get(id(node), ())
+        return (node.op in ELEMENTWISE and id(node) not in root_ids and len(users) == 1
+                and users[0].op in ELEMENTWISE)
+
+    rebuilt = {}
+    for node in order:
+        if node.op in ELEMENTWISE and absorbed(node):
+            continue
+        if node.op in ELEMENTWISE and any(absorbed(arg) for arg in node.args):
+            rebuilt[id(node)] = _kernel(node, absorbed, rebuilt)
+        else:
+            rebuilt[id(node)] = Node(node.op, [rebuilt[id(arg)] for arg in node.args], node.params)
+    return [rebuilt[id(root)] for root in roots]
+
+
+def _kernel(root, absorbed, rebuilt):
+    # 把 root 及其被并入的子式整理为 Fused 的执行步骤
+    inputs, steps, index = [], [], {}
+
+    def operand(node):
+        if node.op == 'CONST':
+            return 'const', node.params[0]
+        if node.op in ELEMENTWISE and absorbed(node):
+            return 'step', emit(node)
+        if id(node) not in index:
+            index[id(node)] = len(inputs)
+            inputs.append(rebuilt[id(node)])
+        return 'input', index[id(node)]
+
+    def emit(node):
+        operands = [operand(arg) for arg in node.args]
+        steps.append((node.op, operands))
+        return len(steps) - 1
+
+    emit(root)
+    return Node('FUSED', inputs, (Fused(steps),))
+
+
+def arrays(roots):
+    """
+    执行表达式图需要分配的整面板数组个数：每个运算节点的结果，加上融合内核同时存活的中间缓冲区
+    :param roots:
+    :return:
+    """
+    return sum(1 + (node.params[0].scratch if node.op == 'FUSED' else 0)
+               for node in walk(roots) if node.op not in ('FIELD', 'CONST'))
+
+
+class Program(object):
+    """
+    优化后的多公式程序：program(panel) 返回 {名称: DataFrame}
+    """
+
+    def __init__(self, formulas, fused=True):
+        """
+        :param formulas: {名称: 公式字符串或已解析的根节点}
+        :param fused: 是否融合逐元素运算链
+        """
+        self.graph = Graph()
+        originals = OrderedDict()
+        for name, formula in formulas.items():
+            originals[name] = parse(formula) if isinstance(formula, str) else formula
+            self.graph.add(name, originals[name])
+        self.names = list(originals)
+        roots = list(self.graph.roots.values())
+        self.roots = fuse(roots) if fused else roots
+        self.stats = {
+            'nodes': sum(len(walk([root])) for root in originals.values()),
+            'shared_nodes': len(walk(roots)),
+            'arrays_before': sum(arrays([root]) for root in originals.values()),
+            'arrays_after': arrays(self.roots),
+            'kernels': sum(node.op == 'FUSED' for node in walk(self.roots)),
+        }
+
+    def __call__(self, panel):
+        results = evaluate_all(self.roots, panel)
+        return OrderedDict((name, panel.frame(np.asarray(values, dtype=np.float64)))
+                           for name, values in zip(self.names, results))
+
+    def __repr__(self):
+        return f'Program({len(self.names)} formulas, {self.stats})'
+
+
+def compile_formulas(formulas, fused=True):
+    """
+    一次编译多个公式：合并各公式之间的相同子式、折叠常量、融合逐元素运算链
+    :param formulas: {名称: 公式字符串}，或公式字符串列表(以字符串本身为名称)
+    :param fused: 是否融合逐元素运算链
+    :return: Program
+    """
+    if not isinstance(formulas, dict):
+        formulas = OrderedDict((text, text) for text in formulas)
+    return Program(formulas, fused)
@@ -0,0 +1,202 @@
+import functools
+import inspect
+
+import numpy as np
+import pandas as pd
+
+from .Kernel import delay_2d
+
+# 面板按资产对齐的字段，形状为 (日期, 资产)
+ASSET_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount', 'vwap')
+# 全市场共用的字段(基准指数与因子收益)，形状为 (日期, 1)，可与资产字段直接广播
+MARKET_FIELDS = ('benchmark_open', 'benchmark_close', 'mkt', 'smb', 'hml')
+
+# alpha191_* 的参数名与面板字段的对应关系，包括原函数签名中的拼写变体
+PARAM_FIELDS = {
+    'open_df': 'open',
+    'high_df': 'high',
+    'low_df': 'low',
+    'close_df': 'close',
+    'volume_df': 'volume',
+    'amount_df': 'amount',
+    'vwap_df': 'vwap',
+    'vwamp_df': 'vwap',
+    'ret_df': 'ret',
+    'close_ret_df': 'ret',
+    'df': 'ret',
+    'benchmark_open_df': 'benchmark_open',
+    'banchmark_open_df': 'benchmark_open',
+    'benchmark_close_df': 'benchmark_close',
+    'banchmark_close_df': 'benchmark_close',
+    'benchmark_close_ret_df': 'benchmark_ret',
+    'mkt_df': 'mkt',
+    'smb_df': 'smb',
+    'hml_df': 'hml',
+}
+
+
+class Panel(object):
+    """
+    对齐后的行情面板：所有字段共用同一组日期和资产索引，存储为 C 连续的只读 float64 数组，
+    使因子计算中的类型转换在每次运行时只发生一次；字段只能通过 panel[name] = values 整体替换
+    """
+
+    def __init__(self, dates, assets, **fields):
+        """
+        :param dates: 日期索引，长度为 T
+        :param assets: 资产索引，长度为 N
+        :param fields: 字段数组，资产字段形状为 (T, N)，市场字段形状为 (T,) 或 (T, 1)
+        """
+        self.dates = pd.Index(dates)
+        self.assets = pd.Index(assets)
+        self._fields = {}
+        self._derived = {}
+        for name, values in fields.items():
+            if values is not None:
+                self[name] = values
+        if 'vwap' not in self._fields and {'amount', 'volume'} <= self._fields.keys():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                vwap = self.amount / self.volume
+            vwap.flags.writeable = False
+            self._fields['vwap'] = vwap
+
+    @classmethod
+    def from_frames(cls, **frames):
+        """
+        由 DataFrame / Series 构建面板，资产字段按日期与资产的并集对齐，市场字段按日期对齐
+        :param frames: 字段名到 DataFrame(日期 × 资产) 或 Series(日期) 的映射
+        :return:
+        """
+        asset_frames = {k: v for k, v in frames.items() if isinstance(v, pd.DataFrame)}
+        if not asset_frames:
+            raise ValueError('at least one dates x assets DataFrame is required')
+        dates = functools.reduce(pd.Index.union, [df.index for df in asset_frames.values()])
+        assets = functools.reduce(pd.Index.union, [df.columns for df in asset_frames.values()])
+        fields = {}
+        for name, frame in frames.items():
+            if isinstance(frame, pd.DataFrame):
+                fields[name] = frame.reindex(index=dates, columns=assets).to_numpy(dtype=np.float64, na_value=np.nan)
+            elif frame is not None:
+                fields[name] = pd.Series(frame).reindex(dates).to_numpy(dtype=np.float64, na_value=np.nan)
+        for values in fields.values():
+            # 新建的数组归面板所有，直接设为只读即可，不必再复制
+            values.flags.writeable = False
+        return cls(dates, assets, **fields)
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.assets)
+
+    @property
+    def fields(self):
+        return tuple(self._fields)
+
+    def __setitem__(self, name, values):
+        values = np.asarray(values.to_numpy(dtype=np.float64, na_value=np.nan)
+                            if isinstance(values, (pd.Series, pd.DataFrame)) else values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        if values.shape[0] != len(self.dates) or values.shape[1] not in (1, len(self.assets)):
+            raise ValueError(f'field {name!r} has shape {values.shape}, expected ({len(self.dates)}, '
+                             f'{len(self.assets)}) or ({len(self.dates)}, 1)')
+        if values.flags.writeable or not values.flags.c_contiguous:
+            # 可写的输入复制一份再设为只读，调用方之后修改原数组不会影响面板；只读输入(如只读内存映射)直接使用
+            values = np.array(values, order='C')
+            values.flags.writeable = False
+        self._fields[name] = values
+        self._derived.clear()
+
+    def __getitem__(self, name):
+        if name in self._fields:
+            return self._fields[name]
+        if name in self._derived:
+            return self._derived[name]
+        if name == 'ret' and 'close' in self._fields:
+            base = self._fields['close']
+        elif name == 'benchmark_ret' and 'benchmark_close' in self._fields:
+            base = self._fields['benchmark_close']
+        else:
+            raise KeyError(name)
+        # 收益率由收盘价派生，首次访问时计算一次
+        with np.errstate(invalid='ignore', divide='ignore'):
+            derived = base / delay_2d(base, 1) - 1
+        derived.flags.writeable = False
+        self._derived[name] = derived
+        return derived
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self):
+        return f'Panel({len(self.dates)} dates x {len(self.assets)} assets, fields={list(self.fields)})'
+
+    def slice(self, start=None, stop=None):
+        """
+        按日期位置截取面板，字段为原数组的视图，不复制数据
+        :param start:
+        :param stop:
+        :return:
+        """
+        rows = slice(start, stop)
+        return Panel(self.dates[rows], self.assets, **{k: v[rows] for k, v in self._fields.items()})
+
+    def frame(self, values):
+        """
+        将 (日期, 资产) 形状的计算结果包装为以面板索引为行列的 DataFrame，其他形状原样返回
+        :param values:
+        :return:
+        """
+        values = np.asarray(values)
+        if values.ndim == 2 and values.shape == self.shape:
+            return pd.DataFrame(values, index=self.dates, columns=self.assets)
+        if values.ndim == 2 and values.shape == (len(self.dates), 1):
+            return pd.Series(values[:, 0], index=self.dates)
+        return values
+
+
+def panel_arguments(func, panel, **kwargs):
+    """
+    按 alpha191_* 的参数名从面板中取出对应字段，组成调用参数；已在 kwargs 中给出的参数不覆盖
+    :param func:
+    :param panel:
+    :param kwargs:
+    :return:
+    """
+    arguments = dict(kwargs)
+    for name, param in inspect.signature(func).parameters.items():
+        if name in arguments or name not in PARAM_FIELDS:
+            continue
+        field = PARAM_FIELDS[name]
+        if field in panel:
+            arguments[name] = panel[field]
+        elif param.default is inspect.Parameter.empty:
+            raise KeyError(f'{func.__name__} requires field {field!r} which the panel does not provide')
+    return arguments
+
+
+def accepts_panel(func):
+    """
+    使因子函数可以直接以 Panel 作为唯一的位置参数调用，如 alpha191_1(panel, n=6)，结果包装为 DataFrame
+    :param func:
+    :return:
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if len(args) == 1 and isinstance(args[0], Panel):
+            panel = args[0]
+            return panel.frame(func(**panel_arguments(func, panel, **kwargs)))
+        return func(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,570 @@
+"""
+多进程并行计算因子
+
+compute_parallel：按因子划分任务，分发到进程池。面板字段只复制一次到共享内存(由 Store 打开的字段直接映射同一文件)，
+各工作进程连接后直接使用只读视图，任务参数只有因子名；按估计的计算量从大到小提交，结果按请求顺序返回，并记录每个因子的耗时。
+
+compute_sharded：按资产划分，每个工作进程只计算自己那一段资产。时间序列算子(DELAY、MA、tsrank、sma 等)按资产独立，
+各进程互不等待；截面算子(rank)需要同一日期的全部资产，调用处插入同步：各进程把输入写入共享的整面板缓冲区，
+等待全部写完后按日期分段计算排名，再各自取回本段资产的结果，单个因子也能利用多核。
+
+compute_threaded：在线程池中计算因子，直接使用原面板，没有进程启动与结果序列化的开销；
+只有计算时释放 GIL 的算子(numpy 向量化内核)才能在线程间并行。calibrate 在当前机器上实测各算子多线程并发的加速比，
+choose_modes 据此为每个因子选择线程或进程，compute 按选择把因子分给两个池同时计算。
+"""
+import functools
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from queue import Empty
+
+import numpy as np
+
+from . import Alpha191, Basic
+from .Batch import factor_names
+from .Blockwise import set_fused
+from .Cache import direct, enable_cache, sharing
+from .Kernel import as_2d
+from .Panel import Panel
+from .Registry import probe_panel, registry
+from .Store import file_source
+
+# 各算子单次调用的相对耗时(1500 × 200 面板上实测，以 MA 为 1)，用于估计因子的计算量
+OPERATOR_COSTS = {
+    'CORREL': 6.0,
+    'coviance': 6.0,
+    'rank': 3.0,
+    'MAX': 3.0,
+    'MIN': 3.0,
+    'regresi': 3.0,
+    'lowday': 2.5,
+    'highday': 2.0,
+    'sma': 2.0,
+    'decaylinear': 2.0,
+    'regbeta': 2.0,
+    'WMA': 2.0,
+    'STDDEV': 1.5,
+    'tsrank': 1.2,
+    'SUM': 1.0,
+    'MA': 1.0,
+    'sum_if': 1.0,
+    'count': 1.0,
+    'dtm': 1.0,
+}
+# 截面算子：按资产分段计算时需要在此同步
+CROSS_SECTIONAL = ('rank',)
+# 按资产分段计算时主进程检查工作进程是否存活的间隔(秒)
+POLL_INTERVAL = 0.5
+# 有分段失败后等待其余分段报告的秒数
+FAILURE_GRACE = 5.0
+
+
+def estimate_cost(alpha):
+    """
+    由注册表中因子用到的算子估计其计算量
+    :param alpha: 因子编号或名称
+    :return: 相对计算量
+    """
+    operators = registry()[factor_names([alpha])[0]]['operators']
+    return 1.0 + sum(OPERATOR_COSTS.get(op, 0.1) for op in operators)
+
+
+def _factor_costs(names, costs=None):
+    # 各因子的计算量：有实测耗时的取耗时，其余按 estimate_cost 估计并换算到耗时的量纲
+    if not costs:
+        return {name: estimate_cost(name) for name in names}
+    known = [name for name in names if name in costs]
+    scale = (sum(costs[name] for name in known) / sum(estimate_cost(name) for name in known)) if known else 1.0
+    return {name: costs[name] if name in costs else estimate_cost(name) * scale for name in names}
+
+
+def schedule(names, costs=None):
+    """
+    计算量大的因子先执行，计算量相同时保持请求顺序
+    :param names: 因子函数名列表
+    :param costs: {因子名: 耗时}，如上次运行的 ParallelReport.timings；缺失的因子按 estimate_cost 估计
+    :return: 执行顺序
+    """
+    cost = _factor_costs(names, costs)
+    return sorted(names, key=lambda name: -cost[name])
+
+
+class SharedPanel(object):
+    """
+    把面板字段复制到共享内存：spec 可以传给其他进程，由 attach(spec) 重建以共享内存为存储的只读面板。
+    由 open_store 打开的字段已经是文件映射，不再复制，spec 中只记录文件位置，工作进程映射同一文件，共用页缓存
+    """
+
+    def __init__(self, panel):
+        self._blocks = []
+        self.spec = {'dates': panel.dates, 'assets': panel.assets, 'fields': {}, 'files': {}}
+        for name in panel.fields:
+            values = panel[name]
+            source = file_source(values)
+            if source is not None:
+                self.spec['files'][name] = source
+                continue
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=np.float64, buffer=block.buf)[:] = values
+            self._blocks.append(block)
+            self.spec['fields'][name] = block.name, values.shape
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _attach(name):
+    # 工作进程与创建方共用同一个资源追踪器，共享内存由创建方在结束时释放
+    return shared_memory.SharedMemory(name=name)
+
+
+def _view(block, shape, writeable=False):
+    values = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    values.flags.writeable = writeable
+    return values
+
+
+def attach(spec):
+    """
+    在当前进程中连接 SharedPanel
+    :param spec: SharedPanel.spec
+    :return: (Panel, 共享内存块列表)，面板使用期间需保留共享内存块的引用
+    """
+    blocks, fields = [], {}
+    for name, (block_name, shape) in spec['fields'].items():
+        blocks.append(_attach(block_name))
+        fields[name] = _view(blocks[-1], shape)
+    for name, (filename, offset, shape) in spec.get('files', {}).items():
+        fields[name] = np.memmap(filename, dtype=np.float64, mode='r', offset=offset, shape=tuple(shape))
+    return Panel(spec['dates'], spec['assets'], **fields), blocks
+
+
+class ParallelReport(object):
+    """
+    并行计算的统计：每个因子的耗时与执行它的进程，以及总的墙钟时间
+    """
+
+    def __init__(self, timings, workers, wall, processes, order):
+        self.timings = timings
+        self.workers = workers
+        self.wall = wall
+        self.processes = processes
+        self.order = order
+
+    @property
+    def seconds(self):
+        return sum(self.timings.values())
+
+    @property
+    def speedup(self):
+        return self.seconds / self.wall if self.wall else 0.0
+
+    def __repr__(self):
+        lines = [f'{len(self.timings)} factors on {self.processes} processes in {self.wall:.3f}s wall, '
+                 f'{self.seconds:.3f}s of factor time ({self.speedup:.2f}x)',
+                 f'{"factor":<14}{"seconds":>10}{"worker":>10}']
+        for name in self.order:
+            lines.append(f'{name:<14}{self.timings[name]:>10.3f}{self.workers[name]:>10}')
+        return '\n'.join(lines)
+
+
+# 工作进程内的状态：连接的面板、共享内存块与算子缓存
+_worker = {}
+
+
+def _init_worker(spec, cache_bytes, fused_threads=None):
+    _worker['panel'], _worker['blocks'] = attach(spec)
+    if cache_bytes:
+        # 同一进程先后计算的因子经由算子缓存复用相同的中间结果
+        enable_cache(cache_bytes)
+    if fused_threads:
+        # 与其他进程、线程同时计算时，融合内核不再各自开启 CPU 核数个线程
+        set_fused(threads=fused_threads)
+
+
+def _compute(name, params):
+    start = time.perf_counter()
+    values = np.asarray(getattr(Alpha191, name)(_worker['panel'], **params), dtype=np.float64)
+    return values, time.perf_counter() - start, os.getpid()
+
+
+def compute_parallel(panel, alphas=None, params=None, processes=None, costs=None, cache_bytes=2 ** 28,
+                     report=False):
+    """
+    用进程池并行计算多个因子
+    :param panel: Panel
+    :param alphas: 因子编号或名称列表，默认全部 191 个因子
+    :param params: 各因子的额外参数，如 {'alpha191_1': {'n': 10}}
+    :param processes: 进程数，默认 CPU 核数
+    :param costs: 各因子的耗时，用于安排执行顺序，见 schedule
+    :param cache_bytes: 每个工作进程内算子缓存的内存上限，为 0 时不缓存
+    :param report: 是否同时返回 ParallelReport
+    :return: 按请求顺序排列的 {因子名: 结果}，report 为 True 时返回 (结果, ParallelReport)
+    """
+    params = params or {}
+    names = factor_names(alphas)
+    order = schedule(names, costs)
+    processes = processes or os.cpu_count() or 1
+    start = time.perf_counter()
+    with SharedPanel(panel) as shared, ProcessPoolExecutor(processes, initializer=_init_worker,
+                                                           initargs=(shared.spec, cache_bytes)) as pool:
+        futures = OrderedDict((name, pool.submit(_compute, name, params.get(name, {}))) for name in order)
+        done = {name: future.result() for name, future in futures.items()}
+    wall = time.perf_counter() - start
+    results = OrderedDict((name, panel.frame(done[name][0])) for name in names)
+    if report:
+        timings = OrderedDict((name, done[name][1]) for name in names)
+        workers = OrderedDict((name, done[name][2]) for name in names)
+        return results, ParallelReport(timings, workers, wall, processes, order)
+    return results
+
+
+class ShardGather(object):
+    """
+    按资产分段计算时的算子存储：截面算子在调用处与其他分段同步，其余算子直接在本段资产上计算
+    """
+
+    def __init__(self, index, bounds, gather_in, gather_out, barrier, timeout=None):
+        """
+        :param index: 本进程的分段序号
+        :param bounds: 各分段的资产边界
+        :param gather_in: 共享的整面板输入缓冲区
+        :param gather_out: 共享的整面板结果缓冲区
+        :param barrier: 全部分段进程共用的 Barrier
+        :param timeout: 在同步处等待其他分段的最长秒数，超时后 Barrier 被中止，各分段抛出 BrokenBarrierError
+        """
+        self.lo, self.hi = bounds[index], bounds[index + 1]
+        rows = np.linspace(0, gather_in.shape[0], len(bounds)).astype(int)
+        self.rows = slice(rows[index], rows[index + 1])
+        self.gather_in, self.gather_out = gather_in, gather_out
+        self.barrier = barrier
+        self.timeout = timeout
+        self.parent = None
+        self.gathers = 0
+
+    def call(self, name, func, args, kwargs):
+        if name not in CROSS_SECTIONAL:
+            return func(*args, **kwargs)
+        values, wrap = as_2d(args[0])
+        if values.shape != (self.gather_in.shape[0], self.hi - self.lo):
+            # 市场字段等不按资产划分的输入，各分段相同，直接计算
+            return func(*args, **kwargs)
+        self.gather_in[:, self.lo:self.hi] = values
+        self.barrier.wait(self.timeout)
+        # 排名按日期独立，各进程分担一段日期
+        self.gather_out[self.rows] = np.asarray(func(self.gather_in[self.rows], *args[1:], **kwargs))
+        self.barrier.wait(self.timeout)
+        self.gathers += 1
+        return wrap(np.array(self.gather_out[:, self.lo:self.hi]))
+
+
+def _shard_worker(spec, names, params, index, bounds, buffers, barrier, queue, timeout):
+    blocks = []
+    try:
+        panel, blocks = attach(spec)
+        T, N = panel.shape
+        lo, hi = bounds[index], bounds[index + 1]
+        shard = Panel(panel.dates, panel.assets[lo:hi],
+                      **{name: panel[name][:, lo:hi] if panel[name].shape[1] == N else panel[name]
+                         for name in panel.fields})
+        gather_in, gather_out, results = [_attach(name) for name in buffers]
+        blocks += [gather_in, gather_out, results]
+        store = ShardGather(index, bounds, _view(gather_in, (T, N), True), _view(gather_out, (T, N), True), barrier,
+                            timeout)
+        output = _view(results, (len(names), T, N), True)
+        timings = []
+        with sharing(store):
+            for i, name in enumerate(names):
+                start = time.perf_counter()
+                values = np.asarray(getattr(Alpha191, name)(shard, **params.get(name, {})), dtype=np.float64)
+                output[i, :, lo:hi] = values
+                timings.append(time.perf_counter() - start)
+        queue.put((index, timings, store.gathers, None))
+    except BaseException as exc:
+        # 其他分段可能正等待同步，中止 Barrier 使其退出
+        barrier.abort()
+        queue.put((index, None, 0, repr(exc)))
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def _collect_shards(workers, barrier, queue):
+    # 按间隔轮询各分段的报告；未报告就以非 0 退出码结束的分段视为失败，并中止 Barrier 让其余分段退出等待。
+    # 正常退出(退出码为 0)的分段已在退出前写入报告，下一次轮询即可读到。
+    # 出现失败后整体结果已无效，其余分段在 FAILURE_GRACE 秒内仍未报告(如卡在计算中)的直接终止
+    reports, deadline = {}, None
+    try:
+        while len(reports) < len(workers):
+            try:
+                index, timings, gathers, error = queue.get(timeout=POLL_INTERVAL)
+                reports[index] = (index, timings, gathers, error)
+            except Empty:
+                for index, worker in enumerate(workers):
+                    if index not in reports and worker.exitcode not in (None, 0):
+                        reports[index] = (index, None, 0, f'shard {index} exited with code {worker.exitcode}')
+                        barrier.abort()
+            if deadline is None and any(report[3] is not None for report in reports.values()):
+                deadline = time.monotonic() + FAILURE_GRACE
+            if deadline is not None and time.monotonic() > deadline:
+                for index in range(len(workers)):
+                    if index not in reports:
+                        reports[index] = (index, None, 0, f'shard {index} terminated after another shard failed')
+    finally:
+        for worker in workers:
+            worker.join(POLL_INTERVAL)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+    return [reports[index] for index in sorted(reports)]
+
+
+def compute_sharded(panel, alphas=None, params=None, processes=None, report=False, timeout=600):
+    """
+    按资产分段并行计算因子：每个进程计算全部因子在一段资产上的结果，截面算子处同步
+    某个分段进程异常退出(如被系统杀死)时主进程中止 Barrier，其余分段不会一直等待
+    :param panel: Panel
+    :param alphas: 因子编号或名称列表，默认全部 191 个因子
+    :param params: 各因子的额外参数
+    :param processes: 分段数，默认 CPU 核数；每段至少包含 2 个资产，以区分资产字段与市场字段
+    :param report: 是否同时返回 ParallelReport(每个因子的耗时取最慢的分段)
+    :param timeout: 分段在截面算子处等待其他分段的最长秒数，None 为不限
+    :return: 按请求顺序排列的 {因子名: 结果}，report 为 True 时返回 (结果, ParallelReport)
+    """
+    params = params or {}
+    names = factor_names(alphas)
+    T, N = panel.shape
+    processes = max(1, min(processes or os.cpu_count() or 1, N // 2))
+    bounds = np.linspace(0, N, processes + 1).astype(int).tolist()
+    context = multiprocessing.get_context()
+    start = time.perf_counter()
+    buffers = [shared_memory.SharedMemory(create=True, size=max(8 * size, 1))
+               for size in (T * N, T * N, len(names) * T * N)]
+    try:
+        with SharedPanel(panel) as shared:
+            barrier, queue = context.Barrier(processes), context.Queue()
+            workers = [context.Process(target=_shard_worker, daemon=True,
+                                       args=(shared.spec, names, params, i, bounds, [b.name for b in buffers],
+                                             barrier, queue, timeout))
+                       for i in range(processes)]
+            for worker in workers:
+                worker.start()
+            reports = _collect_shards(workers, barrier, queue)
+        errors = [error for _, _, _, error in reports if error is not None]
+        if errors:
+            # 首先失败的分段给出原始异常，其余分段只是同步被中止
+            raise RuntimeError(f'sharded computation failed: {[e for e in errors if "BrokenBarrier" not in e] or errors}')
+        output = np.array(_view(buffers[2], (len(names), T, N)))
+    finally:
+        for block in buffers:
+            block.close()
+            block.unlink()
+    wall = time.perf_counter() - start
+    results = OrderedDict((name, panel.frame(output[i])) for i, name in enumerate(names))
+    if report:
+        timings = OrderedDict((name, max(r[1][i] for r in reports)) for i, name in enumerate(names))
+        workers = OrderedDict((name, 'shards') for name in names)
+        return results, ParallelReport(timings, workers, wall, processes, names)
+    return results
+
+
+def _run_factor(panel, name, params):
+    # 各线程已在并行计算不同的因子，融合内核在本线程内逐块执行，不再共用 CPU 核数个线程的块线程池
+    set_fused(threads=1, local=True)
+    start = time.perf_counter()
+    values = np.asarray(getattr(Alpha191, name)(panel, **params), dtype=np.float64)
+    return values, time.perf_counter() - start, 'thread'
+
+
+def compute_threaded(panel, alphas=None, params=None, threads=None, costs=None, report=False):
+    """
+    用线程池并行计算多个因子，各线程直接使用原面板
+    启用了全局算子缓存(enable_cache)时各线程共用该缓存；不要在 sharing() 的批量共享中调用
+    :param panel: Panel
+    :param alphas: 因子编号或名称列表，默认全部 191 个因子
+    :param params: 各因子的额外参数
+    :param threads: 线程数，默认 CPU 核数
+    :param costs: 各因子的耗时，用于安排执行顺序，见 schedule
+    :param report: 是否同时返回 ParallelReport
+    :return: 按请求顺序排列的 {因子名: 结果}，report 为 True 时返回 (结果, ParallelReport)
+    """
+    params = params or {}
+    names = factor_names(alphas)
+    order = schedule(names, costs)
+    threads = threads or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        futures = OrderedDict((name, pool.submit(_run_factor, panel, name, params.get(name, {}))) for name in order)
+        done = {name: future.result() for name, future in futures.items()}
+    wall = time.perf_counter() - start
+    results = OrderedDict((name, panel.frame(done[name][0])) for name in names)
+    if report:
+        timings = OrderedDict((name, done[name][1]) for name in names)
+        workers = OrderedDict((name, done[name][2]) for name in names)
+        return results, ParallelReport(timings, workers, wall, threads, order)
+    return results
+
+
+# 校准使用的算子调用，参数与因子中的典型用法相当
+CALIBRATION_CALLS = {
+    'rank': lambda p: Basic.rank(p.close),
+    'tsrank': lambda p: Basic.tsrank(p.close, 10),
+    'sma': lambda p: Basic.sma(p.close, 10, 1),
+    'decaylinear': lambda p: Basic.decaylinear(p.close, 10),
+    'regbeta': lambda p: Basic.regbeta(p.close, Basic.sequence(6), 6),
+    'regresi': lambda p: Basic.regresi(p.ret, p.mkt, p.smb, p.hml, 20),
+    'coviance': lambda p: Basic.coviance(p.close, p.volume, 10),
+    'CORREL': lambda p: Basic.backend.CORREL(p.close, p.volume, 10),
+    'MAX': lambda p: Basic.backend.MAX(p.close, 10),
+    'MIN': lambda p: Basic.backend.MIN(p.close, 10),
+    'SUM': lambda p: Basic.backend.SUM(p.close, 10),
+    'MA': lambda p: Basic.backend.MA(p.close, 10),
+    'STDDEV': lambda p: Basic.backend.STDDEV(p.close, 10),
+    'WMA': lambda p: Basic.backend.WMA(p.close, 10),
+    'highday': lambda p: Basic.highday(p.high, 10),
+    'lowday': lambda p: Basic.lowday(p.low, 10),
+    'count': lambda p: Basic.count(p.close > p.open, 10),
+    'sum_if': lambda p: Basic.sum_if(p.close, 10, p.close > p.open),
+    'delay': lambda p: Basic.delay(p.close, 1),
+    'delta': lambda p: Basic.delta(p.close, 1),
+}
+
+
+def _calibration_call(call, panel):
+    # 校准时绕过生效的批量共享或算子缓存，每次调用都实际计算；只作用于调用所在的线程
+    with direct():
+        return call(panel)
+
+
+@functools.lru_cache(maxsize=None)
+def calibrate(threads=None, T=1000, N=200, repeat=2):
+    """
+    实测各算子在多线程并发时的加速比：同样 threads × repeat 次调用，依次执行与 threads 个线程同时执行的耗时之比。
+    scaling 为 1 表示计算时完全释放 GIL、随线程数线性加速，为 0 表示线程间没有任何并行(持有 GIL 或只有一个核)
+    :param threads: 并发线程数，默认 CPU 核数
+    :param T: 校准面板的日期数
+    :param N: 校准面板的资产数
+    :param repeat: 每个线程的调用次数
+    :return: {算子名: {'serial': 秒, 'threaded': 秒, 'scaling': 0~1}}
+    """
+    threads = threads or os.cpu_count() or 1
+    panel = probe_panel(T, N)
+    results = OrderedDict()
+    with np.errstate(all='ignore'), ThreadPoolExecutor(threads) as pool:
+        for name, call in CALIBRATION_CALLS.items():
+            _calibration_call(call, panel)
+            start = time.perf_counter()
+            for _ in range(threads * repeat):
+                _calibration_call(call, panel)
+            serial = time.perf_counter() - start
+            start = time.perf_counter()
+            list(pool.map(lambda _: _calibration_call(call, panel), range(threads * repeat)))
+            threaded = time.perf_counter() - start
+            scaling = (serial / threaded - 1) / (threads - 1) if threads > 1 else 0.0
+            results[name] = {'serial': serial, 'threaded': threaded, 'scaling': float(np.clip(scaling, 0.0, 1.0))}
+    return results
+
+
+def choose_modes(alphas=None, calibration=None, threshold=0.5):
+    """
+    为每个因子选择线程或进程：按注册表中因子用到的算子，以算子耗时加权平均其多线程加速比，
+    不低于 threshold 的因子在线程中计算，其余在进程中计算；只有一个核时并行没有收益，全部使用线程以省去进程开销
+    :param alphas: 因子编号或名称列表
+    :param calibration: calibrate() 的结果，默认现场校准
+    :param threshold: 选择线程所需的加权加速比
+    :return: {因子名: 'threads' 或 'processes'}
+    """
+    names = factor_names(alphas)
+    if (os.cpu_count() or 1) == 1:
+        return OrderedDict((name, 'threads') for name in names)
+    calibration = calibrate() if calibration is None else calibration
+    modes = OrderedDict()
+    for name in names:
+        operators = [op for op in registry()[name]['operators'] if op in calibration]
+        weights = [calibration[op]['serial'] for op in operators]
+        score = (sum(w * calibration[op]['scaling'] for w, op in zip(weights, operators)) / sum(weights)
+                 if operators else 1.0)
+        modes[name] = 'threads' if score >= threshold else 'processes'
+    return modes
+
+
+def split_workers(workers, thread_cost, process_cost):
+    """
+    按两类因子的计算量把 workers 个工作单元分给线程池与进程池，两类都有因子时各至少 1 个
+    :param workers: 总的线程数 + 进程数
+    :param thread_cost: 线程池中因子的总计算量
+    :param process_cost: 进程池中因子的总计算量
+    :return: (线程数, 进程数)
+    """
+    if not process_cost:
+        return workers, 0
+    if not thread_cost:
+        return 0, workers
+    processes = int(round(workers * process_cost / (thread_cost + process_cost)))
+    processes = min(max(processes, 1), workers - 1)
+    return workers - processes, processes
+
+
+def compute(panel, alphas=None, params=None, workers=None, modes=None, costs=None, report=False):
+    """
+    按 choose_modes 的选择，把因子分别交给线程池与进程池同时计算
+    workers 按两类因子的计算量分给两个池(见 split_workers)，只有 1 个时全部在线程中计算；
+    只有使用进程池时才把面板复制到共享内存，工作线程与工作进程中的融合内核只用单线程
+    :param panel: Panel
+    :param alphas: 因子编号或名称列表，默认全部 191 个因子
+    :param params: 各因子的额外参数
+    :param workers: 线程数与进程数之和，默认 CPU 核数
+    :param modes: {因子名: 'threads' 或 'processes'}，默认 choose_modes()
+    :param costs: 各因子的耗时，用于安排执行顺序与分配工作单元，见 schedule
+    :param report: 是否同时返回 ParallelReport
+    :return: 按请求顺序排列的 {因子名: 结果}，report 为 True 时返回 (结果, ParallelReport)
+    """
+    params = params or {}
+    names = factor_names(alphas)
+    modes = modes or choose_modes(names)
+    order = schedule(names, costs)
+    workers = workers or os.cpu_count() or 1
+    processes = [name for name in order if modes[name] == 'processes'] if workers > 1 else []
+    cost = _factor_costs(names, costs)
+    thread_workers, process_workers = split_workers(
+        workers, sum(cost[name] for name in order if name not in processes), sum(cost[name] for name in processes))
+    start = time.perf_counter()
+    shared = SharedPanel(panel) if processes else None
+    pool = None
+    try:
+        with ThreadPoolExecutor(max(thread_workers, 1)) as threads:
+            futures = OrderedDict()
+            if processes:
+                pool = ProcessPoolExecutor(process_workers, initializer=_init_worker, initargs=(shared.spec, 0, 1))
+            # 进程池的任务先提交，线程池在主进程中同时计算其余因子
+            for name in processes:
+                futures[name] = pool.submit(_compute, name, params.get(name, {}))
+            for name in order:
+                if name not in futures:
+                    futures[name] = threads.submit(_run_factor, panel, name, params.get(name, {}))
+            done = {name: future.result() for name, future in futures.items()}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if shared is not None:
+            shared.close()
+    wall = time.perf_counter() - start
+    results = OrderedDict((name, panel.frame(done[name][0])) for name in names)
+    if report:
+        timings = OrderedDict((name, done[name][1]) for name in names)
+        used = OrderedDict((name, done[name][2]) for name in names)
+        return results, ParallelReport(timings, used, wall, workers, order)
+    return results
@@ -0,0 +1,309 @@
+"""
+实时因子计算流水线(asyncio)：逐条接收各资产的分钟行情，按时间戳拼成截面后增量更新因子，发布因子快照
+
+    >>> pipeline = Pipeline(['alpha191_1', 'alpha191_9'], assets)
+    >>> async def consume():
+    ...     async for snapshot in pipeline.snapshots():
+    ...         print(snapshot.time, snapshot.latency)
+    >>> await asyncio.gather(pipeline.run(read_messages(reader)), consume())
+
+流水线分为两个任务，之间以有界队列连接：
+1. ingest：按时间戳汇集各资产的行情，收齐全部资产或出现更晚的时间戳时截面完成，未到达的资产记为 NaN(停牌)；
+   市场字段(asset 为 None)需先于该时间戳的资产行情到达；早于已完成截面的迟到行情丢弃并计数。计算跟不上时队列写满，ingest 在此等待，不再读取行情源，
+   压力经由 socket 的接收缓冲区传回行情的发送方(背压)，内存占用有上限
+2. compute：在线程中依次对每个截面调用各因子的 Incremental(见 Stream)，事件循环在计算期间继续接收行情；
+   每个截面都会更新全部状态(递归因子不能跳过任何一期)，RANK 等截面算子在完整的截面上一次计算
+
+快照写入有界的输出队列，消费者处理不过来时丢弃最旧的快照，只保留最新的结果(计数见 metrics)
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .Batch import factor_names
+from .Registry import registry
+from .Stream import Incremental
+
+# 一条行情：time 为时间戳，asset 为资产代码(市场字段为 None)，fields 为 {字段: 值}，sent 为发送时刻(time.time())
+Message = namedtuple('Message', ['time', 'asset', 'fields', 'sent'])
+Message.__new__.__defaults__ = (None,)
+
+
+class Latency(object):
+    """
+    耗时样本的统计(秒)
+    """
+
+    def __init__(self):
+        self.samples = []
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        """
+        :return: 样本数，及均值、中位数、p95、p99、最大值(毫秒)
+        """
+        if not self.samples:
+            return {'count': 0}
+        ms = np.asarray(self.samples) * 1e3
+        return {'count': len(ms), 'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+                'p95_ms': float(np.percentile(ms, 95)), 'p99_ms': float(np.percentile(ms, 99)),
+                'max_ms': float(ms.max())}
+
+
+class Metrics(object):
+    """
+    流水线的运行统计
+    end_to_end: 截面最后一条行情的发送时刻(无 sent 时为到达时刻)到快照发布
+    queued: 截面完成到开始计算；compute: 全部因子的增量计算；blocked: ingest 因队列已满而等待的时间
+    """
+
+    def __init__(self):
+        self.end_to_end = Latency()
+        self.queued = Latency()
+        self.compute = Latency()
+        self.blocked = 0.0
+        self.max_depth = 0
+        self.messages = 0
+        self.late = 0
+        self.bars = 0
+        self.dropped_snapshots = 0
+
+    def summary(self):
+        return {'messages': self.messages, 'bars': self.bars, 'late_messages': self.late,
+                'dropped_snapshots': self.dropped_snapshots, 'max_queue_depth': self.max_depth,
+                'blocked_seconds': self.blocked, 'end_to_end': self.end_to_end.summary(),
+                'queued': self.queued.summary(), 'compute': self.compute.summary()}
+
+    def __repr__(self):
+        e2e = self.end_to_end.summary()
+        return (f'Metrics({self.bars} bars, {self.messages} messages, e2e p50={e2e.get("p50_ms", np.nan):.2f}ms '
+                f'p99={e2e.get("p99_ms", np.nan):.2f}ms, max depth={self.max_depth}, '
+                f'blocked={self.blocked:.3f}s, dropped snapshots={self.dropped_snapshots})')
+
+
+class Snapshot(object):
+    """
+    一个时间戳的因子截面
+    """
+
+    def __init__(self, time, assets, values, latency):
+        """
+        :param time: 时间戳
+        :param assets: 资产索引
+        :param values: {因子名: 长度 N 的数组}
+        :param latency: 端到端延迟(秒)
+        """
+        self.time = time
+        self.assets = assets
+        self.values = values
+        self.latency = latency
+
+    def frame(self):
+        """
+        :return: 行为因子、列为资产的 DataFrame
+        """
+        return pd.DataFrame(np.vstack(list(self.values.values())), index=list(self.values), columns=self.assets)
+
+    def __repr__(self):
+        return f'Snapshot({self.time}, {len(self.values)} factors, latency={self.latency * 1e3:.2f}ms)'
+
+
+class _Bar(object):
+    # 正在汇集的截面
+    def __init__(self, time, fields, market, N):
+        self.time = time
+        self.fields = {name: np.full(N, np.nan) for name in fields}
+        self.fields.update((name, np.nan) for name in market)
+        self.received = set()
+        self.last = None
+        self.completed = None
+
+
+class Pipeline(object):
+    """
+    asyncio 实时因子流水线
+    """
+
+    def __init__(self, alphas, assets, params=None, max_pending=64, max_snapshots=16):
+        """
+        :param alphas: 因子编号或名称列表
+        :param assets: 资产代码列表，截面中资产的顺序
+        :param params: 各因子的额外参数
+        :param max_pending: 等待计算的截面数上限，超过时 ingest 等待(背压)
+        :param max_snapshots: 未被消费的快照数上限，超过时丢弃最旧的快照
+        """
+        params = params or {}
+        self.assets = pd.Index(assets)
+        self.evaluators = OrderedDict((name, Incremental(name, params.get(name), self.assets))
+                                      for name in factor_names(alphas))
+        derived = {'ret': 'close', 'benchmark_ret': 'benchmark_close', 'vwap': 'amount'}
+        inputs = {derived.get(field, field) for name in self.evaluators for field in registry()[name]['inputs']}
+        if 'amount' in inputs:
+            inputs.add('volume')
+        self.market = sorted(field for field in inputs
+                             if field.startswith('benchmark') or field in ('mkt', 'smb', 'hml'))
+        self.fields = sorted(inputs.difference(self.market))
+        self.metrics = Metrics()
+        self._column = {asset: j for j, asset in enumerate(self.assets)}
+        self._pending = asyncio.Queue(max_pending)
+        self._snapshots = asyncio.Queue(max_snapshots)
+
+    async def ingest(self, messages):
+        """
+        按时间戳汇集行情，完成的截面放入计算队列
+        :param messages: 产生 Message 的异步迭代器
+        :return:
+        """
+        current, done = None, None
+        async for message in messages:
+            self.metrics.messages += 1
+            if done is not None and message.time <= done:
+                self.metrics.late += 1
+                continue
+            if current is not None and message.time != current.time:
+                done = current.time
+                await self._complete(current)
+                current = None
+            if current is None:
+                current = _Bar(message.time, self.fields, self.market, len(self.assets))
+            if message.asset is None:
+                current.fields.update((name, value) for name, value in message.fields.items() if name in self.market)
+            elif message.asset in self._column:
+                j = self._column[message.asset]
+                for name, value in message.fields.items():
+                    if name in current.fields and name not in self.market:
+                        current.fields[name][j] = value
+                current.received.add(j)
+            current.last = time.time() if message.sent is None else message.sent
+            if len(current.received) == len(self.assets):
+                done = current.time
+                await self._complete(current)
+                current = None
+        if current is not None:
+            await self._complete(current)
+        await self._pending.put(None)
+
+    async def _complete(self, bar):
+        bar.completed = time.perf_counter()
+        start = time.perf_counter()
+        await self._pending.put(bar)
+        self.metrics.blocked += time.perf_counter() - start
+        self.metrics.max_depth = max(self.metrics.max_depth, self._pending.qsize())
+
+    def _update(self, bar):
+        # vwap 由面板从 amount / volume 派生，ret、benchmark_ret 由 Incremental 从前一期收盘价派生
+        return OrderedDict((name, evaluator.update(bar.fields, bar.time))
+                           for name, evaluator in self.evaluators.items())
+
+    async def compute(self):
+        """
+        依次计算队列中的截面并发布快照
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            bar = await self._pending.get()
+            if bar is None:
+                break
+            start = time.perf_counter()
+            self.metrics.queued.add(start - bar.completed)
+            values = await loop.run_in_executor(None, self._update, bar)
+            self.metrics.compute.add(time.perf_counter() - start)
+            self.metrics.bars += 1
+            latency = time.time() - bar.last
+            self.metrics.end_to_end.add(latency)
+            self._publish(Snapshot(bar.time, self.assets, values, latency))
+        self._publish(None)
+
+    def _publish(self, snapshot):
+        if self._snapshots.full():
+            self._snapshots.get_nowait()
+            self.metrics.dropped_snapshots += 1
+        self._snapshots.put_nowait(snapshot)
+
+    async def snapshots(self):
+        """
+        依次产生发布的快照，流水线结束时停止
+        :return:
+        """
+        while True:
+            snapshot = await self._snapshots.get()
+            if snapshot is None:
+                return
+            yield snapshot
+
+    async def run(self, messages):
+        """
+        运行流水线直到行情源结束
+        :param messages: 产生 Message 的异步迭代器
+        :return: Metrics
+        """
+        await asyncio.gather(self.ingest(messages), self.compute())
+        return self.metrics
+
+
+async def queue_messages(queue):
+    """
+    本地队列作为行情源：依次取出 Message，取到 None 时结束
+    :param queue: asyncio.Queue
+    :return:
+    """
+    while True:
+        message = await queue.get()
+        if message is None:
+            return
+        yield message
+
+
+async def read_messages(reader):
+    """
+    socket 行情源：每行一条 JSON，{"time": ..., "asset": ..., "fields": {...}, "sent": ...}，连接关闭时结束
+    :param reader: asyncio.StreamReader
+    :return:
+    """
+    async for line in reader:
+        if line.strip():
+            yield Message(**json.loads(line))
+
+
+async def write_messages(writer, messages):
+    """
+    把 Message 按行写入 socket，发送缓冲区写满时等待(背压)
+    :param writer: asyncio.StreamWriter
+    :param messages: Message 的可迭代对象
+    :return:
+    """
+    for message in messages:
+        fields = {name: None if np.isnan(value) else float(value) for name, value in message.fields.items()}
+        sent = time.time() if message.sent is None else message.sent
+        writer.write((json.dumps({'time': message.time, 'asset': message.asset, 'fields': fields,
+                                  'sent': sent}) + '\n').encode())
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+def panel_messages(panel, fields=None, stamp=True):
+    """
+    把面板逐期拆为逐资产的 Message，用于回放或测试
+    :param panel: Panel
+    :param fields: 字段列表，默认面板的全部字段
+    :param stamp: 是否以生成时刻作为 sent
+    :return: Message 的生成器
+    """
+    fields = [name for name in (panel.fields if fields is None else fields) if name in panel]
+    market = [name for name in fields if panel[name].shape[1] == 1]
+    for t, date in enumerate(panel.dates):
+        stamp_time = str(date)
+        if market:
+            yield Message(stamp_time, None, {name: float(panel[name][t, 0]) for name in market},
+                          time.time() if stamp else None)
+        for j, asset in enumerate(panel.assets):
+            yield Message(stamp_time, asset, {name: float(panel[name][t, j]) for name in fields if name not in market},
+                          time.time() if stamp else None)
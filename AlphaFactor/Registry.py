@@ -0,0 +1,237 @@
+"""
+因子注册表：每个 alpha191_* 因子需要的输入字段、参数默认值、最大回看期数和输出类型
+
+回看期数通过在随机面板上截断历史实测得到：保留最近 L 个日期计算的最后一行与使用全部历史的结果在容差内一致的最小 L。
+包含 sma 等递归算子的因子理论上依赖全部历史，此时 L 为收敛到容差所需的预热期数；不收敛(如累乘)的因子为 None。
+
+注册表保存在 registry.json 中，修改因子后运行 python -m AlphaFactor.Registry 重新生成
+"""
+import functools
+import inspect
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from . import Alpha191
+from .Batch import factor_names
+from .Cache import sharing
+from .Panel import PARAM_FIELDS, Panel
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'registry.json')
+
+# 递归算子：结果依赖全部历史，只能按容差确定预热期
+RECURSIVE_OPERATORS = ('sma',)
+# 因子体内直接累积全部历史(SELF 累乘)，不存在有限的回看期
+CUMULATIVE_FACTORS = ('alpha191_143',)
+
+
+def probe_panel(T=1500, N=16, seed=0):
+    """
+    生成包含全部字段的随机行情面板，用于实测因子的回看期数和输出类型
+    :param T: 日期数
+    :param N: 资产数
+    :param seed:
+    :return:
+    """
+    rng = np.random.default_rng(seed)
+    close = np.exp(np.cumsum(rng.standard_normal((T, N)) * 0.02, axis=0)) * 20
+    open_ = close * np.exp(rng.standard_normal((T, N)) * 0.01)
+    high = np.maximum(open_, close) * (1 + rng.random((T, N)) * 0.02)
+    low = np.minimum(open_, close) * (1 - rng.random((T, N)) * 0.02)
+    volume = rng.lognormal(13, 0.5, (T, N))
+    benchmark = np.exp(np.cumsum(rng.standard_normal(T) * 0.01)) * 3000
+    return Panel(pd.bdate_range('2000-01-03', periods=T), [f'{i:06d}' for i in range(N)],
+                 open=open_, high=high, low=low, close=close, volume=volume, amount=volume * (high + low) / 2,
+                 benchmark_open=benchmark * np.exp(rng.standard_normal(T) * 0.005), benchmark_close=benchmark,
+                 mkt=rng.standard_normal(T) * 0.01, smb=rng.standard_normal(T) * 0.005,
+                 hml=rng.standard_normal(T) * 0.005)
+
+
+def signature_fields(func):
+    """
+    由函数签名得到因子需要的面板字段和参数默认值
+    :param func:
+    :return: (必需字段, 可选字段, {参数: 默认值})
+    """
+    required, optional, params = [], [], {}
+    for name, param in inspect.signature(func).parameters.items():
+        if name in PARAM_FIELDS:
+            fields = required if param.default is inspect.Parameter.empty else optional
+            if PARAM_FIELDS[name] not in fields:
+                fields.append(PARAM_FIELDS[name])
+        elif param.default is not inspect.Parameter.empty:
+            params[name] = param.default
+    return required, optional, params
+
+
+def _row(func, panel, start, stop, params):
+    return np.asarray(func(panel.slice(start, stop), **params), dtype=np.float64)[-1]
+
+
+def close_enough(values, expected, rtol=1e-6):
+    """
+    两行结果是否在容差内一致：NaN 位置相同，且差值不超过 rtol 乘以该行绝对值的最大值(因子量纲差异很大)
+    :param values:
+    :param expected:
+    :param rtol: 相对容差
+    :return:
+    """
+    values, expected = np.asarray(values, dtype=np.float64), np.asarray(expected, dtype=np.float64)
+    nan = np.isnan(expected)
+    if not np.array_equal(np.isnan(values), nan):
+        return False
+    if nan.all():
+        return True
+    with np.errstate(invalid='ignore'):
+        diff = np.abs(values - expected)[~nan]
+        return bool(np.all((diff <= rtol * np.abs(expected[~nan]).max()) | (values[~nan] == expected[~nan])))
+
+
+def measure_lookback(func, panel, params=None, rtol=1e-6, samples=8):
+    """
+    二分查找使结果与全部历史一致所需的最少日期数 L：以面板末尾的 samples 个日期为终点，各自只保留 L 个日期的历史，
+    计算出的终点值都要与全部历史的结果一致。多个终点相当于在不同数据上检验(如 FILTER 把截断处的 NaN 变为 0，
+    只有截断处恰好满足条件时才会暴露差异)
+    :param func: 因子函数
+    :param panel: 用于实测的面板
+    :param params: 因子参数
+    :param rtol: 相对容差，见 close_enough
+    :param samples: 检验的终点个数
+    :return: 回看期数，截断任何历史都无法在容差内一致时为 None
+    """
+    params = params or {}
+    T = panel.shape[0]
+    full = np.asarray(func(panel, **params), dtype=np.float64)
+    stops = range(T, T - samples, -1)
+
+    def enough(lookback):
+        return all(close_enough(_row(func, panel, stop - lookback, stop, params), full[stop - 1], rtol)
+                   for stop in stops)
+
+    if not enough(T - samples):
+        return None
+    lo, hi = 1, T - samples
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if enough(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def output_type(values):
+    """
+    仅取 -1、0、1 的因子为 'signal'，其余为 'continuous'
+    :param values:
+    :return:
+    """
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    return 'signal' if finite.size and np.isin(finite, (-1.0, 0.0, 1.0)).all() else 'continuous'
+
+
+def describe(name, panel=None, **params):
+    """
+    实测单个因子的注册信息
+    :param name: 因子函数名
+    :param panel: 用于实测的面板，默认 probe_panel()
+    :param params: 覆盖默认参数，回看期数随参数变化
+    :return: dict
+    """
+    func = getattr(Alpha191, name)
+    panel = probe_panel() if panel is None else panel
+    required, optional, defaults = signature_fields(func)
+    defaults.update(params)
+    with sharing() as store:
+        store.factor = name
+        values = func(panel, **defaults)
+        store.clear()
+    operators = sorted(store.operators.get(name, ()))
+    lookback = None if name in CUMULATIVE_FACTORS else measure_lookback(func, panel, defaults)
+    return {
+        'inputs': required,
+        'optional_inputs': optional,
+        'params': defaults,
+        'lookback': lookback,
+        'recursive': lookback is None or any(op in RECURSIVE_OPERATORS for op in operators),
+        'output': output_type(values),
+        'benchmark': any(field.startswith('benchmark') for field in required),
+        'operators': operators,
+    }
+
+
+def build(alphas=None, panel=None):
+    """
+    实测全部因子，返回 {因子名: 注册信息}
+    :param alphas:
+    :param panel:
+    :return:
+    """
+    panel = probe_panel() if panel is None else panel
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore')
+        return {name: describe(name, panel) for name in factor_names(alphas)}
+
+
+@functools.lru_cache(maxsize=None)
+def registry():
+    """
+    读取 registry.json 中的注册表
+    :return: {因子名: 注册信息}
+    """
+    with open(REGISTRY_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def spec(alpha):
+    """
+    :param alpha: 因子编号或名称
+    :return: 该因子的注册信息
+    """
+    return registry()[factor_names([alpha])[0]]
+
+
+def available(fields, alphas=None):
+    """
+    给定可用的面板字段，返回输入齐全可以计算的因子
+    :param fields: 字段名集合，如 panel.fields；ret、benchmark_ret 可由收盘价派生
+    :param alphas: 候选因子，默认全部
+    :return:
+    """
+    fields = set(fields)
+    if 'close' in fields:
+        fields.add('ret')
+    if 'benchmark_close' in fields:
+        fields.add('benchmark_ret')
+    if {'amount', 'volume'} <= fields:
+        fields.add('vwap')
+    return [name for name in factor_names(alphas) if set(registry()[name]['inputs']) <= fields]
+
+
+def requirements(alphas=None):
+    """
+    一组因子合计需要加载的字段和历史长度，收益率字段换算为对应的收盘价
+    :param alphas:
+    :return: (字段列表, 最大回看期数，有因子不收敛时为 None)
+    """
+    names = factor_names(alphas)
+    derived = {'ret': 'close', 'benchmark_ret': 'benchmark_close'}
+    fields = sorted({derived.get(field, field) for name in names for field in registry()[name]['inputs']})
+    lookbacks = [registry()[name]['lookback'] for name in names]
+    return fields, None if None in lookbacks else max(lookbacks, default=0)
+
+
+def main(path=REGISTRY_PATH):
+    table = build()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=1)
+    print(f'{len(table)} factors written to {path}')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])
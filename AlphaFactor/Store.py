@@ -0,0 +1,181 @@
+"""
+内存映射的列式面板存储：每个字段为一个按 (日期, 资产) 行优先连续存放的 float64 文件，日期和资产索引各存一个文件，
+open_store 以只读 np.memmap 打开，不读入、不复制数据，面板直接使用映射的数组(见 Panel.__setitem__)。
+多个进程打开同一个存储时共用操作系统的页缓存，Parallel 中的工作进程也直接映射这些文件而不再复制到共享内存
+
+    >>> write_store(Panel.from_frames(close=close_df, ...), 'data/ashare')  # 一次性由 CSV / DataFrame 转换
+    >>> append_store('data/ashare', today)                                   # 每日追加新的日期
+    >>> panel = open_store('data/ashare', fields=['open', 'close'], start='2020-01-01')
+
+目录结构：
+    meta.json      版本、日期数及各字段的列数(资产字段为 N，市场字段为 1)
+    dates.npy      日期索引
+    assets.npy     资产索引
+    <字段>.f64     字段数据，小端 float64，形状 (日期数, 列数)
+追加时先写入数据文件，最后替换 meta.json，读取方只映射 meta.json 中记录的日期数，不会看到写了一半的日期
+"""
+import json
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from .Panel import Panel
+
+# 存储格式的版本，格式变化时递增
+VERSION = 1
+DTYPE = np.dtype('<f8')
+SUFFIX = '.f64'
+
+
+def _read_meta(path):
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta['version'] != VERSION:
+        raise ValueError(f'store version {meta["version"]} is not supported, expected {VERSION}')
+    return meta
+
+
+def _write_meta(path, meta):
+    # 先写入临时文件再替换，读取方看到的 meta.json 总是完整的
+    temporary = os.path.join(path, 'meta.json.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(temporary, os.path.join(path, 'meta.json'))
+
+
+def _index_array(index):
+    # 索引保存为不需要 pickle 的定长数组：日期为 datetime64，其余为数值或定长字符串
+    values = np.asarray(index)
+    return values.astype(str) if values.dtype == object else values
+
+
+def _save_index(path, name, index):
+    temporary = os.path.join(path, f'{name}.tmp.npy')
+    np.save(temporary, _index_array(index), allow_pickle=False)
+    os.replace(temporary, os.path.join(path, f'{name}.npy'))
+
+
+def _load_index(path, name, rows=None):
+    values = np.load(os.path.join(path, f'{name}.npy'), allow_pickle=False)
+    return pd.Index(values if rows is None else values[:rows])
+
+
+def _append_rows(path, name, values):
+    with open(os.path.join(path, name + SUFFIX), 'ab') as f:
+        f.write(np.ascontiguousarray(values, dtype=DTYPE).tobytes())
+
+
+def write_store(panel, path, fields=None, overwrite=False):
+    """
+    把面板写为列式存储
+    :param panel: Panel
+    :param path: 存储目录
+    :param fields: 要保存的字段，默认面板的全部字段
+    :param overwrite: 目录中已有存储时是否覆盖
+    :return:
+    """
+    fields = list(panel.fields if fields is None else fields)
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        if not overwrite:
+            raise FileExistsError(f'{path} already contains a store')
+        for name in _read_meta(path)['fields']:
+            os.remove(os.path.join(path, name + SUFFIX))
+        os.remove(os.path.join(path, 'meta.json'))
+    widths = {}
+    for name in fields:
+        values = panel[name]
+        open(os.path.join(path, name + SUFFIX), 'wb').close()
+        _append_rows(path, name, values)
+        widths[name] = values.shape[1]
+    _save_index(path, 'dates', panel.dates)
+    _save_index(path, 'assets', panel.assets)
+    _write_meta(path, {'version': VERSION, 'rows': len(panel.dates), 'assets': len(panel.assets),
+                       'fields': widths})
+
+
+def append_store(path, panel):
+    """
+    在存储末尾追加新的日期
+    :param path: 存储目录
+    :param panel: Panel，资产与存储一致，包含存储的全部字段，日期全部晚于存储中的最后一个日期
+    :return: 追加后的日期数
+    """
+    meta = _read_meta(path)
+    dates = _load_index(path, 'dates', meta['rows'])
+    assets = _load_index(path, 'assets')
+    if not panel.assets.equals(assets):
+        raise ValueError('panel assets differ from the store')
+    missing = [name for name in meta['fields'] if name not in panel]
+    if missing:
+        raise KeyError(f'panel lacks stored fields {missing}')
+    if len(dates) and len(panel.dates) and not panel.dates[0] > dates[-1]:
+        raise ValueError(f'appended dates must be after {dates[-1]}')
+    for name, width in meta['fields'].items():
+        values = panel[name]
+        if values.shape[1] != width:
+            raise ValueError(f'field {name!r} has {values.shape[1]} columns, the store has {width}')
+        # 数据文件可能残留上次中断的追加，截断到 meta.json 记录的长度后再写入
+        with open(os.path.join(path, name + SUFFIX), 'r+b') as f:
+            f.truncate(meta['rows'] * width * DTYPE.itemsize)
+        _append_rows(path, name, values)
+    _save_index(path, 'dates', dates.append(panel.dates))
+    meta['rows'] += len(panel.dates)
+    _write_meta(path, meta)
+    return meta['rows']
+
+
+def _map(path, name, rows, width):
+    if rows * width == 0:
+        values = np.empty((rows, width), dtype=DTYPE)
+        values.flags.writeable = False
+        return values
+    return np.memmap(os.path.join(path, name + SUFFIX), dtype=DTYPE, mode='r', shape=(rows, width))
+
+
+def _position(dates, value, side):
+    # 日期位置：整数按位置，其余按日期查找
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return int(dates.searchsorted(pd.Timestamp(value) if isinstance(dates, pd.DatetimeIndex) else value, side=side))
+
+
+def open_store(path, fields=None, start=None, stop=None):
+    """
+    以只读内存映射打开存储，不读入数据
+    :param path: 存储目录
+    :param fields: 需要的字段，默认全部字段
+    :param start: 起始日期(含)或位置
+    :param stop: 结束日期(含)或位置(不含)
+    :return: Panel，字段为映射文件的视图
+    """
+    meta = _read_meta(path)
+    fields = list(meta['fields'] if fields is None else fields)
+    missing = [name for name in fields if name not in meta['fields']]
+    if missing:
+        raise KeyError(f'store does not contain fields {missing}')
+    dates = _load_index(path, 'dates', meta['rows'])
+    rows = slice(_position(dates, start, 'left'), _position(dates, stop, 'right'))
+    arrays = {name: _map(path, name, meta['rows'], meta['fields'][name])[rows] for name in fields}
+    return Panel(dates[rows], _load_index(path, 'assets'), **arrays)
+
+
+def file_source(values):
+    """
+    只读内存映射数组在文件中的位置，用于在其他进程中重新映射同一段数据
+    :param values: 数组，可以是映射的视图(面板字段经 np.asarray 后不再是 np.memmap，沿 base 找到映射)
+    :return: (文件名, 字节偏移, 形状)，不是 C 连续的只读文件映射时为 None
+    """
+    root = values
+    while isinstance(root, np.ndarray) and not isinstance(root, np.memmap):
+        root = root.base
+    if not isinstance(root, np.memmap) or not isinstance(root._mmap, mmap.mmap) or root.filename is None \
+            or values.flags.writeable or not values.flags.c_contiguous or values.dtype != DTYPE:
+        return None
+    # 视图的 offset 属性沿用原映射，实际偏移由数据地址相对映射起点的距离得到
+    mapped = np.frombuffer(root._mmap, dtype=np.uint8)
+    start = root.offset - root.offset % mmap.ALLOCATIONGRANULARITY
+    offset = start + values.ctypes.data - mapped.ctypes.data
+    return root.filename, int(offset), values.shape
@@ -0,0 +1,925 @@
+"""
+流式(增量)因子计算：每来一期行情只更新一次状态，不重算整段历史
+
+    >>> evaluator = Incremental('alpha191_1')
+    >>> for bar in bars:  # bar 为 {字段: 当期各资产的值}，市场字段为标量
+    ...     values = evaluator.update(bar)
+
+在线算子每期接收一行 (1, N) 输入，只保留窗口所需的状态(长度为 n 的环形缓冲区及窗口内的累加和)：
+MEAN/SUM/STD、CORR/COV、DECAYLINEAR、REGBETA、REGRESI、COUNT/SUMIF 的累加和每期 O(1) 更新，并每 n 期由缓冲区
+重新求和一次以消除累积误差；TSMAX/TSMIN/HIGHDAY/LOWDAY 与 TSRANK 每期对窗口做一次 O(n) 的向量化比较；
+SMA 为 O(1) 递推；DELAY/DELTA/RET 及 DTM/DBM/TR/HD/LD 只保留 n 期前的值，VWAP、SELF 累乘只保留累计值。
+各算子的 NaN、预热期、常数窗口、并列的处理与 Kernel 中的批量实现一致。
+
+增量计算器直接复用 Alpha191 中的因子函数：每期以单行面板调用一次因子函数，函数体中第 i 次算子调用
+(经由 Cache.shared 分派)对应第 i 个在线算子的状态，因此函数体中的逐元素运算无需改写。
+"""
+import functools
+import inspect
+import types
+from collections import OrderedDict
+
+import numpy as np
+
+from . import Alpha191
+from .Batch import compute_all, factor_names
+from .Cache import sharing
+from .Kernel import _RANK_TIE, _REFINE, corr_from_moments, cov_from_moments, cs_rank, window_moments
+from .Panel import Panel, panel_arguments
+from .Registry import close_enough
+
+
+def _row(values):
+    # 当期输入统一为二维 float64 行
+    values = np.asarray(values, dtype=np.float64)
+    return values.reshape(1, -1) if values.ndim < 2 else values
+
+
+def _mask(condition):
+    # 条件统一为二维布尔行，浮点条件中的 NaN 视为不满足(与 Kernel 一致)
+    values = np.asarray(condition)
+    if values.dtype != bool:
+        values = np.asarray(values, dtype=np.float64)
+        values = (values != 0) & ~np.isnan(values)
+    return values.reshape(1, -1) if values.ndim < 2 else values
+
+
+class _Ring(object):
+    """
+    最近 n 期的环形缓冲区
+    """
+
+    def __init__(self, n, fill=np.nan, dtype=np.float64):
+        self.n = n
+        self.fill = fill
+        self.dtype = dtype
+        self.buffer = None
+        self.pos = 0
+
+    def push(self, values):
+        """
+        写入当期的值
+        :param values:
+        :return: 被挤出的 n 期前的值，不足 n 期时为 fill
+        """
+        if self.buffer is None:
+            self.buffer = np.full((self.n,) + np.shape(values), self.fill, dtype=self.dtype)
+        old = self.buffer[self.pos].copy()
+        self.buffer[self.pos] = values
+        self.pos = (self.pos + 1) % self.n
+        return old
+
+    def lag(self, k):
+        """
+        :param k: 0 为当期，不超过 n - 1
+        :return: k 期前写入的值
+        """
+        return self.buffer[(self.pos - 1 - k) % self.n]
+
+    def window(self):
+        """
+        :return: 由旧到新排列的窗口，形状 (n, ...)
+        """
+        return np.roll(self.buffer, -self.pos, axis=0)
+
+
+class _Count(object):
+    """
+    过去 n 期内标志为真的期数，整数累加，结果精确
+    """
+
+    def __init__(self, n):
+        self.ring = _Ring(n, 0, np.int64) if n > 0 else None
+        self.total = 0
+
+    def push(self, flags):
+        flags = np.asarray(flags, dtype=np.int64)
+        if self.ring is None:
+            return np.zeros(flags.shape, dtype=np.int64)
+        self.total = self.total + flags - self.ring.push(flags)
+        return self.total
+
+
+def _changed(values, previous):
+    # 与上一期相比是否变化，NaN 视为变化；第一期视为未变化(与 Kernel._flat_windows 一致)
+    return np.zeros(values.shape, dtype=bool) if previous is None else values != previous
+
+
+def _center(center, values):
+    # 平移量取每列首个有效值，此后固定不变，降低累加和的相消误差
+    return values.copy() if center is None else np.where(np.isnan(center), values, center)
+
+
+class Online(object):
+    """
+    在线算子：每期调用 update 传入当期的一行输入，返回当期结果
+    """
+
+    def update(self, *values):
+        raise NotImplementedError
+
+    def __repr__(self):
+        params = ', '.join(f'{key}={value!r}' for key, value in vars(self).items() if not key.startswith('_')
+                           and isinstance(value, (int, float, str, type(None))))
+        return f'{type(self).__name__}({params})'
+
+
+class Rank(Online):
+    """RANK(A)：截面排名只依赖当期，不保留状态"""
+
+    def update(self, values):
+        return cs_rank(_row(values))
+
+
+class Delay(Online):
+    """DELAY(A, n)"""
+
+    def __init__(self, n):
+        self.n = n
+        self._values = _Ring(n) if n > 0 else None
+
+    def update(self, values):
+        values = _row(values)
+        return values.copy() if self._values is None else self._values.push(values)
+
+
+class Delta(Delay):
+    """DELTA(A, n) = A - DELAY(A, n)"""
+
+    def update(self, values):
+        values = _row(values)
+        return values - super().update(values)
+
+
+class Ret(Delay):
+    """RET(A, n) = A / DELAY(A, n) - 1"""
+
+    def update(self, values):
+        values = _row(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return values / super().update(values) - 1
+
+
+class Vwap(Online):
+    """VWAP(CLOSE, VOLUME)：成交额与成交量的累计和之比"""
+
+    def __init__(self):
+        self._amount = self._volume = 0.0
+
+    def update(self, close, volume):
+        close, volume = _row(close), _row(volume)
+        self._amount = self._amount + close * volume
+        self._volume = self._volume + volume
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._amount / self._volume
+
+
+class Mean(Online):
+    """
+    MEAN(A, n)，scale 为结果的倍数(SUM = MEAN * n)；窗口内存在 NaN 时为 NaN，常数窗口直接取该值
+    """
+
+    def __init__(self, n, scale=1):
+        self.n = n
+        self.scale = scale
+        self.updates = 0
+        self._values = _Ring(n)
+        self._valid = _Count(n)
+        self._changes = _Count(n - 1)
+        self._previous = self._center = self._total = None
+
+    def update(self, values):
+        values = _row(values)
+        self._center = _center(self._center, values)
+        old = self._values.push(values)
+        with np.errstate(invalid='ignore'):
+            if self._total is None:
+                self._total = np.zeros(values.shape)
+            self._total = self._total + np.nan_to_num(values - self._center) - np.nan_to_num(old - self._center)
+            self.updates += 1
+            if self.updates % self.n == 0:
+                self._total = np.nansum(self._values.buffer - self._center, axis=0)
+            flat = self._changes.push(_changed(values, self._previous)) == 0
+            self._previous = values
+            result = np.where(flat, values, self._total / self.n + self._center)
+        return np.where(self._valid.push(~np.isnan(values)) >= self.n, result, np.nan) * self.scale
+
+
+class Std(Online):
+    """
+    STD(A, n)，ddof 为自由度修正(stddev 为 1，ta.STDDEV 为 0)，scale 为结果的倍数(ta.STDDEV 的 nbdev)
+    """
+
+    def __init__(self, n, ddof=1, scale=1):
+        self.n = n
+        self.ddof = ddof
+        self.scale = scale
+        self.updates = 0
+        self._values = _Ring(n)
+        self._valid = _Count(n)
+        self._center = self._total = self._squares = None
+
+    def update(self, values):
+        values = _row(values)
+        self._center = _center(self._center, values)
+        old = self._values.push(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x, o = np.nan_to_num(values - self._center), np.nan_to_num(old - self._center)
+            if self._total is None:
+                self._total, self._squares = np.zeros(values.shape), np.zeros(values.shape)
+            self._total = self._total + x - o
+            self._squares = self._squares + x * x - o * o
+            self.updates += 1
+            if self.updates % self.n == 0:
+                window = np.nan_to_num(self._values.buffer - self._center)
+                self._total, self._squares = window.sum(axis=0), (window * window).sum(axis=0)
+            var = np.maximum(self._squares - self._total * self._total / self.n, 0.0) / (self.n - self.ddof)
+            # 累加和的残余误差按量级截断，保证常数窗口的标准差为 0
+            var[var <= 1e-14 * self._squares / self.n] = 0.0
+        return np.where(self._valid.push(~np.isnan(values)) >= self.n, np.sqrt(var), np.nan) * self.scale
+
+
+class PairMoments(Online):
+    """
+    A、B 成对有效样本的窗口矩，交给 reduce(cnt, sx, sy, sxy, sxx, syy) 汇总
+    维护平移后的累加和，每期 O(1) 更新，每 n 期由缓冲区重新求和以免误差累积；
+    方差不足平方和 Kernel._REFINE 倍的病态窗口与批量实现一样由缓冲区逐窗口两遍计算
+    """
+
+    def __init__(self, n, reduce, flat=True):
+        """
+        :param n: 窗口长度
+        :param reduce: 由矩得到结果的函数
+        :param flat: 是否把常数窗口的离差置为 0(CORR/COV 为 True，REGBETA 为 False)
+        """
+        self.n = n
+        self.flat = flat
+        self.updates = 0
+        self._reduce = reduce
+        self._x, self._y = _Ring(n, 0.0), _Ring(n, 0.0)
+        self._raw = _Ring(n, 0.0), _Ring(n, 0.0)
+        self._valid = _Ring(n, False, bool)
+        self._changes = _Count(n - 1), _Count(n - 1)
+        self._previous = None, None
+        self._centers = None, None
+        self._sums = None
+
+    def update(self, x, y):
+        x, y = np.broadcast_arrays(_row(x), _row(y))
+        valid = ~(np.isnan(x) | np.isnan(y))
+        flat_x = self._changes[0].push(_changed(x, self._previous[0])) == 0
+        flat_y = self._changes[1].push(_changed(y, self._previous[1])) == 0
+        self._previous = x.copy(), y.copy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cnt, sx, sy, sxy, sxx, syy = self._running(x, y, valid)
+            self._raw[0].push(np.where(valid, x, 0.0))
+            self._raw[1].push(np.where(valid, y, 0.0))
+            if self.flat:
+                scale = (1.0 - _REFINE) * cnt
+                bad = (sx * sx > scale * sxx) | (sy * sy > scale * syy)
+                cols = np.nonzero(bad.ravel())[0]
+                if len(cols):
+                    sx, sy, sxy, sxx, syy = [np.array(value, dtype=np.float64) for value in (sx, sy, sxy, sxx, syy)]
+                    xw, yw, ok = [np.ascontiguousarray(ring.window().reshape(self.n, -1)[:, cols].T)
+                                  for ring in self._raw + (self._valid,)]
+                    for target, value in zip((sx, sy, sxy, sxx, syy), window_moments(xw, yw, ok)):
+                        target.reshape(-1)[cols] = value
+                sx, sxx = np.where(flat_x, 0.0, sx), np.where(flat_x, 0.0, sxx)
+                sy, syy = np.where(flat_y, 0.0, sy), np.where(flat_y, 0.0, syy)
+                sxy = np.where(flat_x | flat_y, 0.0, sxy)
+            result = self._reduce(cnt, sx, sy, sxy, sxx, syy)
+        return np.where(cnt >= self.n, result, np.nan)
+
+    def _running(self, x, y, valid):
+        cx, cy = self._centers
+        cx, cy = _center(cx, np.where(valid, x, np.nan)), _center(cy, np.where(valid, y, np.nan))
+        self._centers = cx, cy
+        x, y = np.where(valid, x - cx, 0.0), np.where(valid, y - cy, 0.0)
+        ox, oy, ov = self._x.push(x), self._y.push(y), self._valid.push(valid)
+        if self._sums is None:
+            self._sums = [np.zeros(x.shape) for _ in range(6)]
+        cnt, sx, sy, sxy, sxx, syy = self._sums
+        self._sums = [cnt + valid - ov, sx + x - ox, sy + y - oy, sxy + x * y - ox * oy, sxx + x * x - ox * ox,
+                      syy + y * y - oy * oy]
+        self.updates += 1
+        if self.updates % self.n == 0:
+            xs, ys = self._x.buffer, self._y.buffer
+            self._sums = [self._valid.buffer.sum(axis=0, dtype=np.float64), xs.sum(axis=0), ys.sum(axis=0),
+                          (xs * ys).sum(axis=0), (xs * xs).sum(axis=0), (ys * ys).sum(axis=0)]
+        return self._sums
+
+
+class Correlation(PairMoments):
+    """CORR(A, B, n)，flat 为任一方窗口内方差为 0 时的取值(ta.CORREL 取 0)"""
+
+    def __init__(self, n, flat=np.nan):
+        super().__init__(n, functools.partial(corr_from_moments, flat=flat))
+
+
+class Covariance(PairMoments):
+    """COVIANCE(A, B, n)"""
+
+    def __init__(self, n, ddof=1):
+        super().__init__(n, functools.partial(cov_from_moments, ddof=ddof))
+
+
+class Extrema(Online):
+    """
+    TSMAX/TSMIN(output='value')、HIGHDAY/LOWDAY(output='offset') 与 ta.MAXINDEX/MININDEX(output='index')
+    每期对缓冲区中的窗口向量化比较一次；并列时取最近的一期，窗口内存在 NaN 时为 NaN
+    """
+
+    def __init__(self, n, how='max', output='value'):
+        if how not in ('max', 'min'):
+            raise ValueError(f"how must be 'max' or 'min', got {how!r}")
+        self.n = n
+        self.how = how
+        self.output = output
+        self.updates = 0
+        self._values = _Ring(n)
+        self._valid = _Count(n)
+        self._lags = np.arange(n)
+
+    def update(self, values):
+        values = _row(values)
+        self._values.push(values)
+        self.updates += 1
+        sign = 1.0 if self.how == 'max' else -1.0
+        # 由新到旧排列，argmax 取第一个即最近的一期
+        window = self._values.buffer[(self._values.pos - 1 - self._lags) % self.n]
+        signed = np.where(np.isnan(window), -np.inf, sign * window)
+        offset = np.argmax(signed, axis=0)
+        if self.output == 'value':
+            result = np.take_along_axis(window, offset[None], axis=0)[0]
+        elif self.output == 'offset':
+            result = offset.astype(np.float64)
+        else:
+            result = (self.updates - 1 - offset).astype(np.float64)
+        return np.where(self._valid.push(~np.isnan(values)) >= self.n, result, np.nan)
+
+
+class TsRank(Online):
+    """
+    TSRANK(A, n)：当期值在窗口内的排位
+    并列容差为该列已出现数据的最大绝对值乘以 Kernel._RANK_TIE(批量实现使用整段数据的最大绝对值)
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self._values = _Ring(n)
+        self._valid = _Count(n)
+        self._scale = None
+
+    def update(self, values):
+        values = _row(values)
+        self._values.push(values)
+        self._scale = np.fmax(0.0 if self._scale is None else self._scale, np.abs(values))
+        with np.errstate(invalid='ignore'):
+            upper = values + _RANK_TIE * self._scale
+            counts = (self._values.buffer <= upper).sum(axis=0).astype(np.float64)
+        return np.where((self._valid.push(~np.isnan(values)) >= self.n) & ~np.isnan(values), counts, np.nan)
+
+
+class _Weighted(object):
+    """
+    窗口内 Σx 与 Σk·x(由旧到新权重 1..n) 的 O(1) 递推：
+    W[t] = W[t-1] - S[t-1] + n·x[t]，S[t] = S[t-1] - x[t-n] + x[t]；数据按列平移后计算，NaN 计为 0
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.updates = 0
+        self.values = _Ring(n, 0.0)
+        self.valid = _Count(n)
+        self.center = self.total = self.weighted = None
+        self._weights = np.arange(1, n + 1, dtype=np.float64)
+
+    def push(self, values):
+        """
+        :param values:
+        :return: 过去 n 期的有效样本数
+        """
+        self.center = _center(self.center, values)
+        with np.errstate(invalid='ignore'):
+            x = np.nan_to_num(values - self.center)
+        old = self.values.push(x)
+        if self.total is None:
+            self.total, self.weighted = np.zeros(x.shape), np.zeros(x.shape)
+        self.weighted = self.weighted - self.total + self.n * x
+        self.total = self.total - old + x
+        self.updates += 1
+        if self.updates % self.n == 0:
+            window = self.values.window()
+            self.total = window.sum(axis=0)
+            self.weighted = np.tensordot(self._weights, window, axes=1)
+        return self.valid.push(~np.isnan(values))
+
+
+class DecayLinear(Online):
+    """DECAYLINEAR(A, n)：权重 1..n 的移动加权平均，窗口内存在 NaN 时为 NaN，常数窗口直接取该值"""
+
+    def __init__(self, n):
+        self.n = n
+        self._sums = _Weighted(n)
+        self._changes = _Count(n - 1)
+        self._previous = None
+
+    def update(self, values):
+        values = _row(values)
+        valid = self._sums.push(values)
+        flat = self._changes.push(_changed(values, self._previous)) == 0
+        self._previous = values
+        result = self._sums.weighted / (self.n * (self.n + 1) / 2.0) + np.nan_to_num(self._sums.center)
+        return np.where(valid >= self.n, np.where(flat, values, result), np.nan)
+
+
+class Sma(Online):
+    """SMA(A, n, m)：Y[t] = (A[t]·m + Y[t-1]·(n-m)) / n，以首个有效值为初值，之后的 NaN 向后传播"""
+
+    def __init__(self, n, m=1, start=None):
+        self.n = n
+        self.m = m
+        self.start = start
+        self.updates = 0
+        self._previous = self._seeded = None
+
+    def update(self, values):
+        values = _row(values)
+        if self.start is not None:
+            values = np.where(self.updates < np.asarray(self.start), np.nan, values)
+        self.updates += 1
+        if self._previous is None:
+            self._previous = np.full(values.shape, np.nan)
+            self._seeded = np.zeros(values.shape, dtype=bool)
+        alpha, beta = self.m / self.n, (self.n - self.m) / self.n
+        seed = ~self._seeded & ~np.isnan(values)
+        self._previous = np.where(self._seeded, values * alpha + self._previous * beta,
+                                  np.where(seed, values, np.nan))
+        self._seeded = self._seeded | seed
+        return self._previous
+
+
+class RegBeta(Online):
+    """
+    REGBETA(A, B, n)
+    B 为长度 n 的一维数组(如 SEQUENCE(n))时作为每个窗口内固定的自变量，斜率为 y 的固定权重加权和，
+    等差序列由 _Weighted 的 O(1) 递推得到；B 为逐期序列时使用成对累加和
+    """
+
+    def __init__(self, n, B=None):
+        self.n = n
+        x = np.arange(1, n + 1, dtype=np.float64) if B is None else np.asarray(B, dtype=np.float64)
+        self.fixed = x.ndim == 1 and len(x) == n
+        if self.fixed:
+            self._x = x - x.mean()
+            self._sxx = np.sum(self._x * self._x)
+            self._step = x[1] - x[0] if n > 1 else 0.0
+            self._arithmetic = bool(np.allclose(np.diff(x), self._step))
+            self._sums = _Weighted(n)
+        else:
+            self._pair = PairMoments(n, self._beta, flat=False)
+
+    def _beta(self, cnt, sx, sy, sxy, sxx, syy):
+        n = self.n
+        return (n * sxy - sx * sy) / (n * sxx - sx * sx)
+
+    def update(self, A, B=None):
+        if not self.fixed:
+            return self._pair.update(B, A)
+        values = _row(A)
+        valid = self._sums.push(values)
+        if self._arithmetic:
+            num = self._step * (self._sums.weighted - (self.n + 1) / 2.0 * self._sums.total)
+        else:
+            num = np.tensordot(self._x, self._sums.values.window(), axes=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            beta = num / self._sxx
+        return np.where(valid >= self.n, beta, np.nan)
+
+
+class RegResi(Online):
+    """
+    REGRESI(A, B1, ..., Bk, n)：窗口内多元回归(含截距)残差的标准差(ddof=0)
+    正规方程 X'X、X'y、y'y 的累加和每期 O(k²) 更新
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.updates = 0
+        self._design = _Ring(n, 0.0)
+        self._y = _Ring(n, 0.0)
+        self._valid = _Count(n)
+        self._centers = None
+        self._sums = None
+
+    def update(self, A, *X):
+        y, xs = _row(A), [_row(x) for x in X]
+        if self._centers is None:
+            self._centers = [None] * (len(xs) + 1)
+        self._centers = [_center(center, values) for center, values in zip(self._centers, [y] + xs)]
+        y, *xs = [values - center for values, center in zip([y] + xs, self._centers)]
+        shape = np.broadcast_shapes(y.shape, *[x.shape for x in xs])
+        design = np.stack([np.ones(shape)] + [np.broadcast_to(x, shape) for x in xs], axis=-1)
+        valid = ~np.isnan(np.broadcast_to(y, shape)) & ~np.isnan(design).any(axis=-1)
+        design = np.where(valid[..., None], design, 0.0)
+        y = np.where(valid, y, 0.0)
+        old_design, old_y = self._design.push(design), self._y.push(y)
+        if self._sums is None:
+            k = design.shape[-1]
+            self._sums = [np.zeros(shape + (k, k)), np.zeros(shape + (k,)), np.zeros(shape)]
+        xx, xy, yy = self._sums
+        outer, old_outer = design[..., :, None] * design[..., None, :], old_design[..., :, None] * old_design[..., None, :]
+        self._sums = [xx + outer - old_outer, xy + design * y[..., None] - old_design * old_y[..., None],
+                      yy + y * y - old_y * old_y]
+        self.updates += 1
+        if self.updates % self.n == 0:
+            designs, ys = self._design.buffer, self._y.buffer
+            self._sums = [(designs[..., :, None] * designs[..., None, :]).sum(axis=0),
+                          (designs * ys[..., None]).sum(axis=0), (ys * ys).sum(axis=0)]
+        xx, xy, yy = self._sums
+        ok = self._valid.push(valid) >= self.n
+        # 预热期及缺失的窗口以单位阵占位，避免奇异矩阵求逆
+        xx = np.where(ok[..., None, None], xx, np.eye(xx.shape[-1]))
+        try:
+            inv = np.linalg.inv(xx)
+        except np.linalg.LinAlgError:
+            inv = np.linalg.pinv(xx)
+        beta = np.matmul(inv, xy[..., None])[..., 0]
+        rss = yy - np.sum(beta * xy, axis=-1)
+        return np.where(ok, np.sqrt(np.maximum(rss, 0.0) / self.n), np.nan)
+
+
+class Count(Online):
+    """COUNT(condition, n)，condition 可以是多个条件组成的 list；前 n-1 期为 NaN"""
+
+    def __init__(self, n):
+        self.n = n
+        self.updates = 0
+        self._counts = None
+
+    def update(self, condition):
+        many = isinstance(condition, (list, tuple))
+        masks = [_mask(cond) for cond in (condition if many else [condition])]
+        if self._counts is None:
+            self._counts = [_Count(self.n) for _ in masks]
+        self.updates += 1
+        result = [np.where(self.updates >= self.n, counter.push(mask), np.nan)
+                  for counter, mask in zip(self._counts, masks)]
+        return result if many else result[0]
+
+
+class SumIf(Online):
+    """SUMIF(A, n, condition)，condition 可以是多个条件组成的 list；满足条件的样本为 NaN 时该窗口为 NaN"""
+
+    def __init__(self, n):
+        self.n = n
+        self.updates = 0
+        self._sums = None
+
+    def update(self, values, condition):
+        many = isinstance(condition, (list, tuple))
+        masks = [_mask(cond) for cond in (condition if many else [condition])]
+        values = _row(values)
+        missing = np.isnan(values)
+        filled = np.where(missing, 0.0, values)
+        if self._sums is None:
+            self._sums = [[_Ring(self.n, 0.0), 0.0, _Count(self.n)] for _ in masks]
+        self.updates += 1
+        result = []
+        for state, mask in zip(self._sums, masks):
+            ring, total, holes = state
+            selected = np.where(mask, filled, 0.0)
+            total = total + selected - ring.push(selected)
+            if self.updates % self.n == 0:
+                total = ring.buffer.sum(axis=0)
+            state[1] = total
+            hole = holes.push(mask & missing)
+            result.append(np.where((self.updates >= self.n) & (hole == 0), total, np.nan))
+        return result if many else result[0]
+
+
+class Movement(Online):
+    """
+    DTM、DBM、HD、LD、TR：只保留各输入 n 期前的值
+    kind 为 None 时与 Basic.movement 一致，返回输入允许计算的全部部分组成的 dict
+    """
+
+    def __init__(self, n=1, kind=None):
+        self.n = n
+        self.kind = kind
+        self._delays = {}
+
+    def update(self, open_df=None, high_df=None, low_df=None, close_df=None):
+        values = {field: _row(v) for field, v in
+                  (('open', open_df), ('high', high_df), ('low', low_df), ('close', close_df)) if v is not None}
+        delayed = {field: self._delays.setdefault(field, Delay(self.n)).update(v) for field, v in values.items()}
+        result = {}
+        with np.errstate(invalid='ignore'):
+            if 'open' in values:
+                o, do = values['open'], delayed['open']
+                gap = o - do
+                if 'high' in values:
+                    result['dtm'] = np.where(o <= do, 0.0, np.maximum(values['high'] - o, gap))
+                if 'low' in values:
+                    result['dbm'] = np.where(o >= do, 0.0, np.maximum(o - values['low'], gap))
+            if 'high' in values:
+                result['hd'] = values['high'] - delayed['high']
+            if 'low' in values:
+                result['ld'] = delayed['low'] - values['low']
+            if {'high', 'low', 'close'} <= values.keys():
+                h, l, dc = values['high'], values['low'], delayed['close']
+                result['tr'] = np.maximum(np.maximum(h - l, np.abs(h - dc)), np.abs(l - dc))
+        return result if self.kind is None else result[self.kind]
+
+
+class Cumprod(Online):
+    """SELF 累乘：保留截至上一期的累积乘积"""
+
+    def __init__(self):
+        self._product = None
+
+    def update(self, values):
+        values = _row(values)
+        self._product = values.copy() if self._product is None else self._product * values
+        return self._product
+
+
+def _fields(*names):
+    # 按 open/high/low/close 的位置取出 OHLC 输入，其余位置为 None
+    return lambda a: [a.get(name) for name in names]
+
+
+# 计算函数(reduce 等)由构造时重建，不属于状态
+_FUNCTIONS = (functools.partial, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+
+def _stateful():
+    return {cls.__name__: cls for cls in (_Ring, _Count, _Weighted) + tuple(_subclasses(Online))}
+
+
+def _subclasses(cls):
+    for sub in cls.__subclasses__():
+        yield sub
+        yield from _subclasses(sub)
+
+
+def dump_state(value):
+    """
+    在线算子的状态转换为只由 dict、list、ndarray 与标量组成的结构，可以保存为文件
+    :param value: 在线算子(或其中的任意属性值)
+    :return:
+    """
+    if isinstance(value, (Online, _Ring, _Count, _Weighted)):
+        return {'__class__': type(value).__name__,
+                'attributes': {key: dump_state(item) for key, item in vars(value).items()
+                               if not isinstance(item, _FUNCTIONS)}}
+    if isinstance(value, type):
+        return {'__dtype__': np.dtype(value).name}
+    if isinstance(value, tuple):
+        return {'__tuple__': [dump_state(item) for item in value]}
+    if isinstance(value, list):
+        return [dump_state(item) for item in value]
+    if isinstance(value, dict):
+        return {key: dump_state(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def load_state(state, current=None):
+    """
+    由 dump_state 的结果恢复状态
+    :param state:
+    :param current: 已按调用参数构建的对象，状态写入其中，构造时建立的计算函数得以保留
+    :return: 恢复后的值
+    """
+    if isinstance(state, dict) and '__class__' in state:
+        cls = _stateful()[state['__class__']]
+        value = current if type(current) is cls else cls.__new__(cls)
+        for key, item in state['attributes'].items():
+            setattr(value, key, load_state(item, getattr(value, key, None)))
+        return value
+    if isinstance(state, dict) and '__dtype__' in state:
+        return np.dtype(state['__dtype__']).type
+    if isinstance(state, dict) and '__tuple__' in state:
+        current = current if isinstance(current, tuple) else ()
+        return tuple(load_state(item, current[i] if i < len(current) else None)
+                     for i, item in enumerate(state['__tuple__']))
+    if isinstance(state, list):
+        current = current if isinstance(current, list) else []
+        return [load_state(item, current[i] if i < len(current) else None) for i, item in enumerate(state)]
+    if isinstance(state, dict):
+        current = current if isinstance(current, dict) else {}
+        return {key: load_state(item, current.get(key)) for key, item in state.items()}
+    if isinstance(state, np.ndarray):
+        return np.array(state)
+    return state
+
+
+# 算子名 -> (由调用参数构建在线算子, 每期传给 update 的参数名或由调用参数取输入的函数)
+ONLINE_OPERATORS = {
+    'rank': (lambda a: Rank(), ('A',)),
+    'delay': (lambda a: Delay(a['n']), ('A',)),
+    'delta': (lambda a: Delta(a['n']), ('df',)),
+    'ret': (lambda a: Ret(a['n']), ('close_df',)),
+    'vwap': (lambda a: Vwap(), ('close_df', 'volume_df')),
+    'mean': (lambda a: Mean(a['n']), ('df',)),
+    'stddev': (lambda a: Std(a['n'], ddof=1), ('df',)),
+    'corr': (lambda a: Correlation(a['n']), ('df1', 'df2')),
+    'coviance': (lambda a: Covariance(a['n']), ('A', 'B')),
+    'tsrank': (lambda a: TsRank(a['n']), ('A',)),
+    'tsmax': (lambda a: Extrema(a['n'], 'max'), ('A',)),
+    'tsmin': (lambda a: Extrema(a['n'], 'min'), ('A',)),
+    'highday': (lambda a: Extrema(a['n'], 'max', 'offset'), ('A',)),
+    'lowday': (lambda a: Extrema(a['n'], 'min', 'offset'), ('A',)),
+    'decaylinear': (lambda a: DecayLinear(a['n']), ('df',)),
+    'sma': (lambda a: Sma(a['n'], a['m'], a['start']), ('arr',)),
+    'regbeta': (lambda a: RegBeta(a['n'], a['B']), ('A', 'B')),
+    'regresi': (lambda a: RegResi(a['args'][-1]), lambda a: (a['A'],) + tuple(a['args'][:-1])),
+    'count': (lambda a: Count(a['n']), ('condition',)),
+    'sum_if': (lambda a: SumIf(a['n']), ('x', 'condition')),
+    'dtm': (lambda a: Movement(a['n'], 'dtm'), _fields('open_df', 'high_df')),
+    'dbm': (lambda a: Movement(a['n'], 'dbm'), _fields('open_df', None, 'low_df')),
+    'get_hd': (lambda a: Movement(a['n'], 'hd'), _fields(None, 'high_df')),
+    'get_ld': (lambda a: Movement(a['n'], 'ld'), _fields(None, None, 'low_df')),
+    'tr': (lambda a: Movement(a['n'], 'tr'), _fields(None, 'high_df', 'low_df', 'close_df')),
+    'movement': (lambda a: Movement(a['n']), _fields('open_df', 'high_df', 'low_df', 'close_df')),
+    'cumprod': (lambda a: Cumprod(), ('A',)),
+    'SUM': (lambda a: Mean(a['timeperiod'], scale=a['timeperiod']), ('real',)),
+    'MA': (lambda a: Mean(a['timeperiod']), ('real',)),
+    'STDDEV': (lambda a: Std(a['timeperiod'], ddof=0, scale=a['nbdev']), ('real',)),
+    'WMA': (lambda a: DecayLinear(a['timeperiod']), ('real',)),
+    'CORREL': (lambda a: Correlation(a['timeperiod'], flat=0.0), ('real0', 'real1')),
+    'MAX': (lambda a: Extrema(a['timeperiod'], 'max'), ('real',)),
+    'MIN': (lambda a: Extrema(a['timeperiod'], 'min'), ('real',)),
+    'MAXINDEX': (lambda a: Extrema(a['timeperiod'], 'max', 'index'), ('real',)),
+    'MININDEX': (lambda a: Extrema(a['timeperiod'], 'min', 'index'), ('real',)),
+    'TRANGE': (lambda a: Movement(1, 'tr'), _fields(None, 'high', 'low', 'close')),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _signature(func):
+    return inspect.signature(func)
+
+
+class StreamStore(object):
+    """
+    增量计算时的算子存储：因子函数每期调用一次，第 i 次算子调用对应第 i 个在线算子，首期调用时按调用参数创建
+    pending 为从检查点读入的各算子状态，算子创建后立即写入
+    """
+
+    def __init__(self):
+        self.operators = []
+        self.pending = []
+        self.position = 0
+        self.parent = None
+
+    def call(self, name, func, args, kwargs):
+        """
+        :param name: 算子名称
+        :param func: 批量计算函数，用于绑定参数
+        :param args: 位置参数
+        :param kwargs: 关键字参数
+        :return: 在线算子的当期结果
+        """
+        bound = _signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+        if name not in ONLINE_OPERATORS:
+            raise NotImplementedError(f'operator {name!r} has no online implementation')
+        build, inputs = ONLINE_OPERATORS[name]
+        if self.position == len(self.operators):
+            operator = build(arguments)
+            if self.position < len(self.pending):
+                saved, state = self.pending[self.position]
+                if saved != name:
+                    raise RuntimeError(f'operator call #{self.position} is {name!r}, checkpoint has {saved!r}')
+                operator = load_state(state, operator)
+            self.operators.append((name, operator))
+        expected, operator = self.operators[self.position]
+        if expected != name:
+            raise RuntimeError(f'operator call #{self.position} is {name!r}, previous bars called {expected!r}')
+        self.position += 1
+        values = inputs(arguments) if callable(inputs) else [arguments[key] for key in inputs]
+        return operator.update(*values)
+
+
+class Incremental(object):
+    """
+    单个 alpha191_* 因子的增量计算器：update 传入一期行情，返回当期各资产的因子值
+    """
+
+    def __init__(self, alpha, params=None, assets=None):
+        """
+        :param alpha: 因子编号或名称
+        :param params: 因子参数
+        :param assets: 资产索引，默认由第一期的资产数生成 0..N-1
+        """
+        self.name = factor_names([alpha])[0]
+        self.params = dict(params or {})
+        self.assets = assets
+        self.store = StreamStore()
+        self.updates = 0
+        self._func = getattr(Alpha191, self.name)
+        self._previous = {}
+
+    def update(self, bar, date=None):
+        """
+        :param bar: {字段: 当期值}，资产字段为长度 N 的数组，市场字段为标量；未给出的 ret、benchmark_ret
+                    由前一期的收盘价派生
+        :param date: 当期日期，只用于构建单行面板
+        :return: 长度 N 的因子值；因子只依赖市场字段时为长度 1
+        """
+        fields = {name: _row(values) for name, values in bar.items()}
+        for derived, base in (('ret', 'close'), ('benchmark_ret', 'benchmark_close')):
+            if base in fields and derived not in fields:
+                previous = self._previous.get(base, np.full(fields[base].shape, np.nan))
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    fields[derived] = fields[base] / previous - 1
+            if base in fields:
+                self._previous[base] = fields[base]
+        if self.assets is None:
+            self.assets = range(max(values.shape[1] for values in fields.values()))
+        panel = Panel([self.updates if date is None else date], self.assets, **fields)
+        self.store.position = 0
+        with sharing(self.store):
+            values = self._func.__wrapped__(**panel_arguments(self._func, panel, **self.params))
+        self.updates += 1
+        return np.asarray(values, dtype=np.float64).reshape(-1)
+
+    def state(self):
+        """
+        :return: 可以继续计算的全部状态，由 dict、list、ndarray 与标量组成(见 dump_state)
+        """
+        operators = [[name, dump_state(operator)] for name, operator in self.store.operators]
+        # 读入检查点后尚未创建的算子，原样保留其状态
+        operators += [list(pending) for pending in self.store.pending[len(operators):]]
+        return {'name': self.name, 'params': dump_state(self.params), 'updates': self.updates,
+                'assets': None if self.assets is None else [dump_state(asset) for asset in self.assets],
+                'previous': dump_state(self._previous), 'operators': operators}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        :param state: state() 的结果
+        :return: 从该状态继续计算的 Incremental，后续结果与不中断计算逐位一致
+        """
+        evaluator = cls(state['name'], state['params'], state['assets'])
+        evaluator.updates = state['updates']
+        evaluator._previous = load_state(state['previous'])
+        evaluator.store.pending = [tuple(pending) for pending in state['operators']]
+        return evaluator
+
+    def __repr__(self):
+        return f'Incremental({self.name}, {len(self.store.operators)} online operators, {self.updates} updates)'
+
+
+def bars(panel, fields=None):
+    """
+    把面板逐期拆为 Incremental.update 的输入
+    :param panel: Panel
+    :param fields: 需要的字段，默认面板的全部字段
+    :return: 依次产生 (日期, {字段: 当期值})
+    """
+    fields = panel.fields if fields is None else fields
+    for t, date in enumerate(panel.dates):
+        yield date, {name: panel[name][t] if panel[name].shape[1] > 1 else panel[name][t, 0] for name in fields}
+
+
+def replay(alpha, panel, params=None):
+    """
+    按期把面板依次送入增量计算器
+    :param alpha: 因子编号或名称
+    :param panel: Panel
+    :param params: 因子参数
+    :return: (T, N) 的逐期结果
+    """
+    evaluator = Incremental(alpha, params, panel.assets)
+    return np.vstack([evaluator.update(bar, date) for date, bar in bars(panel)])
+
+
+def verify_stream(panel, alphas=None, params=None, rtol=1e-6):
+    """
+    将增量计算的逐期结果与批量计算的结果逐行比较
+    :param panel: Panel
+    :param alphas: 因子编号或名称列表，默认全部 191 个因子
+    :param params: 各因子的额外参数
+    :param rtol: 相对容差，见 Registry.close_enough
+    :return: {因子名: 是否在容差内一致}，函数体中含有无在线实现的算子时为 None
+    """
+    params = params or {}
+    names = factor_names(alphas)
+    full = compute_all(panel, names, params)
+    checks = OrderedDict()
+    for name in names:
+        try:
+            streamed = replay(name, panel, params.get(name))
+        except NotImplementedError:
+            checks[name] = None
+            continue
+        expected = np.asarray(full[name], dtype=np.float64).reshape(len(streamed), -1)
+        checks[name] = all(close_enough(got, want, rtol) for got, want in zip(streamed, expected))
+    return checks
@@ -0,0 +1,90 @@
+"""
+日频生产只需要最近几天的因子值：按注册表中的回看期数截取面板末尾的预热窗口，只计算最后 K 行
+"""
+import functools
+from collections import OrderedDict
+
+import numpy as np
+
+from . import Alpha191
+from .Batch import compute_all, factor_names
+from .Registry import close_enough, measure_lookback, probe_panel, registry, signature_fields
+
+# 递归因子(sma 等)的回看期数是在随机面板上按容差实测的收敛期，实际数据上再放宽该倍数
+RECURSIVE_MARGIN = 1.5
+
+
+@functools.lru_cache(maxsize=None)
+def _measured_lookback(name, params):
+    # 非默认参数的回看期数在随机面板上现场实测
+    return measure_lookback(getattr(Alpha191, name), probe_panel(), dict(params))
+
+
+def warmup(alpha, rows=1, params=None):
+    """
+    计算某个因子最后 rows 行所需的日期数
+    :param alpha: 因子编号或名称
+    :param rows: 需要的结果行数 K
+    :param params: 因子参数，与默认参数不同时重新实测回看期数
+    :return: 日期数，因子依赖全部历史时为 None
+    """
+    name = factor_names([alpha])[0]
+    spec = registry()[name]
+    lookback = spec['lookback']
+    if params:
+        merged = dict(signature_fields(getattr(Alpha191, name))[2], **params)
+        if merged != spec['params']:
+            lookback = _measured_lookback(name, tuple(sorted(merged.items())))
+    if lookback is None:
+        return None
+    if spec['recursive']:
+        lookback = int(np.ceil(lookback * RECURSIVE_MARGIN))
+    return lookback + rows - 1
+
+
+def compute_tail(panel, alphas=None, rows=1, params=None, verify=False, rtol=1e-6):
+    """
+    只计算各因子最后 rows 行：每个因子只使用面板末尾各自所需的预热窗口，窗口相同的因子一起计算并共用中间结果
+    :param panel: Panel
+    :param alphas: 因子编号或名称列表，默认全部 191 个因子
+    :param rows: 需要的结果行数 K
+    :param params: 各因子的额外参数，如 {'alpha191_1': {'n': 10}}
+    :param verify: 是否与使用全部历史的结果逐行核对，超出容差时抛出 ValueError
+    :param rtol: 核对使用的相对容差，见 Registry.close_enough
+    :return: 按请求顺序排列的 {因子名: 最后 rows 行结果}
+    """
+    params = params or {}
+    names = factor_names(alphas)
+    T = panel.shape[0]
+    groups = OrderedDict()
+    for name in names:
+        window = warmup(name, rows, params.get(name))
+        groups.setdefault(T if window is None else min(window, T), []).append(name)
+    tails = {}
+    for window, group in groups.items():
+        results = compute_all(panel.slice(T - window), group, params)
+        tails.update((name, result[-rows:]) for name, result in results.items())
+    tails = OrderedDict((name, tails[name]) for name in names)
+    if verify:
+        mismatched = [name for name, ok in verify_tail(panel, tails, params, rtol).items() if not ok]
+        if mismatched:
+            raise ValueError(f'tail results differ from full history for {mismatched}')
+    return tails
+
+
+def verify_tail(panel, tails, params=None, rtol=1e-6):
+    """
+    将截取窗口得到的结果与使用全部历史的结果逐行比较
+    :param panel: Panel
+    :param tails: compute_tail 的结果
+    :param params: 各因子的额外参数
+    :param rtol: 相对容差，见 Registry.close_enough
+    :return: {因子名: 是否在容差内一致}
+    """
+    full = compute_all(panel, list(tails), params)
+    checks = OrderedDict()
+    for name, tail in tails.items():
+        tail = np.asarray(tail, dtype=np.float64)
+        expected = np.asarray(full[name], dtype=np.float64)[-len(tail):]
+        checks[name] = all(close_enough(got, want, rtol) for got, want in zip(tail, expected))
+    return checks
@@ -0,0 +1 @@
+from .Batch import compute_all
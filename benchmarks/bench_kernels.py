@@ -0,0 +1,185 @@
+"""
+Basic 算子向量化内核与原始逐元素循环实现的性能对比
+
+运行方式: python benchmarks/bench_kernels.py [日期数] [资产数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import talib as ta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from AlphaFactor import Kernel  # noqa: E402
+from AlphaFactor.Blockwise import fused  # noqa: E402
+
+
+def _timeit(func, *args, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _tsrank_loop(A, n):
+    # 原 Basic.tsrank 的逐元素实现，仅用于对比
+    A = np.array(A)
+    m = len(A)
+    rank_res = np.zeros(m)
+    for i in range(m):
+        start = max(0, i - n + 1)
+        sub = A[start:i + 1]
+        rank_res[i] = np.sum(sub <= A[i])
+    return rank_res
+
+
+def bench_tsrank(panel, n=10):
+    loop = _timeit(lambda: [_tsrank_loop(panel[:, j], n) for j in range(panel.shape[1])], repeat=1)
+    kernel = _timeit(Kernel.rolling_rank, panel, n)
+    expected = np.column_stack([_tsrank_loop(panel[:, j], n) for j in range(panel.shape[1])])
+    assert np.allclose(Kernel.rolling_rank(panel, n)[n - 1:], expected[n - 1:])
+    return loop, kernel
+
+
+def _regbeta_loop(A, B, n):
+    # 原 Basic.regbeta 的逐窗口 np.cov 实现(A 对 B 回归)，仅用于对比
+    output = np.full(len(A), np.nan)
+    for i in range(n - 1, len(A)):
+        cov = np.cov(B[i - n + 1:i + 1], A[i - n + 1:i + 1])
+        output[i] = cov[0, 1] / cov[0, 0]
+    return output
+
+
+def bench_regbeta(panel, n=60):
+    seq = np.arange(panel.shape[0], dtype=np.float64)
+    loop = _timeit(lambda: [_regbeta_loop(panel[:, j], seq, n) for j in range(panel.shape[1])], repeat=1)
+    kernel = _timeit(Kernel.rolling_beta, panel, None, n)
+    expected = np.column_stack([_regbeta_loop(panel[:, j], seq, n) for j in range(panel.shape[1])])
+    assert np.allclose(Kernel.rolling_beta(panel, None, n), expected, equal_nan=True)
+    return loop, kernel
+
+
+def _decaylinear_loop(df, n):
+    # 原 Basic.decaylinear 的 rolling.apply 实现，仅用于对比
+    return df.rolling(n).apply(lambda x: np.sum(x * np.arange(1, n + 1) / np.sum(np.arange(1, n + 1))))
+
+
+def bench_decaylinear(panel, n=20):
+    df = pd.DataFrame(panel)
+    loop = _timeit(_decaylinear_loop, df, n, repeat=1)
+    kernel = _timeit(Kernel.linear_decay, panel, n)
+    assert np.allclose(Kernel.linear_decay(panel, n), _decaylinear_loop(df, n).to_numpy(), equal_nan=True)
+    return loop, kernel
+
+
+def bench_rank(panel):
+    # 截面排名与 pandas 的 rank(axis=1, pct=True) 对比
+    df = pd.DataFrame(panel)
+    loop = _timeit(lambda: df.rank(axis=1, pct=True))
+    kernel = _timeit(Kernel.cs_rank, panel)
+    assert np.allclose(Kernel.cs_rank(panel), df.rank(axis=1, pct=True).to_numpy(), equal_nan=True)
+    return loop, kernel
+
+
+def bench_corr(panel, n=10):
+    # 与逐列调用 ta.CORREL 的循环对比
+    other = np.roll(panel, 1, axis=1) * 0.5 + panel
+    loop = _timeit(lambda: [ta.CORREL(panel[:, j], other[:, j], n) for j in range(panel.shape[1])])
+    kernel = _timeit(Kernel.rolling_corr, panel, other, n)
+    expected = np.column_stack([ta.CORREL(panel[:, j], other[:, j], n) for j in range(panel.shape[1])])
+    assert np.allclose(Kernel.rolling_corr(panel, other, n), expected, equal_nan=True, atol=1e-8)
+    return loop, kernel
+
+
+def _bench_corr_pandas(x, y, n):
+    # 含 NaN 的输入 ta.CORREL 无法处理，与 pandas 的 rolling corr 对比
+    a, b = pd.DataFrame(x), pd.DataFrame(y)
+    loop = _timeit(lambda: a.rolling(n).corr(b))
+    kernel = _timeit(Kernel.rolling_corr, x, y, n)
+    assert np.allclose(Kernel.rolling_corr(x, y, n), a.rolling(n).corr(b).to_numpy(), equal_nan=True, atol=1e-8)
+    return loop, kernel
+
+
+def bench_corr_warmup(panel, n=2, warmup=19):
+    # 上游算子预热期的 NaN 只出现在开头且各列相同(如 CORR(SUM(CLOSE, 20), ..., 2))，仍走无 NaN 的分块路径；
+    # 与对预热期之后逐列调用 ta.CORREL 的循环对比
+    x, y = panel.copy(), np.roll(panel, 1, axis=1) * 0.5 + panel
+    x[:warmup] = np.nan
+    columns = [(np.ascontiguousarray(x[warmup:, j]), np.ascontiguousarray(y[warmup:, j])) for j in range(x.shape[1])]
+    loop = _timeit(lambda: [ta.CORREL(a, b, n) for a, b in columns])
+    kernel = _timeit(Kernel.rolling_corr, x, y, n)
+    expected = np.full(x.shape, np.nan)
+    expected[warmup:] = np.column_stack([ta.CORREL(a, b, n) for a, b in columns])
+    assert np.allclose(Kernel.rolling_corr(x, y, n), expected, equal_nan=True, atol=1e-8)
+    return loop, kernel
+
+
+def bench_corr_nan(panel, n=20):
+    # 停牌等散落的 NaN，按成对有效样本计数
+    x = panel.copy()
+    x[np.random.default_rng(1).random(x.shape) < 0.01] = np.nan
+    return _bench_corr_pandas(x, np.roll(panel, 1, axis=1) * 0.5 + panel, n)
+
+
+def bench_tsmax(panel, n=20):
+    # 与逐列调用 ta.MAX 的循环对比，只求极值
+    columns = [np.ascontiguousarray(panel[:, j]) for j in range(panel.shape[1])]
+    loop = _timeit(lambda: [ta.MAX(c, n) for c in columns])
+    kernel = _timeit(Kernel.rolling_max, panel, n)
+    expected = np.column_stack([ta.MAX(c, n) for c in columns])
+    assert np.array_equal(Kernel.rolling_max(panel, n), expected, equal_nan=True)
+    return loop, kernel
+
+
+def bench_highday(panel, n=20):
+    # 与逐列调用 ta.MAX + ta.MAXINDEX 的循环对比，内核一次同时给出极值与位置
+    columns = [np.ascontiguousarray(panel[:, j]) for j in range(panel.shape[1])]
+    loop = _timeit(lambda: [(ta.MAX(c, n), ta.MAXINDEX(c, n)) for c in columns])
+    kernel = _timeit(Kernel.rolling_extrema, panel, n)
+    expected = np.column_stack([ta.MAX(c, n) for c in columns])
+    assert np.allclose(Kernel.rolling_extrema(panel, n)[0], expected, equal_nan=True)
+    return loop, kernel
+
+
+def bench_fused(panel):
+    # 一维基准序列在前、二维面板在后，结果按面板的形状与类型返回
+    bench, df = pd.Series(panel[:, 0]), pd.DataFrame(panel)
+    loop = _timeit(lambda: (df.sub(bench, axis=0) / bench.to_numpy()[:, None]).abs())
+    kernel = _timeit(lambda: fused('ABS((close - bench) / bench)', bench=bench, close=df))
+    expected = np.abs((panel - panel[:, :1]) / panel[:, :1])
+    result = fused('ABS((close - bench) / bench)', bench=bench, close=df)
+    assert isinstance(result, pd.DataFrame) and np.allclose(result.to_numpy(), expected)
+    assert np.allclose(fused('ABS((close - bench) / bench)', bench=panel[:, 0], close=panel), expected)
+    return loop, kernel
+
+
+BENCHMARKS = {
+    'tsrank': bench_tsrank,
+    'regbeta': bench_regbeta,
+    'decaylinear': bench_decaylinear,
+    'rank': bench_rank,
+    'corr': bench_corr,
+    'corr_warmup': bench_corr_warmup,
+    'corr_nan': bench_corr_nan,
+    'tsmax': bench_tsmax,
+    'highday': bench_highday,
+    'fused': bench_fused,
+}
+
+
+def main(T=1000, N=200):
+    rng = np.random.default_rng(0)
+    panel = np.cumsum(rng.standard_normal((T, N)), axis=0) + 100
+    print(f'panel: {T} dates x {N} assets')
+    for name, bench in BENCHMARKS.items():
+        loop, kernel = bench(panel)
+        print(f'{name:<12} baseline {loop:9.4f}s  kernel {kernel:9.4f}s  speedup {loop / kernel:8.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(v) for v in sys.argv[1:3]])